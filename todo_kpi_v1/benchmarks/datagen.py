@@ -0,0 +1,139 @@
+"""生成基准测试用的合成数据
+
+数据为 data.json 的布局，规模由项目数、TODO数、KPI数和KPI记录的年数决定；
+同样的参数和随机种子总是生成同样的数据，不同提交之间的测试结果可以直接对比。
+"""
+import datetime
+import json
+import random
+
+from core.models import ProgressType, PeriodType, DurationType
+
+# 预设规模：(项目数, TODO数, KPI数, 记录年数)
+SIZES = {
+    "small": (5, 200, 10, 1),
+    "medium": (20, 2000, 50, 3),
+    "large": (50, 20000, 200, 5),
+}
+
+_PERIOD_TYPES = [PeriodType.DAILY.value] * 4 + [
+    PeriodType.WEEKLY.value, PeriodType.MONTHLY.value, PeriodType.CUSTOM.value
+]
+_DURATION_TYPES = [DurationType.FOREVER.value] * 3 + [
+    DurationType.ONE_WEEK.value, DurationType.ONE_MONTH.value
+]
+
+
+def generate_data(projects=20, todos=2000, kpis=50, years=3, completion_rate=0.6, seed=0, end_date=None):
+    """生成合成数据
+
+    Args:
+        projects (int): 项目类型数
+        todos (int): TODO数，约三分之一为已完成
+        kpis (int): KPI数，创建日期分布在记录范围内
+        years (int): KPI记录覆盖的年数，截止到 end_date
+        completion_rate (float): KPI在有效期内每天完成的概率
+        seed (int): 随机种子
+        end_date (datetime.date): 数据的最后一天，默认为今天
+    Returns:
+        dict: data.json 布局的数据
+    """
+    rng = random.Random(seed)
+    end = (end_date or datetime.date.today()).toordinal()
+    start = end - years * 365 + 1
+
+    def date_str(day):
+        return datetime.date.fromordinal(day).strftime("%Y-%m-%d")
+
+    project_names = [f"项目{i}" for i in range(projects)]
+    data_projects = {
+        name: {
+            "unit": rng.choice(["页", "课", "分钟", "字", "小时"]),
+            "count": 0,
+            "progress_type": rng.choice([ProgressType.ABSOLUTE, ProgressType.CUMULATIVE])
+        }
+        for name in project_names
+    }
+
+    data_todos = []
+    for i in range(todos):
+        type_name = rng.choice(project_names)
+        project = data_projects[type_name]
+        target = float(rng.randint(10, 500))
+        completed = rng.random() < 0.35
+        deadline = rng.randint(start, end + 90)
+        todo = {
+            "name": f"TODO{i}",
+            "type": type_name,
+            "unit": project["unit"],
+            "target": target,
+            "progress": target if completed else round(rng.random() * target, 1),
+            "progress_type": project["progress_type"],
+            "deadline": date_str(deadline),
+            "completed": completed
+        }
+        if completed:
+            todo["complete_time"] = date_str(min(end, rng.randint(deadline - 30, deadline)))
+            project["count"] += 1
+        data_todos.append(todo)
+
+    data_kpis = []
+    for kpi_id in range(kpis):
+        period_type = rng.choice(_PERIOD_TYPES)
+        data_kpis.append({
+            "id": kpi_id,
+            "name": f"KPI{kpi_id}",
+            "period_type": period_type,
+            "custom_days": rng.randint(2, 10) if period_type == PeriodType.CUSTOM.value else None,
+            "target": float(rng.randint(1, 20)),
+            "unit": "次",
+            "todo_id": rng.randrange(todos) if todos and rng.random() < 0.3 else None,
+            "duration_type": rng.choice(_DURATION_TYPES),
+            "created_at": date_str(rng.randint(start, end))
+        })
+
+    data_records = {}
+    for day in range(start, end + 1):
+        records = {
+            str(kpi_id): True for kpi_id in range(kpis) if rng.random() < completion_rate
+        }
+        if records:
+            data_records[date_str(day)] = records
+
+    return {
+        "projects": data_projects,
+        "todos": data_todos,
+        "kpis": data_kpis,
+        "window_size": [800, 500],
+        "kpi_records": data_records
+    }
+
+
+def write_data_file(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+def generate_chat_transcript(messages=40, paragraphs=4, seed=0):
+    """生成一段AI助手对话记录 [(内容, 是否为用户消息)]，AI回复为带列表和代码块的 Markdown"""
+    rng = random.Random(seed)
+    words = ["进度", "目标", "完成", "计划", "每周", "复盘", "阅读", "运动", "效率", "习惯", "任务", "统计"]
+
+    def sentence():
+        return "".join(rng.choice(words) for _ in range(rng.randint(6, 16))) + "。"
+
+    transcript = []
+    for i in range(messages):
+        if i % 2 == 0:
+            transcript.append((sentence(), True))
+            continue
+        parts = []
+        for _ in range(paragraphs):
+            parts.append(" ".join(sentence() for _ in range(rng.randint(2, 5))))
+            parts.append("\n".join(f"- **{rng.choice(words)}**：{sentence()}" for _ in range(rng.randint(2, 4))))
+        parts.append("```python\n" + "\n".join(
+            f"total_{j} = sum(item.progress for item in todos if item.type == '{rng.choice(words)}')"
+            for j in range(rng.randint(3, 8))
+        ) + "\n```")
+        transcript.append(("\n\n".join(parts), False))
+    return transcript
@@ -0,0 +1,221 @@
+"""本地模拟的 SiliconFlow 接口，供压测使用
+
+实现 api_server 用到的 /chat/completions（含流式）、/embeddings 和 /completions，
+可以设置首字节延迟、流式输出的速度和错误注入。在 todo_kpi_v1 目录下运行：
+
+    python -m benchmarks.fake_upstream --port 5099 --tokens-per-second 50 --latency-ms 300
+
+然后让 DeepSeekService 指向它：SILICONFLOW_API_BASE=http://127.0.0.1:5099/v1
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_DIMENSIONS = 64
+TOKEN_TEXT = "好"  # 每个流式片段输出的内容
+
+
+class UpstreamConfig:
+    def __init__(self, latency_ms=200, jitter_ms=50, tokens_per_second=50, max_tokens=128,
+                 error_rate=0.0, error_status=500, hang_rate=0.0, hang_seconds=30.0, seed=None):
+        """
+        Args:
+            latency_ms (float): 收到请求到返回第一个字节的平均延迟
+            jitter_ms (float): 延迟的随机波动范围（±）
+            tokens_per_second (float): 流式输出的速度，0 表示不限速
+            max_tokens (int): 单次回复的最大片段数，请求中的 max_tokens 更小时以请求为准
+            error_rate (float): 返回错误的请求比例
+            error_status (int): 注入错误时的 HTTP 状态码
+            hang_rate (float): 长时间不响应的请求比例，用于模拟卡住的连接
+            hang_seconds (float): 不响应的时长
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.max_tokens = max_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def latency(self):
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            hang = self._rng.random() < self.hang_rate
+        return self.hang_seconds if hang else max(0.0, self.latency_ms + jitter) / 1000
+
+    def should_fail(self):
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def token_count(self, requested):
+        try:
+            requested = int(requested)
+        except (TypeError, ValueError):
+            requested = self.max_tokens
+        return max(1, min(requested, self.max_tokens))
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = UpstreamConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return {}
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        try:
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端已超时断开
+            self.close_connection = True
+
+    def do_POST(self):
+        body = self._read_json()
+        time.sleep(self.config.latency())
+        if self.config.should_fail():
+            self._send_json(self.config.error_status,
+                            {"code": self.config.error_status, "message": "injected error"})
+            return
+
+        path = self.path.rstrip("/")
+        if path.endswith("/chat/completions"):
+            tokens = self.config.token_count(body.get("max_tokens"))
+            if body.get("stream"):
+                self._stream_chat(body.get("model"), tokens)
+            else:
+                self._send_json(200, self._chat_response(body.get("model"), tokens))
+        elif path.endswith("/embeddings"):
+            self._send_json(200, {
+                "object": "list",
+                "model": body.get("model"),
+                "data": [{"object": "embedding", "index": 0, "embedding": [0.01] * EMBEDDING_DIMENSIONS}],
+            })
+        elif path.endswith("/completions"):
+            tokens = self.config.token_count(body.get("max_tokens"))
+            self._wait_for_tokens(tokens)
+            self._send_json(200, {
+                "object": "text_completion",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "text": TOKEN_TEXT * tokens, "finish_reason": "length"}],
+            })
+        else:
+            self._send_json(404, {"message": f"unknown path {self.path}"})
+
+    def _wait_for_tokens(self, tokens):
+        # 非流式请求按同样的速度生成完整回复后一次返回
+        if self.config.tokens_per_second:
+            time.sleep(tokens / self.config.tokens_per_second)
+
+    def _chat_response(self, model, tokens):
+        self._wait_for_tokens(tokens)
+        return {
+            "id": "fake-chat",
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": TOKEN_TEXT * tokens},
+                "finish_reason": "length",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _stream_chat(self, model, tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        interval = 1 / self.config.tokens_per_second if self.config.tokens_per_second else 0
+        try:
+            for _ in range(tokens):
+                chunk = {
+                    "id": "fake-chat",
+                    "object": "chat.completion.chunk",
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": TOKEN_TEXT}}],
+                }
+                self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+                if interval:
+                    time.sleep(interval)
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端中途断开
+            self.close_connection = True
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def create_server(host="127.0.0.1", port=0, config=None):
+    """创建模拟服务（未启动），port 为 0 时自动分配端口，实际端口见 server.server_address"""
+    handler = type("ConfiguredUpstreamHandler", (FakeUpstreamHandler,), {"config": config or UpstreamConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(host="127.0.0.1", port=0, config=None):
+    """在后台线程中启动模拟服务，返回 (server, 接口地址)；用完调用 server.shutdown()"""
+    server = create_server(host, port, config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/v1"
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=200, help="首字节延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="延迟的随机波动（毫秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="流式输出速度，0 为不限速")
+    parser.add_argument("--max-tokens", type=int, default=128, help="单次回复的最大片段数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回错误的请求比例（0~1）")
+    parser.add_argument("--error-status", type=int, default=500, help="注入错误时的状态码")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="长时间不响应的请求比例（0~1）")
+    parser.add_argument("--hang-seconds", type=float, default=30.0, help="不响应的时长（秒）")
+
+
+def config_from_args(args, seed=None):
+    return UpstreamConfig(args.latency_ms, args.jitter_ms, args.tokens_per_second, args.max_tokens,
+                          args.error_rate, args.error_status, args.hang_rate, args.hang_seconds, seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地模拟的 SiliconFlow 接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5099)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = create_server(args.host, args.port, config_from_args(args))
+    print(f"模拟接口已启动: SILICONFLOW_API_BASE=http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
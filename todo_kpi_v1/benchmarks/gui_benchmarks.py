@@ -0,0 +1,168 @@
+"""界面刷新的基准测试
+
+在 offscreen 平台上运行 WorkTracker 和 ChatDialog，不需要显示器。在 todo_kpi_v1 目录下运行：
+
+    python -m benchmarks.gui_benchmarks --size medium
+    python -m benchmarks.gui_benchmarks --size small --only chat --repeat 10
+
+数据写入临时目录（通过 TODO_DATA_DIR 指定给 main），不影响本机的 data.json。
+结果追加到 benchmarks/results.jsonl，并与同规模的上一次运行对比。
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+
+from benchmarks.datagen import SIZES, generate_data, generate_chat_transcript, write_data_file
+from benchmarks.harness import BenchmarkRunner, save_and_compare
+from benchmarks.run_benchmarks import DEFAULT_OUTPUT
+
+TYPEWRITER_CHARS = 400  # 打字机效果测试的字符数
+
+
+@contextmanager
+def _dialogs_return_immediately():
+    """对话框 exec_ 不进入事件循环，直接返回，用于测量对话框的构建耗时"""
+    from PyQt5.QtWidgets import QDialog
+    original = QDialog.exec_
+    QDialog.exec_ = lambda self: QDialog.Accepted
+    try:
+        yield
+    finally:
+        QDialog.exec_ = original
+
+
+def bench_work_tracker(runner, app, main):
+    from PyQt5.QtCore import QDate
+
+    def build_window():
+        window = main.WorkTracker()
+        window.show()
+        app.processEvents()
+        return window
+
+    runner.measure("window_first_show", build_window)
+    window = build_window()
+    # 构建全部标签页
+    for index in range(window.tabs.count()):
+        window.tabs.setCurrentIndex(index)
+    app.processEvents()
+
+    todos = len(main.data_mgr.data["todos"])
+    runner.measure("refresh_summary_table", window.refresh_summary_table,
+                   items=len(main.data_mgr.data["projects"]))
+    runner.measure("refresh_todo_tables", window.refresh_todo_tables, items=todos)
+    runner.measure("refresh_kpi_table", window.refresh_kpi_table, items=len(main.data_mgr.data["kpis"]))
+
+    def switch_tabs():
+        # 数据变化后依次切换到每个标签页，包含待刷新视图的刷新
+        window.refresh_table()
+        for index in range(window.tabs.count()):
+            window.tabs.setCurrentIndex(index)
+            app.processEvents()
+
+    runner.measure("switch_tabs_after_change", switch_tabs)
+
+    kpi_tab = [name for name, _, _, _ in window.tab_views].index("kpi")
+    window.tabs.setCurrentIndex(kpi_tab)
+    app.processEvents()
+    today = QDate.currentDate()
+    offsets = iter(range(1, 1 << 20))
+
+    def change_date():
+        window.kpi_date_input.setDate(today.addDays(-(next(offsets) % 365)))
+
+    runner.measure("kpi_change_date", change_date)
+    window.kpi_date_input.setDate(today)
+
+    kpis = main.data_mgr.get_active_kpis(main.qdate_to_day(today))
+    if kpis:
+        kpi = kpis[0]
+        # 切换两次，数据保持不变
+        runner.measure("toggle_kpi_completion",
+                       lambda: (window.toggle_kpi_completion(kpi.id), window.toggle_kpi_completion(kpi.id)),
+                       items=2)
+
+    todo_index = next((i for i, todo in enumerate(main.data_mgr.data["todos"]) if not todo.completed), None)
+    if todo_index is not None:
+        window.tabs.setCurrentIndex([name for name, _, _, _ in window.tab_views].index("todo"))
+        app.processEvents()
+        runner.measure("complete_and_restore_todo",
+                       lambda: (window.complete_todo(todo_index), window.restore_todo(todo_index)), items=2)
+        runner.measure("undo_redo_refresh", lambda: (window.undo(), window.redo()), items=2)
+
+    with _dialogs_return_immediately():
+        runner.measure("kpi_summary_dialog", window.show_kpi_summary, items=len(main.data_mgr.data["kpis"]))
+    window.close()
+
+
+def bench_chat_dialog(runner, app, transcript):
+    from ui.chat_dialog import ChatDialog, format_message
+
+    longest = max((content for content, is_user in transcript if not is_user), key=len)
+    runner.measure("chat_format_message", lambda: format_message(longest), items=len(longest))
+
+    def render_transcript():
+        dialog = ChatDialog()
+        dialog.show()
+        for content, is_user in transcript:
+            dialog._add_message_to_chat(content, is_user)
+        app.processEvents()
+        return dialog
+
+    runner.measure("chat_render_transcript", render_transcript, items=len(transcript))
+
+    def typewriter(dialog):
+        # 不等待定时器，直接逐字调用，测量每个字符的渲染耗时
+        dialog._add_message_to_chat(longest, is_user=False, use_typewriter=True)
+        dialog.typewriter_timer.stop()
+        for _ in range(min(TYPEWRITER_CHARS, len(longest))):
+            dialog.type_next_char()
+        app.processEvents()
+
+    runner.measure("chat_typewriter", typewriter, setup=render_transcript,
+                   items=min(TYPEWRITER_CHARS, len(longest)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="界面刷新的基准测试（offscreen）")
+    parser.add_argument("--size", choices=sorted(SIZES), default="medium", help="数据规模")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例的重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="生成数据的随机种子")
+    parser.add_argument("--chat-messages", type=int, default=40, help="对话记录的消息数")
+    parser.add_argument("--only", help="只运行名称包含这些字符串的用例，逗号分隔")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="结果文件（JSON Lines，追加写入）")
+    parser.add_argument("--no-save", action="store_true", help="不写入结果文件")
+    args = parser.parse_args(argv)
+
+    projects, todos, kpis, years = SIZES[args.size]
+    dataset = {"suite": "gui", "size": args.size, "projects": projects, "todos": todos, "kpis": kpis,
+               "years": years, "seed": args.seed, "chat_messages": args.chat_messages}
+    print(f"生成数据: {dataset}")
+
+    data_dir = tempfile.mkdtemp(prefix="todo_gui_bench_")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ["TODO_DATA_DIR"] = data_dir
+    write_data_file(os.path.join(data_dir, "data.json"),
+                    generate_data(projects, todos, kpis, years, seed=args.seed))
+
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    import main as app_main  # 导入时按 TODO_DATA_DIR 载入数据
+
+    runner = BenchmarkRunner(args.repeat, args.only.split(",") if args.only else None)
+    try:
+        bench_work_tracker(runner, app, app_main)
+        bench_chat_dialog(runner, app, generate_chat_transcript(args.chat_messages, seed=args.seed))
+    finally:
+        app_main.data_mgr.oplog.clear_history()
+        app_main.data_mgr.kpi_records.close()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return save_and_compare(runner, dataset, args.output, not args.no_save, repeat=args.repeat)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,155 @@
+"""基准测试计时与结果记录
+
+每个用例重复运行若干次，记录每次耗时的分位数和吞吐量；
+结果以 JSON Lines 追加到结果文件，每行一次完整运行，附带提交号和数据规模，
+新结果与同规模的上一次运行逐项对比，变慢超过阈值的用例会被标出。
+"""
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+REGRESSION_THRESHOLD = 0.10  # p50 变慢超过10%视为退化
+
+
+def percentile(sorted_values, fraction):
+    """已排序数据的分位数（线性插值）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def summarize(name, durations, items=1):
+    """汇总一个用例的耗时（秒），items 为每次运行处理的条数"""
+    values = sorted(durations)
+    total = sum(values)
+    return {
+        "name": name,
+        "runs": len(values),
+        "items": items,
+        "min_ms": round(values[0] * 1000, 4),
+        "mean_ms": round(total / len(values) * 1000, 4),
+        "p50_ms": round(percentile(values, 0.5) * 1000, 4),
+        "p90_ms": round(percentile(values, 0.9) * 1000, 4),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 4),
+        "max_ms": round(values[-1] * 1000, 4),
+        "items_per_s": round(items * len(values) / total, 1) if total else None,
+    }
+
+
+class BenchmarkRunner:
+    def __init__(self, repeat=5, only=None):
+        """
+        Args:
+            repeat (int): 每个用例默认的重复次数
+            only (list): 只运行名称包含其中任一字符串的用例
+        """
+        self.repeat = repeat
+        self.only = only
+        self.results = []
+
+    def selected(self, name):
+        return not self.only or any(part in name for part in self.only)
+
+    def measure(self, name, func, setup=None, items=1, repeat=None):
+        """运行 func 若干次并记录耗时
+
+        Args:
+            setup (callable): 每次运行前调用，不计入耗时，返回值作为 func 的参数
+            items (int): 每次运行处理的条数，用于计算吞吐量
+            repeat (int): 本用例的重复次数，默认使用 self.repeat
+        """
+        if not self.selected(name):
+            return None
+        durations = []
+        for _ in range(repeat or self.repeat):
+            arg = setup() if setup else None
+            gc.collect()
+            start = time.perf_counter()
+            func(arg) if setup else func()
+            durations.append(time.perf_counter() - start)
+        result = summarize(name, durations, items)
+        self.results.append(result)
+        print(f"{name:<32} p50 {result['p50_ms']:>10.3f}ms  p90 {result['p90_ms']:>10.3f}ms  "
+              f"{result['items_per_s'] or 0:>12.1f}/s")
+        return result
+
+
+def git_commit(cwd=None):
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=cwd, capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def build_report(results, dataset, **extra):
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(os.path.dirname(os.path.abspath(__file__))),
+        "platform": sys.platform,
+        "python": platform.python_version(),
+        "dataset": dataset,
+        "results": results,
+        **extra
+    }
+
+
+def load_reports(path):
+    reports = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    reports.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return reports
+
+
+def append_report(path, report):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(report, ensure_ascii=False) + "\n")
+
+
+def compare(previous, current, threshold=REGRESSION_THRESHOLD):
+    """逐项对比两次运行的 p50，返回 [(用例名, 之前ms, 现在ms, 变化比例, 是否退化)]"""
+    before = {result["name"]: result for result in previous["results"]}
+    rows = []
+    for result in current["results"]:
+        old = before.get(result["name"])
+        if not old or not old["p50_ms"]:
+            continue
+        change = result["p50_ms"] / old["p50_ms"] - 1
+        rows.append((result["name"], old["p50_ms"], result["p50_ms"], change, change > threshold))
+    return rows
+
+
+def save_and_compare(runner, dataset, output, save=True, **extra):
+    """生成本次运行的报告，与同一数据集的上一次运行对比后追加到结果文件"""
+    report = build_report(runner.results, dataset, **extra)
+    previous = [old for old in load_reports(output) if old.get("dataset") == dataset]
+    if previous:
+        baseline = previous[-1]
+        print(f"\n与上一次运行对比（{baseline.get('commit')} {baseline['timestamp']}）:")
+        regressions = 0
+        for name, before, after, change, regressed in compare(baseline, report):
+            regressions += regressed
+            flag = "  <-- 变慢" if regressed else ""
+            print(f"{name:<32} {before:>10.3f}ms -> {after:>10.3f}ms  {change:+.1%}{flag}")
+        report["regressions"] = regressions
+    if save:
+        append_report(output, report)
+        print(f"\n结果已追加到 {output}")
+    return report
@@ -0,0 +1,254 @@
+"""api_server 的压测工具
+
+以设定的并发数请求 /api/chat（流式）、/api/deepseek/* 和 /api/check-update，
+统计每个请求的耗时分位数、首个片段到达时间（TTFT）和吞吐量。在 todo_kpi_v1 目录下运行：
+
+    python -m benchmarks.load_test --concurrency 1,8,32 --requests 100
+    python -m benchmarks.load_test --only chat --duration 30 --tokens-per-second 20 --error-rate 0.05
+    python -m benchmarks.load_test --target http://127.0.0.1:5010 --only check_update
+
+不指定 --target 时，在本机启动模拟上游（见 benchmarks.fake_upstream）和一个指向它的 api_server，
+数据库使用临时文件，不需要真实的 API Key。结果追加到 benchmarks/results.jsonl，并与相同参数的上一次运行对比。
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from benchmarks import fake_upstream
+from benchmarks.harness import BenchmarkRunner, percentile, summarize, save_and_compare
+from benchmarks.run_benchmarks import DEFAULT_OUTPUT
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUEST_TIMEOUT = 60  # 单个请求的超时（秒）
+STARTUP_TIMEOUT = 30  # 等待 api_server 启动的时间（秒）
+
+_MESSAGES = [{"role": "user", "content": "帮我总结一下这周的KPI完成情况"}]
+
+# 场景名 -> (方法, 路径, 请求体或查询参数, 是否为流式)
+SCENARIOS = {
+    "chat": ("POST", "/api/chat", {"messages": _MESSAGES}, True),
+    "deepseek_chat": ("POST", "/api/deepseek/chat", {"messages": _MESSAGES, "max_tokens": 64}, False),
+    "embedding": ("POST", "/api/deepseek/embedding", {"text": "每周复盘"}, False),
+    "generation": ("POST", "/api/deepseek/generation", {"prompt": "def total(todos):"}, False),
+    "check_update": ("GET", "/api/check-update", {"version": "1.0.0", "platform": "windows"}, False),
+}
+
+
+class RequestResult:
+    __slots__ = ("ok", "latency", "ttft", "tokens", "error")
+
+    def __init__(self, ok, latency, ttft=None, tokens=0, error=None):
+        self.ok = ok
+        self.latency = latency
+        self.ttft = ttft
+        self.tokens = tokens
+        self.error = error
+
+
+def _read_stream(response, start):
+    """读取 /api/chat 的 SSE 输出，返回 (首个片段的耗时, 片段数, 错误)"""
+    ttft = None
+    tokens = 0
+    for line in response.iter_lines(chunk_size=None):
+        if not line.startswith(b"data: "):
+            continue
+        payload = line[6:]
+        if payload == b"[DONE]":
+            break
+        event = json.loads(payload)
+        if "error" in event:
+            return ttft, tokens, event["error"]
+        if event.get("content"):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            tokens += 1
+    return ttft, tokens, None if tokens else "空回复"
+
+
+def send_request(session, base_url, scenario):
+    method, path, payload, streaming = SCENARIOS[scenario]
+    start = time.perf_counter()
+    try:
+        if method == "GET":
+            response = session.get(base_url + path, params=payload, timeout=REQUEST_TIMEOUT)
+        else:
+            response = session.post(base_url + path, json=payload, stream=streaming, timeout=REQUEST_TIMEOUT)
+        with response:
+            if response.status_code != 200:
+                return RequestResult(False, time.perf_counter() - start, error=f"HTTP {response.status_code}")
+            if streaming and response.headers.get("Content-Type", "").startswith("text/event-stream"):
+                ttft, tokens, error = _read_stream(response, start)
+                return RequestResult(error is None, time.perf_counter() - start, ttft, tokens, error)
+            body = response.json()
+    except (requests.RequestException, ValueError) as e:
+        return RequestResult(False, time.perf_counter() - start, error=type(e).__name__)
+    latency = time.perf_counter() - start
+    # 业务错误以 success: false 或 error 字段返回，状态码仍是200
+    if isinstance(body, dict) and (body.get("success") is False or "error" in body):
+        return RequestResult(False, latency, error=str(body.get("error"))[:80])
+    return RequestResult(True, latency, latency)
+
+
+def run_level(base_url, scenario, concurrency, total=None, duration=None, clients=1):
+    """以固定并发数发送请求，直到发完 total 个或超过 duration 秒；返回 (结果列表, 实际用时)
+
+    各并发线程轮流使用 clients 个不同的 X-Client-Id，用于观察按客户端的公平排队
+    """
+    counter = itertools.count()
+    lock = threading.Lock()
+    results = []
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker(index):
+        with requests.Session() as session:
+            session.headers['X-Client-Id'] = f"load-test-{index % clients}"
+            while True:
+                if deadline is not None:
+                    if time.perf_counter() >= deadline:
+                        return
+                elif next(counter) >= total:
+                    return
+                result = send_request(session, base_url, scenario)
+                with lock:
+                    results.append(result)
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def summarize_level(name, results, elapsed):
+    """汇总一档并发的结果；items_per_s 为按实际用时计算的成功请求吞吐量"""
+    ok = [result for result in results if result.ok]
+    summary = summarize(name, [result.latency for result in (ok or results)])
+    ttfts = sorted(result.ttft for result in ok if result.ttft is not None)
+    errors = {}
+    for result in results:
+        if not result.ok:
+            errors[result.error] = errors.get(result.error, 0) + 1
+    summary.update({
+        "runs": len(results),
+        "errors": len(results) - len(ok),
+        "error_rate": round((len(results) - len(ok)) / len(results), 4) if results else 0,
+        "ttft_p50_ms": round(percentile(ttfts, 0.5) * 1000, 4),
+        "ttft_p90_ms": round(percentile(ttfts, 0.9) * 1000, 4),
+        "ttft_p99_ms": round(percentile(ttfts, 0.99) * 1000, 4),
+        "items_per_s": round(len(ok) / elapsed, 2) if elapsed else None,
+        "tokens_per_s": round(sum(result.tokens for result in ok) / elapsed, 1) if elapsed else None,
+        "error_kinds": errors,
+    })
+    return summary
+
+
+def _wait_until_ready(base_url, process):
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"api_server 启动失败，退出码 {process.returncode}")
+        try:
+            requests.get(base_url + "/", timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError("等待 api_server 启动超时")
+
+
+def start_api_server(upstream_base, port, work_dir):
+    """在子进程中启动指向模拟上游的 api_server（关闭调试和自动重载），返回 (进程, 地址)"""
+    env = dict(os.environ,
+               SILICONFLOW_API_BASE=upstream_base,
+               SILICONFLOW_API_KEY="load-test",
+               API_DATABASE_URI="sqlite:///" + os.path.join(work_dir, "versions.db"))
+    code = f"from api_server import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=APP_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=open(os.path.join(work_dir, "api_server.log"), "w"))
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_ready(base_url, process)
+    except Exception:
+        process.kill()
+        raise
+    return process, base_url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="api_server 压测")
+    parser.add_argument("--target", help="已运行的 api_server 地址；不指定时在本机启动模拟上游和 api_server")
+    parser.add_argument("--port", type=int, default=5011, help="自动启动的 api_server 端口")
+    parser.add_argument("--only", help="只运行这些场景，逗号分隔：" + ",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32", help="并发数，逗号分隔，依次运行")
+    parser.add_argument("--requests", type=int, default=50, help="每档并发发送的请求数")
+    parser.add_argument("--duration", type=float, help="每档并发的持续时间（秒），指定后忽略 --requests")
+    parser.add_argument("--clients", type=int, default=1, help="模拟的客户端数（X-Client-Id）")
+    parser.add_argument("--seed", type=int, default=0, help="模拟上游的随机种子")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="结果文件（JSON Lines，追加写入）")
+    parser.add_argument("--no-save", action="store_true", help="不写入结果文件")
+    fake_upstream.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    scenarios = args.only.split(",") if args.only else list(SCENARIOS)
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知场景: {','.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    dataset = {"suite": "api", "target": args.target or "local", "scenarios": scenarios, "concurrency": levels,
+               "requests": None if args.duration else args.requests, "duration": args.duration,
+               "clients": args.clients}
+    if not args.target:
+        dataset["upstream"] = {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+                               "tokens_per_second": args.tokens_per_second, "max_tokens": args.max_tokens,
+                               "error_rate": args.error_rate, "error_status": args.error_status,
+                               "hang_rate": args.hang_rate, "hang_seconds": args.hang_seconds}
+    print(f"压测参数: {dataset}")
+
+    upstream = process = None
+    work_dir = tempfile.mkdtemp(prefix="todo_load_test_")
+    runner = BenchmarkRunner()  # 只用来收集结果
+    try:
+        base_url = args.target.rstrip("/") if args.target else None
+        if base_url is None:
+            upstream, upstream_base = fake_upstream.start_in_thread(
+                config=fake_upstream.config_from_args(args, seed=args.seed))
+            process, base_url = start_api_server(upstream_base, args.port, work_dir)
+
+        print(f"{'场景':<24} {'请求':>6} {'错误':>6} {'p50':>10} {'p90':>10} {'p99':>10} "
+              f"{'TTFT p50':>10} {'请求/s':>9} {'片段/s':>9}")
+        for scenario in scenarios:
+            for level in levels:
+                level_results, elapsed = run_level(base_url, scenario, level, args.requests, args.duration,
+                                                   args.clients)
+                summary = summarize_level(f"{scenario}@c{level}", level_results, elapsed)
+                runner.results.append(summary)
+                print(f"{summary['name']:<24} {summary['runs']:>6} {summary['errors']:>6} "
+                      f"{summary['p50_ms']:>8.1f}ms {summary['p90_ms']:>8.1f}ms {summary['p99_ms']:>8.1f}ms "
+                      f"{summary['ttft_p50_ms']:>8.1f}ms {summary['items_per_s']:>9.1f} {summary['tokens_per_s']:>9.1f}")
+                if summary["error_kinds"]:
+                    print(f"    错误: {summary['error_kinds']}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        if upstream is not None:
+            upstream.shutdown()
+            upstream.server_close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return save_and_compare(runner, dataset, args.output, not args.no_save)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
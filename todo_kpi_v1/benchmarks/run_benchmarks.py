@@ -0,0 +1,188 @@
+"""DataManager 与KPI统计的基准测试
+
+在 todo_kpi_v1 目录下运行，不需要图形界面：
+
+    python -m benchmarks.run_benchmarks --size medium
+    python -m benchmarks.run_benchmarks --size small --only load,kpi --repeat 10
+
+结果追加到 benchmarks/results.jsonl，并与同规模的上一次运行对比。
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from core.dates import today
+from core.data_manager import DataManager
+from core.aggregates import TodoAggregates
+from core.csv_exporter import CsvExporter
+from core.csv_importer import CsvImporter
+from core.columnar import write_columnar, read_columnar
+
+from benchmarks.datagen import SIZES, generate_data, write_data_file
+from benchmarks.harness import BenchmarkRunner, save_and_compare
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.jsonl")
+SINGLE_OP_RUNS = 200  # 单次操作类用例的运行次数
+
+
+def _remove(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def bench_load_save(runner, work_dir, data):
+    data_file = os.path.join(work_dir, "data.json")
+    base_name = os.path.splitext(data_file)[0]
+    write_data_file(data_file, data)
+
+    def without_cache():
+        _remove(base_name + ".snapshot", base_name + ".journal")
+
+    runner.measure("load_json", lambda _: DataManager(data_file), setup=without_cache)
+    DataManager(data_file).close()
+    runner.measure("load_snapshot", lambda: DataManager(data_file))
+
+    dm = DataManager(data_file)
+    runner.measure("save_full", dm.checkpoint)
+    return dm
+
+
+def bench_kpi_records(runner, dm, rng):
+    kpis = dm.data["kpis"]
+    if not kpis:
+        return
+    end = today()
+
+    def pick():
+        return end - rng.randrange(365), rng.choice(kpis).id, rng.random() < 0.5
+
+    runner.measure("save_kpi_record", lambda args: dm.save_kpi_record(*args),
+                   setup=pick, repeat=SINGLE_OP_RUNS)
+    runner.measure("undo_redo", lambda: (dm.undo(), dm.redo()), repeat=SINGLE_OP_RUNS)
+
+
+def bench_kpi_stats(runner, dm):
+    kpis = dm.data["kpis"]
+    if not kpis:
+        return
+    end = today()
+
+    def completion_rates(manager):
+        for kpi in kpis:
+            manager.get_kpi_completion_rate(kpi.id, end - 29, end)
+
+    # 冷启动：重新载入数据后首次统计，需要建立KPI记录的反向索引和各KPI的统计
+    runner.measure("kpi_completion_rate_cold", completion_rates,
+                   setup=lambda: DataManager(dm.data_file), items=len(kpis))
+    runner.measure("kpi_completion_rate_warm", lambda: completion_rates(dm), items=len(kpis))
+
+    def kpi_summary():
+        # 与KPI总结对话框相同的查询
+        engine = dm.kpi_engine
+        for kpi in kpis:
+            engine.completion_rate(kpi, end - 29, end)
+            engine.last_completed_day(kpi, end)
+            engine.streak(kpi, end)
+
+    runner.measure("kpi_summary", kpi_summary, items=len(kpis))
+
+    def active_kpis():
+        dm.invalidate_kpi_index()
+        for day in range(end - 364, end + 1):
+            dm.get_active_kpis(day)
+
+    runner.measure("kpi_active_365_days", active_kpis, items=365)
+
+
+def bench_summary(runner, dm):
+    projects = list(dm.data["projects"])
+    end = today()
+
+    def summary(aggregates):
+        for name in projects:
+            stats = aggregates.get(name)
+            stats.progress_rate()
+            stats.overdue_count(end)
+
+    runner.measure("summary_cold", lambda: summary(TodoAggregates(dm.data["todos"])),
+                   items=len(dm.data["todos"]))
+    runner.measure("summary_warm", lambda: summary(dm.todo_aggregates), items=len(projects))
+
+
+def bench_export_import(runner, dm, work_dir):
+    snapshot = dm.snapshot()
+    rows = len(snapshot["todos"]) + sum(len(records) for records in snapshot["kpi_records"].values())
+    runner.measure("snapshot", dm.snapshot)
+
+    export_dir = os.path.join(work_dir, "export")
+
+    def clean_export():
+        shutil.rmtree(export_dir, ignore_errors=True)
+
+    runner.measure("export_csv", lambda _: CsvExporter(snapshot).export_to_dir(export_dir),
+                   setup=clean_export, items=rows)
+    archive = os.path.join(work_dir, "export.zip")
+    runner.measure("export_zip", lambda: CsvExporter(snapshot).export_to_archive(archive), items=rows)
+    columnar = os.path.join(work_dir, "export.tkc")
+    runner.measure("export_columnar", lambda: write_columnar(columnar, snapshot), items=rows)
+    runner.measure("read_columnar", lambda: read_columnar(columnar), items=rows)
+
+    clean_export()
+    CsvExporter(snapshot).export_to_dir(export_dir)
+    import_file = os.path.join(work_dir, "import.json")
+
+    def empty_manager():
+        base_name = os.path.splitext(import_file)[0]
+        _remove(import_file, base_name + ".snapshot", base_name + ".journal")
+        manager = DataManager(import_file)
+        # 先导入项目和KPI，计时只包含目标文件
+        CsvImporter(manager, os.path.join(export_dir, "projects.csv")).run()
+        CsvImporter(manager, os.path.join(export_dir, "kpis.csv")).run()
+        return manager
+
+    for name, count in (("todos.csv", len(snapshot["todos"])),
+                        ("kpi_records.csv", rows - len(snapshot["todos"]))):
+        path = os.path.join(export_dir, name)
+        runner.measure(f"import_{name.replace('.csv', '')}",
+                       lambda manager, path=path: CsvImporter(manager, path).run(),
+                       setup=empty_manager, items=count)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DataManager 与KPI统计的基准测试")
+    parser.add_argument("--size", choices=sorted(SIZES), default="medium", help="数据规模")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例的重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="生成数据的随机种子")
+    parser.add_argument("--only", help="只运行名称包含这些字符串的用例，逗号分隔")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="结果文件（JSON Lines，追加写入）")
+    parser.add_argument("--no-save", action="store_true", help="不写入结果文件")
+    args = parser.parse_args(argv)
+
+    projects, todos, kpis, years = SIZES[args.size]
+    dataset = {"suite": "core", "size": args.size, "projects": projects, "todos": todos, "kpis": kpis,
+               "years": years, "seed": args.seed}
+    print(f"生成数据: {dataset}")
+    data = generate_data(projects, todos, kpis, years, seed=args.seed)
+
+    runner = BenchmarkRunner(args.repeat, args.only.split(",") if args.only else None)
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="todo_bench_")
+    try:
+        dm = bench_load_save(runner, work_dir, data)
+        bench_summary(runner, dm)
+        bench_kpi_stats(runner, dm)
+        bench_kpi_records(runner, dm, rng)
+        bench_export_import(runner, dm, work_dir)
+        dm.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return save_and_compare(runner, dataset, args.output, not args.no_save, repeat=args.repeat)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,62 @@
+"""按项目类型汇总的TODO统计
+
+由 DataManager 在每次增删改TODO时增量维护，统计页直接读取，不需要遍历全部TODO。
+"""
+from bisect import bisect_left, insort
+
+
+class ProjectStats:
+    __slots__ = ("open_count", "completed_count", "open_progress", "open_target", "open_deadlines")
+
+    def __init__(self):
+        self.open_count = 0
+        self.completed_count = 0
+        self.open_progress = 0.0    # 进行中TODO的进度之和
+        self.open_target = 0.0      # 进行中TODO的目标之和
+        self.open_deadlines = []    # 进行中TODO的截止日期序号，升序
+
+    def overdue_count(self, today):
+        """截止日期早于 today 的进行中TODO数量"""
+        return bisect_left(self.open_deadlines, today)
+
+    def progress_rate(self):
+        """进行中TODO的整体进度（0-1），没有进行中的TODO时为 None"""
+        return self.open_progress / self.open_target if self.open_target else None
+
+
+class TodoAggregates:
+    def __init__(self, todos=()):
+        self._stats = {}  # 项目类型 -> ProjectStats
+        for todo in todos:
+            self.add(todo)
+
+    def get(self, type_name):
+        """项目类型的统计；没有TODO的类型返回全为0的统计"""
+        return self._stats.get(type_name) or ProjectStats()
+
+    def add(self, todo):
+        """计入一个TODO的当前状态"""
+        stats = self._stats.get(todo.type)
+        if stats is None:
+            stats = self._stats[todo.type] = ProjectStats()
+        if todo.completed:
+            stats.completed_count += 1
+            return
+        stats.open_count += 1
+        stats.open_progress += todo.progress or 0
+        stats.open_target += todo.target
+        insort(stats.open_deadlines, todo.deadline)
+
+    def remove(self, todo):
+        """撤销 add 计入的状态，调用时TODO必须与计入时一致"""
+        stats = self._stats[todo.type]
+        if todo.completed:
+            stats.completed_count -= 1
+            return
+        stats.open_count -= 1
+        stats.open_progress -= todo.progress or 0
+        stats.open_target -= todo.target
+        del stats.open_deadlines[bisect_left(stats.open_deadlines, todo.deadline)]
+        if stats.open_count == 0:
+            # 浮点累加误差清零
+            stats.open_progress = stats.open_target = 0.0
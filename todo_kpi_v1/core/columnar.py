@@ -0,0 +1,340 @@
+"""列式二进制备份格式（.tkc）
+
+不依赖第三方库的紧凑备份格式，适合保存多年的KPI记录：
+
+- 每张表按列存储，列有固定类型：整数、浮点、布尔、日期、字符串
+- 字符串列使用字典编码，只保存一次不同的取值，其余为下标数组
+- 整数列按取值范围选用最窄的整数宽度
+- 日期列保存为相邻差值的整数序列，按日期排序的KPI记录几乎全是0和1
+- 可空列附带空值位图
+- 整个文件体使用 zlib 压缩
+
+文件结构: MAGIC | zlib(表数量 | 表...)
+表: 表名 | 行数 | 列数 | 列...
+列: 列名 | 类型 | 是否有空值 | [空值位图] | 数据
+"""
+import datetime
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from core.csv_exporter import ExportCancelled
+
+MAGIC = b"TKC1"
+FILE_EXTENSION = ".tkc"
+
+COL_INT = 1
+COL_FLOAT = 2
+COL_BOOL = 3
+COL_DATE = 4
+COL_STR = 5
+
+# 表结构: 表名 -> [(字段名, 列类型)]
+SCHEMA = {
+    "projects": [
+        ("name", COL_STR), ("unit", COL_STR), ("progress_type", COL_STR), ("count", COL_INT)
+    ],
+    "todos": [
+        ("name", COL_STR), ("type", COL_STR), ("unit", COL_STR), ("target", COL_FLOAT),
+        ("progress", COL_FLOAT), ("progress_type", COL_STR), ("deadline", COL_DATE),
+        ("completed", COL_BOOL), ("complete_time", COL_DATE)
+    ],
+    "kpis": [
+        ("id", COL_INT), ("name", COL_STR), ("period_type", COL_STR), ("custom_days", COL_INT),
+        ("target", COL_FLOAT), ("unit", COL_STR), ("todo_id", COL_INT),
+        ("duration_type", COL_STR), ("created_at", COL_DATE)
+    ],
+    "kpi_records": [
+        ("date", COL_DATE), ("kpi_id", COL_INT), ("completed", COL_BOOL)
+    ],
+}
+
+_LITTLE_ENDIAN = sys.byteorder == "little"
+CANCEL_CHECK_ROWS = 2000  # 写文件时每处理多少行检查一次是否取消
+
+
+class ColumnarFormatError(ValueError):
+    """文件不是有效的列式备份"""
+
+
+# ---------- 基础编码 ----------
+
+def _pack_str(value):
+    raw = value.encode("utf-8")
+    return struct.pack("<I", len(raw)) + raw
+
+
+def _pack_array(values):
+    if not _LITTLE_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return struct.pack("<cI", values.typecode.encode("ascii"), len(values)) + values.tobytes()
+
+
+def _int_typecode(values):
+    """选择能容纳全部取值的最窄整数类型"""
+    if not values:
+        return "b"
+    low, high = min(values), max(values)
+    for typecode, limit in (("b", 1 << 7), ("h", 1 << 15), ("i", 1 << 31)):
+        if -limit <= low and high < limit:
+            return typecode
+    return "q"
+
+
+def _index_typecode(size):
+    if size <= 0xFF:
+        return "B"
+    if size <= 0xFFFF:
+        return "H"
+    return "I"
+
+
+def _to_ordinal(value):
+    if value in (None, ""):
+        return None
+    return datetime.date.fromisoformat(value).toordinal()
+
+
+def _encode_column(values, col_type):
+    nulls = [value is None or (col_type == COL_DATE and value == "") for value in values]
+    has_nulls = any(nulls)
+    parts = [struct.pack("<BB", col_type, has_nulls)]
+    if has_nulls:
+        bitmap = bytearray((len(values) + 7) // 8)
+        for i, is_null in enumerate(nulls):
+            if is_null:
+                bitmap[i >> 3] |= 1 << (i & 7)
+        parts.append(struct.pack("<I", len(bitmap)) + bytes(bitmap))
+
+    if col_type == COL_INT:
+        ints = [0 if v is None else int(v) for v in values]
+        parts.append(_pack_array(array(_int_typecode(ints), ints)))
+    elif col_type == COL_FLOAT:
+        parts.append(_pack_array(array("d", (0.0 if v is None else float(v) for v in values))))
+    elif col_type == COL_BOOL:
+        parts.append(_pack_array(array("B", (1 if v else 0 for v in values))))
+    elif col_type == COL_DATE:
+        # 日期差值编码
+        deltas = []
+        previous = 0
+        ordinal_cache = {}
+        for value in values:
+            if value in (None, ""):
+                deltas.append(0)
+                continue
+            ordinal = ordinal_cache.get(value)
+            if ordinal is None:
+                ordinal = ordinal_cache[value] = _to_ordinal(value)
+            deltas.append(ordinal - previous)
+            previous = ordinal
+        parts.append(_pack_array(array(_int_typecode(deltas), deltas)))
+    elif col_type == COL_STR:
+        # 字典编码
+        dictionary = {}
+        indices = []
+        for value in values:
+            value = "" if value is None else str(value)
+            index = dictionary.get(value)
+            if index is None:
+                index = dictionary[value] = len(dictionary)
+            indices.append(index)
+        parts.append(struct.pack("<I", len(dictionary)))
+        parts.extend(_pack_str(value) for value in dictionary)
+        parts.append(_pack_array(array(_index_typecode(len(dictionary)), indices)))
+    else:
+        raise ValueError(f"未知的列类型: {col_type}")
+    return b"".join(parts)
+
+
+class _Reader:
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer)
+        self.offset = 0
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.buffer, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def read_bytes(self, size):
+        if self.offset + size > len(self.buffer):
+            raise ColumnarFormatError("文件内容不完整")
+        data = self.buffer[self.offset:self.offset + size]
+        self.offset += size
+        return data
+
+    def read_str(self):
+        size, = self.unpack("<I")
+        return str(self.read_bytes(size), "utf-8")
+
+    def read_array(self):
+        typecode, length = self.unpack("<cI")
+        values = array(typecode.decode("ascii"))
+        values.frombytes(self.read_bytes(length * values.itemsize))
+        if not _LITTLE_ENDIAN:
+            values.byteswap()
+        return values
+
+
+def _decode_column(reader, row_count):
+    col_type, has_nulls = reader.unpack("<BB")
+    nulls = None
+    if has_nulls:
+        size, = reader.unpack("<I")
+        bitmap = reader.read_bytes(size)
+        nulls = [bool(bitmap[i >> 3] & (1 << (i & 7))) for i in range(row_count)]
+
+    if col_type == COL_INT:
+        values = reader.read_array().tolist()
+    elif col_type == COL_FLOAT:
+        values = reader.read_array().tolist()
+    elif col_type == COL_BOOL:
+        values = [bool(v) for v in reader.read_array()]
+    elif col_type == COL_DATE:
+        values = []
+        ordinal = 0
+        date_cache = {}
+        for delta in reader.read_array():
+            ordinal += delta
+            date_str = date_cache.get(ordinal)
+            if date_str is None:
+                date_str = date_cache[ordinal] = datetime.date.fromordinal(ordinal).isoformat() if ordinal > 0 else ""
+            values.append(date_str)
+    elif col_type == COL_STR:
+        size, = reader.unpack("<I")
+        dictionary = [reader.read_str() for _ in range(size)]
+        values = [dictionary[index] for index in reader.read_array()]
+    else:
+        raise ColumnarFormatError(f"未知的列类型: {col_type}")
+
+    if len(values) != row_count:
+        raise ColumnarFormatError("列长度与行数不一致")
+    if nulls:
+        values = [None if is_null else value for value, is_null in zip(values, nulls)]
+    return values
+
+
+# ---------- 表与数据的转换 ----------
+
+def _check_cancelled(is_cancelled):
+    if is_cancelled and is_cancelled():
+        raise ExportCancelled()
+
+
+def _table_rows(data, is_cancelled=None):
+    """把JSON布局的数据转换为各表的行"""
+    yield "projects", [
+        {"name": name, **info} for name, info in data["projects"].items()
+    ]
+    yield "todos", data["todos"]
+    yield "kpis", data["kpis"]
+    # KPI记录按日期排序，使日期差值编码尽量紧凑
+    rows = []
+    next_check = 0
+    for date_str in sorted(data["kpi_records"]):
+        if len(rows) >= next_check:
+            _check_cancelled(is_cancelled)
+            next_check = len(rows) + CANCEL_CHECK_ROWS
+        rows.extend(
+            {"date": date_str, "kpi_id": kpi_id, "completed": completed}
+            for kpi_id, completed in data["kpi_records"][date_str].items()
+        )
+    yield "kpi_records", rows
+
+
+def _column_values(rows, field, is_cancelled):
+    values = []
+    for start in range(0, len(rows), CANCEL_CHECK_ROWS):
+        _check_cancelled(is_cancelled)
+        values.extend(row.get(field) for row in rows[start:start + CANCEL_CHECK_ROWS])
+    return values
+
+
+def write_columnar(path, data, on_progress=None, is_cancelled=None):
+    """把数据写为列式备份文件，失败或取消时删除写了一半的文件
+
+    Args:
+        path (str): 目标文件路径
+        data (dict): DataManager.snapshot() 返回的数据快照
+        on_progress (callable): 进度回调，参数为0-100的百分比
+        is_cancelled (callable): 返回True时中止写入，抛出 ExportCancelled
+    """
+    compressor = zlib.compressobj(6)
+    try:
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(compressor.compress(struct.pack("<I", len(SCHEMA))))
+            for table_no, (table, rows) in enumerate(_table_rows(data, is_cancelled), 1):
+                columns = SCHEMA[table]
+                header = _pack_str(table) + struct.pack("<IH", len(rows), len(columns))
+                f.write(compressor.compress(header))
+                for field, col_type in columns:
+                    values = _column_values(rows, field, is_cancelled)
+                    f.write(compressor.compress(_pack_str(field) + _encode_column(values, col_type)))
+                if on_progress:
+                    on_progress(table_no * 100 // len(SCHEMA))
+            f.write(compressor.flush())
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return path
+
+
+def read_columnar(path):
+    """读取列式备份文件，返回与 data.json 相同布局的 projects/todos/kpis/kpi_records"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ColumnarFormatError("不是有效的列式备份文件")
+        try:
+            body = zlib.decompress(f.read())
+        except zlib.error as e:
+            raise ColumnarFormatError(f"备份文件已损坏: {str(e)}")
+
+    reader = _Reader(body)
+    tables = {}
+    try:
+        table_count, = reader.unpack("<I")
+        for _ in range(table_count):
+            table = reader.read_str()
+            row_count, column_count = reader.unpack("<IH")
+            columns = {}
+            for _ in range(column_count):
+                field = reader.read_str()
+                columns[field] = _decode_column(reader, row_count)
+            tables[table] = (row_count, columns)
+    except struct.error:
+        raise ColumnarFormatError("文件内容不完整")
+
+    def rows(table):
+        row_count, columns = tables.get(table, (0, {}))
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())] if names else []
+
+    projects = {}
+    for row in rows("projects"):
+        name = row.pop("name")
+        projects[name] = row
+
+    todos = rows("todos")
+    for todo in todos:
+        if not todo["completed"] and not todo.get("complete_time"):
+            todo.pop("complete_time", None)
+        elif todo.get("complete_time") is None:
+            todo["complete_time"] = ""
+
+    kpi_records = {}
+    row_count, columns = tables.get("kpi_records", (0, {}))
+    if row_count:
+        for date_str, kpi_id, completed in zip(columns["date"], columns["kpi_id"], columns["completed"]):
+            kpi_records.setdefault(date_str, {})[kpi_id] = completed
+
+    return {
+        "projects": projects,
+        "todos": todos,
+        "kpis": rows("kpis"),
+        "kpi_records": kpi_records
+    }
@@ -0,0 +1,161 @@
+import csv
+import io
+import os
+import shutil
+import zipfile
+
+WRITE_BUFFER_SIZE = 1 << 16  # 写文件缓冲区大小
+
+
+class ExportCancelled(Exception):
+    """用户取消导出"""
+
+
+class CsvExporter:
+    """把数据导出为 projects/todos/kpis/kpi_records 四个CSV文件
+
+    可导出到目录，也可写成一个压缩包。只读取传入的数据快照，可以在后台线程中运行。
+    """
+    PROGRESS_STEP = 2000  # 每写多少行汇报一次进度
+
+    def __init__(self, data, on_progress=None, is_cancelled=None):
+        """
+        Args:
+            data (dict): DataManager.snapshot() 返回的数据快照
+            on_progress (callable): 进度回调，参数为0-100的百分比
+            is_cancelled (callable): 返回True时中止导出
+        """
+        self.data = data
+        self.on_progress = on_progress
+        self.is_cancelled = is_cancelled
+        self.total_rows = (
+            len(data["projects"]) + len(data["todos"]) + len(data["kpis"])
+            + sum(len(records) for records in data["kpi_records"].values())
+        )
+        self._written_rows = 0
+
+    def export_to_dir(self, export_dir):
+        """失败或取消时只删除本次写出的内容：目录是本次创建的则整个删除，否则只删除写出的文件"""
+        created = not os.path.isdir(export_dir)
+        os.makedirs(export_dir, exist_ok=True)
+        written = []
+        try:
+            for file_name, fieldnames, rows in self._tables():
+                path = os.path.join(export_dir, file_name)
+                written.append(path)
+                with open(path, 'w', newline='', encoding='utf-8-sig', buffering=WRITE_BUFFER_SIZE) as f:
+                    self._write_table(f, fieldnames, rows)
+        except BaseException:
+            if created:
+                shutil.rmtree(export_dir, ignore_errors=True)
+            else:
+                for path in written:
+                    if os.path.exists(path):
+                        os.remove(path)
+            raise
+        self._report_progress(100)
+        return export_dir
+
+    def export_to_archive(self, archive_path):
+        try:
+            with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for file_name, fieldnames, rows in self._tables():
+                    with archive.open(file_name, 'w') as raw:
+                        f = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+                        self._write_table(f, fieldnames, rows)
+                        f.flush()
+                        f.detach()  # 由 archive.open 负责关闭条目
+        except BaseException:
+            if os.path.exists(archive_path):
+                os.remove(archive_path)
+            raise
+        self._report_progress(100)
+        return archive_path
+
+    def _write_table(self, f, fieldnames, rows):
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.PROGRESS_STEP:
+                writer.writerows(batch)
+                self._advance(len(batch))
+                batch.clear()
+        writer.writerows(batch)
+        self._advance(len(batch))
+
+    def _advance(self, rows):
+        if self.is_cancelled and self.is_cancelled():
+            raise ExportCancelled()
+        self._written_rows += rows
+        if self.total_rows:
+            self._report_progress(min(99, self._written_rows * 100 // self.total_rows))
+
+    def _report_progress(self, percent):
+        if self.on_progress:
+            self.on_progress(percent)
+
+    def _tables(self):
+        yield "projects.csv", ["类型", "单位", "进度类型", "完成数量"], self._project_rows()
+        yield "todos.csv", [
+            "名称", "类型", "目标值", "当前进度", "进度类型",
+            "截止时间", "完成状态", "完成时间"
+        ], self._todo_rows()
+        yield "kpis.csv", [
+            "ID", "名称", "周期类型", "自定义天数", "目标", "关联Todo", "创建时间"
+        ], self._kpi_rows()
+        yield "kpi_records.csv", ["日期", "KPI ID", "KPI名称", "完成状态"], self._kpi_record_rows()
+
+    def _project_rows(self):
+        for name, info in self.data["projects"].items():
+            yield {
+                "类型": name,
+                "单位": info["unit"],
+                "进度类型": info["progress_type"],
+                "完成数量": info["count"]
+            }
+
+    def _todo_rows(self):
+        for todo in self.data["todos"]:
+            yield {
+                "名称": todo["name"],
+                "类型": todo["type"],
+                "目标值": todo["target"],
+                "当前进度": todo["progress"],
+                "进度类型": todo["progress_type"],
+                "截止时间": todo["deadline"],
+                "完成状态": "已完成" if todo["completed"] else "进行中",
+                "完成时间": todo.get("complete_time", "")
+            }
+
+    def _kpi_rows(self):
+        todos = self.data["todos"]
+        for kpi in self.data["kpis"]:
+            todo_name = "无"
+            if kpi["todo_id"] is not None and kpi["todo_id"] < len(todos):
+                todo = todos[kpi["todo_id"]]
+                todo_name = f"{todo['name']} ({todo['type']})"
+            yield {
+                "ID": kpi["id"],
+                "名称": kpi["name"],
+                "周期类型": kpi["period_type"],
+                "自定义天数": kpi["custom_days"] or "",
+                "目标": kpi["target"],
+                "关联Todo": todo_name,
+                "创建时间": kpi["created_at"]
+            }
+
+    def _kpi_record_rows(self):
+        kpi_names = {kpi["id"]: kpi["name"] for kpi in self.data["kpis"]}
+        for date_str, records in self.data["kpi_records"].items():
+            for kpi_id, completed in records.items():
+                name = kpi_names.get(kpi_id)
+                if name is None:
+                    continue
+                yield {
+                    "日期": date_str,
+                    "KPI ID": kpi_id,
+                    "KPI名称": name,
+                    "完成状态": "已完成" if completed else "未完成"
+                }
@@ -0,0 +1,256 @@
+import csv
+import os
+from itertools import islice
+
+from core.dates import date_to_day, today
+from core.models import ProgressType, DurationType
+from core.records import Project, Todo, Kpi
+
+
+class ImportCancelled(Exception):
+    """用户取消导入"""
+
+
+class ImportResult:
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.added = 0
+        self.updated = 0
+        self.skipped = 0
+        self.warnings = []
+
+
+class CsvImporter:
+    """流式导入导出的CSV文件
+
+    按批读取并校验行数据，校验通过的数据先暂存，全部读完后在一个事务中应用并只写盘一次。
+    读取过程中出错或被取消时，已有数据不会被修改。
+    """
+    BATCH_SIZE = 1000
+    # 各文件的必要字段，与 CsvExporter 写出的表头对应
+    REQUIRED_FIELDS = {
+        "projects.csv": ["类型", "单位", "完成数量"],
+        "todos.csv": ["名称", "类型", "目标值", "截止时间", "完成状态"],
+        "kpis.csv": ["ID", "名称", "周期类型", "目标", "创建时间"],
+        "kpi_records.csv": ["日期", "KPI ID", "完成状态"],
+    }
+
+    def __init__(self, data_mgr, file_path, on_progress=None, batch_size=BATCH_SIZE):
+        """
+        Args:
+            data_mgr (DataManager): 导入目标
+            file_path (str): CSV文件路径，文件名决定数据类型（projects/todos/kpis/kpi_records.csv）
+            on_progress (callable): 进度回调，参数为0-100的百分比，返回False时取消导入
+            batch_size (int): 每批校验的行数
+        """
+        self.data_mgr = data_mgr
+        self.file_path = file_path
+        self.on_progress = on_progress
+        self.batch_size = batch_size
+        self.file_name = os.path.basename(file_path).lower()
+
+        self._stagers = {
+            "projects.csv": (self._stage_projects, self._apply_projects),
+            "todos.csv": (self._stage_todos, self._apply_todos),
+            "kpis.csv": (self._stage_kpis, self._apply_kpis),
+            "kpi_records.csv": (self._stage_kpi_records, self._apply_kpi_records),
+        }
+        if self.file_name not in self._stagers:
+            raise ValueError(f"无法识别的数据文件: {self.file_name}")
+
+    def run(self):
+        stage, apply = self._stagers[self.file_name]
+        result = ImportResult(self.file_name)
+        self._prepare()
+
+        total_size = os.path.getsize(self.file_path) or 1
+        line_no = 1  # 表头为第1行
+        with open(self.file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            while True:
+                batch = list(islice(reader, self.batch_size))
+                if not batch:
+                    break
+                stage(batch, line_no + 1, result)
+                line_no += len(batch)
+                # 文本读取是分块预读的，底层字节位置足以反映进度
+                self._report_progress(min(99, f.buffer.tell() * 100 // total_size))
+
+        self._report_progress(100)
+        with self.data_mgr.transaction("导入CSV"):
+            apply(result)
+            self.data_mgr.save()
+        return result
+
+    def _report_progress(self, percent):
+        if self.on_progress and self.on_progress(percent) is False:
+            raise ImportCancelled()
+
+    def _prepare(self):
+        data = self.data_mgr.data
+        self._projects = {}
+        self._todos = []
+        # 以(名称, 类型)去重，包含已有数据和本次暂存的数据
+        self._todo_keys = {(todo.name, todo.type) for todo in data["todos"]}
+        self._kpis = []
+        self._kpi_ids = {kpi.id for kpi in data["kpis"]}
+        # 未完成Todo按名称索引，同名时取第一个
+        self._open_todo_index = {}
+        for i, todo in enumerate(data["todos"]):
+            if not todo.completed:
+                self._open_todo_index.setdefault(todo.name, i)
+        self._kpi_records = {}
+        self._valid_dates = {}
+
+    @staticmethod
+    def _require(row, line, fields):
+        for field in fields:
+            if not row.get(field):
+                raise ValueError(f"第{line}行缺少必要字段: {field}")
+
+    def _normalize_date(self, value, line):
+        """校验 yyyy-MM-dd 日期并转为日期序号，同一日期字符串只解析一次"""
+        day = self._valid_dates.get(value)
+        if day is None:
+            try:
+                day = date_to_day(value.strip())
+            except ValueError:
+                raise ValueError(f"第{line}行日期格式错误: {value}")
+            self._valid_dates[value] = day
+        return day
+
+    # ---------- projects.csv ----------
+
+    def _stage_projects(self, batch, first_line, result):
+        for line, row in enumerate(batch, first_line):
+            self._require(row, line, self.REQUIRED_FIELDS["projects.csv"])
+            try:
+                count = int(row["完成数量"])
+            except ValueError:
+                raise ValueError(f"第{line}行完成数量必须是整数")
+            self._projects[row["类型"]] = Project(
+                name=row["类型"],
+                unit=row["单位"],
+                count=count,
+                progress_type=row.get("进度类型") or ProgressType.ABSOLUTE
+            )
+
+    def _apply_projects(self, result):
+        projects = self.data_mgr.data["projects"]
+        for name, project in self._projects.items():
+            if name in projects:
+                self.data_mgr.set_project(project)
+                result.updated += 1
+            else:
+                self.data_mgr.add_project(project)
+                result.added += 1
+
+    # ---------- todos.csv ----------
+
+    def _stage_todos(self, batch, first_line, result):
+        projects = self.data_mgr.data["projects"]
+        for line, row in enumerate(batch, first_line):
+            self._require(row, line, self.REQUIRED_FIELDS["todos.csv"])
+            type_name = row["类型"]
+            if type_name not in projects:
+                raise ValueError(f"第{line}行项目类型'{type_name}'尚未定义")
+
+            key = (row["名称"], type_name)
+            if key in self._todo_keys:
+                result.skipped += 1
+                continue
+
+            is_completed = row["完成状态"].strip() == "已完成"
+            complete_time = None
+            if is_completed:
+                # 如果已完成但没有完成时间，使用当前日期
+                complete_str = (row.get("完成时间") or "").strip()
+                complete_time = self._normalize_date(complete_str, line) if complete_str else today()
+
+            try:
+                target = float(row["目标值"])
+                progress = float(row["当前进度"]) if row.get("当前进度") else 0.0
+            except ValueError:
+                raise ValueError(f"第{line}行目标值或当前进度必须是数字")
+
+            # 单位和进度类型以已存在的项目为准
+            project = projects[type_name]
+            self._todo_keys.add(key)
+            self._todos.append(Todo(
+                name=row["名称"],
+                type=type_name,
+                unit=project.unit,
+                target=target,
+                progress=progress,
+                progress_type=project.progress_type,
+                deadline=self._normalize_date(row["截止时间"], line),
+                completed=is_completed,
+                complete_time=complete_time
+            ))
+
+    def _apply_todos(self, result):
+        for todo in self._todos:
+            self.data_mgr.add_todo(todo)  # 已完成的TODO会计入项目完成数量
+        result.added += len(self._todos)
+
+    # ---------- kpis.csv ----------
+
+    def _stage_kpis(self, batch, first_line, result):
+        todos = self.data_mgr.data["todos"]
+        for line, row in enumerate(batch, first_line):
+            self._require(row, line, self.REQUIRED_FIELDS["kpis.csv"])
+            try:
+                kpi_id = int(row["ID"])
+                custom_days = int(row["自定义天数"]) if row.get("自定义天数") else None
+                target = float(row["目标"])
+            except ValueError:
+                raise ValueError(f"第{line}行ID、自定义天数或目标格式错误")
+
+            if kpi_id in self._kpi_ids:
+                result.skipped += 1
+                continue
+
+            # 解析关联的Todo
+            todo_str = row.get("关联Todo") or "无"
+            todo_id = None
+            if todo_str != "无":
+                todo_id = self._open_todo_index.get(todo_str.split(" (")[0])
+            if todo_id is None:
+                result.warnings.append(f"第{line}行关联的Todo项'{todo_str}'不存在，已跳过")
+                result.skipped += 1
+                continue
+
+            self._kpi_ids.add(kpi_id)
+            self._kpis.append(Kpi(
+                id=kpi_id,
+                name=row["名称"],
+                period_type=row["周期类型"],
+                custom_days=custom_days,
+                target=target,
+                unit=todos[todo_id].unit,
+                todo_id=todo_id,
+                duration_type=DurationType.FOREVER.value,  # 导出文件中不含持续时间
+                created_at=self._normalize_date(row["创建时间"], line)
+            ))
+
+    def _apply_kpis(self, result):
+        for kpi in self._kpis:
+            self.data_mgr.add_kpi(kpi)
+        result.added += len(self._kpis)
+
+    # ---------- kpi_records.csv ----------
+
+    def _stage_kpi_records(self, batch, first_line, result):
+        for line, row in enumerate(batch, first_line):
+            self._require(row, line, self.REQUIRED_FIELDS["kpi_records.csv"])
+            day = self._normalize_date(row["日期"], line)
+            try:
+                kpi_id = int(row["KPI ID"])
+            except ValueError:
+                raise ValueError(f"第{line}行KPI ID必须是整数")
+            self._kpi_records.setdefault(day, {})[kpi_id] = row["完成状态"] == "已完成"
+
+    def _apply_kpi_records(self, result):
+        for day, records in self._kpi_records.items():
+            self.data_mgr.update_kpi_records(day, records)
+            result.added += len(records)
@@ -0,0 +1,621 @@
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+from core.models import ProgressType
+from core.dates import day_to_date
+from core.kpi_records import KpiRecordStore
+from core.kpi_index import KpiWindowIndex
+from core.kpi_engine import KpiEngine
+from core.aggregates import TodoAggregates
+from core.oplog import OperationLog, JOURNAL_CHECKPOINT_OPS, file_stamp
+from core.records import Project, Todo, Kpi, records_from_dict, records_to_dict
+from core.snapshot import write_snapshot, open_snapshot, SnapshotError
+
+
+class DataManager:
+    """数据读写
+
+    所有修改都表示为 (操作名, 参数...) 形式的操作，由 _apply 执行并返回逆操作（见 core.oplog）。
+    逆操作用于撤销/重做；操作本身追加到操作日志，日常保存不必重写整个 data.json。
+    修改在 _lock 下进行，后台线程可以在 snapshot() 中读取一致的数据。
+    """
+
+    def __init__(self, data_file):
+        self.data_file = data_file
+        base_name = os.path.splitext(data_file)[0]
+        self.snapshot_file = base_name + ".snapshot"
+        self.oplog = OperationLog(base_name + ".journal")
+        self._lock = threading.RLock()
+        self._transaction_depth = 0
+        self._transaction_steps = None  # 事务中已执行的 [(说明, 逆操作)]
+        self._save_pending = False
+        self._full_save_needed = False  # 有未能写入操作日志的修改，下次保存时重写 data.json
+        self._window_size_changed = False
+        # KPI记录单独保存在 kpi_records 中；projects/todos/kpis 为 core.records 中的记录对象
+        self.data, self.kpi_records = self._load_initial_data()
+        self._kpi_window_index = None  # KPI列表变化后置空，下次查询时重建
+        self.kpi_engine = KpiEngine(self.kpi_records)
+        self._todo_aggregates = None  # 按项目类型汇总的TODO统计，首次查询时建立
+        if self.kpi_records.compacted_entries:
+            # 旧数据中的未完成记录和空日期已在载入时丢弃，下次保存时重写 data.json
+            logging.info(f"已清理{self.kpi_records.compacted_entries}条空的KPI记录")
+            self._full_save_needed = True
+        self._replay_journal()
+
+        self.window_size = self.data.get("window_size", [800, 500])
+
+    def _load_initial_data(self):
+        # 快照与 data.json 一致时直接映射快照，KPI记录按需读取
+        try:
+            meta, base = open_snapshot(self.snapshot_file, self.data_file)
+        except SnapshotError:
+            return self._load_json()
+        try:
+            return records_from_dict(meta), KpiRecordStore(base)
+        except ValueError:
+            base.close()
+            return self._load_json()
+
+    def _load_json(self):
+        """载入 data.json。文件是用户自己的数据，载入时不因个别无效记录失败：
+
+        无效的记录跳过并记录日志，文件无法解析时使用默认数据；这两种情况都先把原文件
+        复制为 data.json.bak，下次保存重写 data.json 后仍可从中找回。
+        """
+        try:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return self._default_data(), KpiRecordStore()
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            logging.error(f"数据文件无法解析，使用默认数据: {str(e)}")
+            return self._default_data_after_backup()
+        if not isinstance(data, dict):
+            logging.error("数据文件的格式错误，使用默认数据")
+            return self._default_data_after_backup()
+
+        errors = []
+        records = data.pop("kpi_records", {})
+        if not isinstance(records, dict):
+            errors.append("kpi_records 的格式错误，应为对象")
+            records = {}
+        result = records_from_dict(data, errors), KpiRecordStore.from_dict(records, errors)
+        if errors:
+            for message in errors:
+                logging.warning(f"载入数据: {message}")
+            self._backup_data_file()
+            self._full_save_needed = True
+        return result
+
+    def _default_data_after_backup(self):
+        self._backup_data_file()
+        self._full_save_needed = True
+        return self._default_data(), KpiRecordStore()
+
+    def _backup_data_file(self):
+        try:
+            shutil.copy2(self.data_file, self.data_file + ".bak")
+        except OSError as e:
+            logging.error(f"备份数据文件失败: {str(e)}")
+
+    @staticmethod
+    def _default_data():
+        projects = [("读书", "页"), ("课程", "课"), ("运动", "分钟"), ("写作", "字"), ("编程", "小时")]
+        return {
+            "projects": {
+                name: Project(name, unit, 0, ProgressType.ABSOLUTE) for name, unit in projects
+            },
+            "todos": [],
+            "kpis": [],
+            "window_size": [800, 500]
+        }
+
+    def _replay_journal(self):
+        """重放上次检查点之后记录在操作日志中的修改"""
+        stamp = file_stamp(self.data_file)
+        if stamp is None:
+            self._full_save_needed = True  # data.json 尚不存在，首次保存时写出
+            return
+        ops = self.oplog.read(stamp)
+        if ops is None:
+            self.oplog.reset(stamp)
+            return
+        for line_no, op in enumerate(ops, 2):
+            try:
+                self._apply(op)
+            except (AttributeError, LookupError, TypeError, ValueError) as e:
+                logging.error(f"重放操作日志第{line_no}行失败，已忽略之后的内容: {str(e)}")
+                self._full_save_needed = True
+                break
+        if self.oplog.damaged:
+            self._full_save_needed = True
+
+    def save(self, window_size=None):
+        if window_size and window_size != self.data.get("window_size"):
+            self.data["window_size"] = window_size
+            self._window_size_changed = True
+        if self._transaction_depth:
+            # 事务中只记录待保存，退出事务时统一写盘
+            self._save_pending = True
+            return
+        if self._window_size_changed:
+            # 连续调整窗口时只记录最终尺寸
+            self._window_size_changed = False
+            self._journal(("set_window_size", self.data["window_size"]))
+        if (self._full_save_needed
+                or self.oplog.journal_length + self.oplog.pending_count() > JOURNAL_CHECKPOINT_OPS):
+            self.checkpoint()
+        else:
+            self.oplog.flush()
+
+    def checkpoint(self):
+        """重写 data.json 并清空操作日志"""
+        with open(self.data_file, 'w', encoding='utf-8') as f:
+            self._write_json(f)
+        self.oplog.reset(file_stamp(self.data_file))
+        self._full_save_needed = False
+
+    def _write_json(self, f):
+        """按 data.json 的布局写出数据，KPI记录逐日写出，不在内存中拼出完整字典"""
+        text = json.dumps(records_to_dict(self.data), ensure_ascii=False, indent=4)
+        f.write(text[:-2] + ',\n    "kpi_records": {')  # 去掉结尾的 "\n}"，在末尾追加 kpi_records
+        separator = "\n"
+        for date_str, records in self.kpi_records.items():
+            day_json = json.dumps({str(kpi_id): completed for kpi_id, completed in records.items()})
+            f.write(f'{separator}        "{date_str}": {day_json}')
+            separator = ",\n"
+        f.write("\n    }\n}" if separator != "\n" else "}\n}")
+
+    def close(self):
+        """退出前调用：重写 data.json 和快照，下次启动时可直接映射快照"""
+        with self._lock:
+            # 撤销记录可能引用着映射旧快照的KPI记录，先释放
+            self.oplog.clear_history()
+            # 快照与 data.json 对应，日志中不能留有快照之外的修改
+            self._full_save_needed = True
+            self.save()
+            temp_file = self.snapshot_file + ".tmp"
+            try:
+                write_snapshot(temp_file, records_to_dict(self.data), self.kpi_records.iter_days(), self.data_file)
+            except OSError as e:
+                logging.error(f"写入数据快照失败: {str(e)}")
+                return
+
+            # Windows 下不能替换仍被映射的文件，先释放旧快照，再从新快照重新映射
+            self.kpi_records.close()
+            snapshot_file = self.snapshot_file
+            try:
+                os.replace(temp_file, self.snapshot_file)
+            except OSError as e:
+                logging.error(f"替换数据快照失败: {str(e)}")
+                snapshot_file = temp_file
+            try:
+                self.kpi_records = KpiRecordStore(open_snapshot(snapshot_file, self.data_file)[1])
+            except SnapshotError:
+                self.data, self.kpi_records = self._load_json()
+                self.invalidate_kpi_index()
+                self._todo_aggregates = None
+            # 记录内容不变，已有的统计仍然有效，只需指向新的记录
+            self.kpi_engine.records = self.kpi_records
+
+    @contextmanager
+    def transaction(self, label=None):
+        """批量修改数据：期间的 save() 合并为退出时的一次写盘，全部修改作为一步撤销
+
+        发生异常时按相反顺序撤回已执行的修改，不写盘。
+        """
+        if self._transaction_depth:
+            self._transaction_depth += 1
+            try:
+                yield self
+            finally:
+                self._transaction_depth -= 1
+            return
+
+        self._transaction_depth = 1
+        self._transaction_steps = steps = []
+        try:
+            yield self
+        except Exception:
+            self._transaction_steps = None
+            for _, inverse in reversed(steps):
+                self._apply(inverse)
+                self._journal(inverse)
+            self._save_pending = False
+            raise
+        finally:
+            self._transaction_depth = 0
+            self._transaction_steps = None
+        if steps:
+            inverses = [inverse for _, inverse in reversed(steps)]
+            self.oplog.record(label or steps[0][0], inverses[0] if len(inverses) == 1 else ("batch", inverses))
+        if self._save_pending:
+            self._save_pending = False
+            self.save()
+
+    def snapshot(self):
+        """复制一份当前数据，供后台线程只读使用；可在后台线程中调用，复制期间界面线程的修改会等待"""
+        with self._lock:
+            data = records_to_dict(self.data)
+            return {
+                "projects": data["projects"],
+                "todos": data["todos"],
+                "kpis": data["kpis"],
+                "kpi_records": self.kpi_records.to_dict()
+            }
+
+    def replace_data(self, data):
+        """用备份数据替换项目、TODO、KPI及KPI记录，窗口尺寸等设置保持不变，可撤销
+
+        Args:
+            data (dict): data.json 布局的数据，字段不完整时抛出 ValueError 且不修改现有数据
+        """
+        records = records_from_dict(data)
+        store = KpiRecordStore.from_dict(data["kpi_records"])
+        self._do(("batch", [
+            ("set_projects", [[name, project.to_dict()] for name, project in records["projects"].items()]),
+            ("set_todos", [todo.to_dict() for todo in records["todos"]]),
+            ("restore_kpis", records["kpis"], store),
+        ]), "恢复备份")
+        self.save()
+
+    # ---------- 撤销/重做 ----------
+
+    def undo(self):
+        """撤销最近一步修改，返回该步的说明；没有可撤销的修改时返回 None"""
+        if self._transaction_depth or not self.oplog.can_undo():
+            return None
+        label, inverse = self.oplog.pop_undo()
+        self.oplog.push_redo(label, self._apply(inverse))
+        self._journal(inverse)
+        return label
+
+    def redo(self):
+        """重做最近撤销的一步，返回该步的说明；没有可重做的修改时返回 None"""
+        if self._transaction_depth or not self.oplog.can_redo():
+            return None
+        label, op = self.oplog.pop_redo()
+        self.oplog.push_undo(label, self._apply(op))
+        self._journal(op)
+        return label
+
+    def undo_label(self):
+        return self.oplog.undo_label()
+
+    def redo_label(self):
+        return self.oplog.redo_label()
+
+    # ---------- 操作 ----------
+    # 每个 _op_xxx 执行一种操作并返回逆操作。操作参数只使用 JSON 可表示的值时可写入操作日志，
+    # 日期以 to_dict 中的字符串或日期序号表示
+
+    def _apply(self, op):
+        name, *args = op
+        with self._lock:
+            return getattr(self, "_op_" + name)(*args)
+
+    def _journal(self, op):
+        if not self._full_save_needed and not self.oplog.append(op):
+            self._full_save_needed = True
+
+    def _do(self, op, label):
+        """执行一条操作并记入撤销栈（事务中则记入事务）"""
+        self._done(op, self._apply(op), label)
+
+    def _done(self, op, inverse, label):
+        self._journal(op)
+        if self._transaction_steps is not None:
+            self._transaction_steps.append((label, inverse))
+        else:
+            self.oplog.record(label, inverse)
+
+    def _op_batch(self, ops):
+        inverses = []
+        try:
+            for op in ops:
+                inverses.append(self._apply(op))
+        except Exception:
+            for inverse in reversed(inverses):
+                self._apply(inverse)
+            raise
+        return ("batch", inverses[::-1])
+
+    def _op_set_window_size(self, size):
+        old = self.data.get("window_size")
+        self.data["window_size"] = size
+        return ("set_window_size", old)
+
+    def _op_add_project(self, name, fields, position=None):
+        projects = self.data["projects"]
+        if name in projects:
+            return self._op_set_project(name, fields)
+        project = Project.from_dict(name, fields)
+        if position is None or position >= len(projects):
+            projects[name] = project
+        else:
+            items = list(projects.items())
+            items.insert(position, (name, project))
+            projects.clear()
+            projects.update(items)
+        return ("delete_project", name)
+
+    def _op_delete_project(self, name):
+        projects = self.data["projects"]
+        position = list(projects).index(name)
+        return ("add_project", name, projects.pop(name).to_dict(), position)
+
+    def _op_set_project(self, name, fields):
+        projects = self.data["projects"]
+        old = projects[name].to_dict()
+        projects[name] = Project.from_dict(name, fields)
+        return ("set_project", name, old)
+
+    def _op_set_projects(self, items):
+        projects = self.data["projects"]
+        old = [[name, project.to_dict()] for name, project in projects.items()]
+        projects.clear()
+        projects.update((name, Project.from_dict(name, fields)) for name, fields in items)
+        return ("set_projects", old)
+
+    def _op_add_completion(self, type_name, delta):
+        project = self.data["projects"].get(type_name)
+        if project is None:
+            return ("add_completion", type_name, 0)
+        project.count += delta
+        return ("add_completion", type_name, -delta)
+
+    def _op_insert_todo(self, index, fields):
+        todo = Todo.from_dict(fields)
+        todos = self.data["todos"]
+        if index is None:
+            index = len(todos)
+        todos.insert(index, todo)
+        if self._todo_aggregates is not None:
+            self._todo_aggregates.add(todo)
+        return ("delete_todo", index)
+
+    def _op_delete_todo(self, index):
+        todo = self.data["todos"].pop(index)
+        if self._todo_aggregates is not None:
+            self._todo_aggregates.remove(todo)
+        return ("insert_todo", index, todo.to_dict())
+
+    def _op_set_todo(self, index, fields):
+        todos = self.data["todos"]
+        old, todo = todos[index], Todo.from_dict(fields)
+        todos[index] = todo
+        if self._todo_aggregates is not None:
+            self._todo_aggregates.remove(old)
+            self._todo_aggregates.add(todo)
+        return ("set_todo", index, old.to_dict())
+
+    def _op_set_todos(self, items):
+        old = [todo.to_dict() for todo in self.data["todos"]]
+        self.data["todos"] = [Todo.from_dict(fields) for fields in items]
+        self._todo_aggregates = None
+        return ("set_todos", old)
+
+    def _op_insert_kpi(self, position, fields):
+        kpis = self.data["kpis"]
+        if position is None:
+            position = len(kpis)
+        kpis.insert(position, Kpi.from_dict(fields))
+        self.invalidate_kpi_index()
+        return ("pop_kpi", position)
+
+    def _op_pop_kpi(self, position):
+        kpi = self.data["kpis"].pop(position)
+        self.invalidate_kpi_index()
+        return ("insert_kpi", position, kpi.to_dict())
+
+    def _op_set_kpi_records(self, day, pairs):
+        """pairs 为 [[kpi_id, 是否完成]]，未完成不单独保存，False 和 None 都表示删除该记录"""
+        old = []
+        for kpi_id, completed in pairs:
+            old.append([kpi_id, self.kpi_records.set(day, kpi_id, completed)])
+            self.kpi_engine.record_changed(kpi_id, day, bool(completed))
+        return ("set_kpi_records", day, old[::-1])
+
+    def _op_delete_kpi_records(self, kpi_id):
+        days = self.kpi_records.delete_kpi(kpi_id)
+        self.kpi_engine.kpi_removed(kpi_id)
+        return ("restore_kpi_records", kpi_id, days)
+
+    def _op_restore_kpi_records(self, kpi_id, days):
+        for day in days:
+            self.kpi_records.set(day, kpi_id, True)
+            self.kpi_engine.record_changed(kpi_id, day, True)
+        return ("delete_kpi_records", kpi_id)
+
+    def _op_clear_kpis(self):
+        return self._op_restore_kpis([], KpiRecordStore())
+
+    def _op_restore_kpis(self, kpis, records):
+        """整体替换KPI列表和KPI记录（KpiRecordStore）
+
+        逆操作直接持有原列表和记录，不复制；这类操作无法写入日志，执行后保存时会重写 data.json。
+        """
+        old = ("restore_kpis", self.data["kpis"], self.kpi_records)
+        self.data["kpis"] = kpis
+        self.kpi_records = records
+        self.kpi_engine = KpiEngine(records)
+        self.invalidate_kpi_index()
+        return old
+
+    # ---------- 项目与TODO ----------
+    # 修改项目和TODO都通过以下方法进行，以便同步维护完成数量、汇总统计和撤销记录
+
+    @property
+    def todo_aggregates(self):
+        if self._todo_aggregates is None:
+            self._todo_aggregates = TodoAggregates(self.data["todos"])
+        return self._todo_aggregates
+
+    def get_project_stats(self, type_name):
+        """项目类型的进行中数量、整体进度、逾期数量等统计（core.aggregates.ProjectStats）"""
+        return self.todo_aggregates.get(type_name)
+
+    def add_project(self, project):
+        self._do(("add_project", project.name, project.to_dict()), f"添加项目类型「{project.name}」")
+
+    def set_project(self, project):
+        """用 project 替换同名项目类型的单位、完成数量和进度类型"""
+        self._do(("set_project", project.name, project.to_dict()), f"修改项目类型「{project.name}」")
+
+    def delete_project(self, name):
+        self._do(("delete_project", name), f"删除项目类型「{name}」")
+
+    def clear_projects(self):
+        self._do(("set_projects", []), "清空项目类型")
+
+    def add_todo(self, todo):
+        """添加TODO；已完成的TODO同时计入项目完成数量"""
+        op = ("insert_todo", None, todo.to_dict())
+        if todo.completed:
+            op = ("batch", [op, ("add_completion", todo.type, 1)])
+        self._do(op, f"添加TODO「{todo.name}」")
+
+    def delete_todo(self, index):
+        """删除TODO，项目完成数量保持不变"""
+        self._do(("delete_todo", index), f"删除TODO「{self.data['todos'][index].name}」")
+
+    def clear_todos(self):
+        self._do(("set_todos", []), "清空TODO")
+
+    @contextmanager
+    def edit_todo(self, index):
+        """修改TODO的进度、目标、截止时间等字段，作为一步可撤销的修改
+
+        with data_mgr.edit_todo(index) as todo:
+            todo.progress += 1
+        """
+        with self._lock:
+            todo = self.data["todos"][index]
+            before = todo.to_dict()
+            aggregates = self._todo_aggregates
+            if aggregates is not None:
+                aggregates.remove(todo)
+            try:
+                yield todo
+            except Exception:
+                # 恢复修改了一半的字段
+                original = Todo.from_dict(before)
+                for field in Todo.__slots__:
+                    setattr(todo, field, getattr(original, field))
+                raise
+            finally:
+                if aggregates is not None:
+                    aggregates.add(todo)
+            after = todo.to_dict()
+        if after != before:
+            self._done(("set_todo", index, after), ("set_todo", index, before), f"修改TODO「{todo.name}」")
+
+    def complete_todo(self, index, day):
+        """标记TODO在 day（日期序号）完成，项目完成数量加一"""
+        todo = self.data["todos"][index]
+        if todo.completed:
+            return
+        fields = todo.to_dict()
+        fields.update(completed=True, complete_time=day_to_date(day))
+        self._do(("batch", [("set_todo", index, fields), ("add_completion", todo.type, 1)]),
+                 f"完成TODO「{todo.name}」")
+
+    def restore_todo(self, index):
+        """恢复为进行中，项目完成数量减一"""
+        todo = self.data["todos"][index]
+        if not todo.completed:
+            return
+        fields = todo.to_dict()
+        fields["completed"] = False
+        fields.pop("complete_time", None)
+        self._do(("batch", [("set_todo", index, fields), ("add_completion", todo.type, -1)]),
+                 f"恢复TODO「{todo.name}」")
+
+    # ---------- KPI ----------
+
+    def add_kpi(self, kpi):
+        self._do(("insert_kpi", None, kpi.to_dict()), f"添加KPI「{kpi.name}」")
+
+    def delete_kpi(self, kpi_id):
+        """删除KPI及其全部完成记录"""
+        kpi_id = int(kpi_id)
+        positions = [i for i, kpi in enumerate(self.data["kpis"]) if kpi.id == kpi_id]
+        ops = [("pop_kpi", i) for i in reversed(positions)]
+        ops.append(("delete_kpi_records", kpi_id))
+        kpi = self.get_kpi(kpi_id)
+        self._do(("batch", ops), f"删除KPI「{kpi.name}」" if kpi else "删除KPI")
+
+    def clear_kpis(self):
+        """清空KPI及全部完成记录"""
+        self._do(("clear_kpis",), "清空KPI")
+
+    def invalidate_kpi_index(self):
+        """直接修改了KPI列表或KPI的创建时间、持续时间后调用"""
+        self._kpi_window_index = None
+
+    def get_active_kpis(self, day):
+        """指定日期（日期序号）处于有效期内的KPI，保持KPI列表中的顺序"""
+        if self._kpi_window_index is None:
+            self._kpi_window_index = KpiWindowIndex(self.data["kpis"])
+        return self._kpi_window_index.active(day)
+
+    def get_kpi(self, kpi_id):
+        return next((kpi for kpi in self.data["kpis"] if kpi.id == kpi_id), None)
+
+    def get_kpi_records_for_date(self, day):
+        """获取指定日期已完成的KPI记录（只读），day 为日期序号；修改请用 save_kpi_record/update_kpi_records"""
+        return self.kpi_records.day(day)
+
+    def save_kpi_record(self, day, kpi_id, completed):
+        """保存KPI完成记录"""
+        self.update_kpi_records(day, {kpi_id: completed})
+        self.save()
+
+    def update_kpi_records(self, day, records):
+        """批量写入某一天的KPI记录 {kpi_id: 是否完成}，不写盘"""
+        # 确保kpi_id是整数类型
+        pairs = [[int(kpi_id), completed] for kpi_id, completed in records.items()]
+        self._do(("set_kpi_records", day, pairs), "修改KPI记录")
+
+    def is_kpi_completed_for_date(self, kpi_id, day):
+        """检查KPI在指定日期（日期序号）是否完成"""
+        return self.kpi_records.get(day, int(kpi_id))  # 确保kpi_id是整数类型
+
+    def delete_kpi_records(self, kpi_id):
+        """删除某个KPI的全部完成记录"""
+        self._do(("delete_kpi_records", int(kpi_id)), "删除KPI记录")
+
+    def is_kpi_completed_for_period(self, kpi, day):
+        """KPI在 day 所在的周期（每日/每周/每月/自定义）内是否已完成"""
+        return self.kpi_engine.is_completed(kpi, day)
+
+    def set_kpi_period_completed(self, kpi, day, completed):
+        """标记KPI在 day 所在周期完成或未完成，返回写入或清除了完成记录的日期序号
+
+        标记完成时记录在 day 当天；标记未完成时清除该周期内的全部完成记录（可能有多天）。
+        """
+        with self.transaction(f"{'完成' if completed else '取消完成'}KPI「{kpi.name}」"):
+            if completed:
+                changed_days = [day]
+                self.update_kpi_records(day, {kpi.id: True})
+            else:
+                changed_days = list(self.kpi_engine.completed_days_in_period(kpi, day))
+                for completed_day in changed_days:
+                    self.update_kpi_records(completed_day, {kpi.id: False})
+            self.save()
+        return changed_days
+
+    def get_kpi_rolling_rate(self, kpi, day, window_days=30):
+        """截至 day 的最近 window_days 天内的周期完成率"""
+        return self.kpi_engine.completion_rate(kpi, day - window_days + 1, day)
+
+    def get_kpi_completion_rate(self, kpi_id, start_day, end_day):
+        """计算KPI在指定日期范围（含首尾的日期序号）内的完成率，以KPI的周期为单位"""
+        kpi = self.get_kpi(kpi_id)
+        if kpi is None:
+            return 0
+        return self.kpi_engine.completion_rate(kpi, start_day, end_day)
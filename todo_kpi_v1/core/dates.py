@@ -0,0 +1,47 @@
+"""日期序号
+
+数据层内部统一以整数日期序号（datetime.date.toordinal，0001-01-01 为 1）表示日期，
+比较、加减天数和作为字典键都不需要解析字符串。只在读写文件和界面显示时
+与 'yyyy-MM-dd' 字符串互相转换。
+"""
+import datetime
+from functools import lru_cache
+
+DATE_FORMAT = "%Y-%m-%d"
+# 旧版本导入CSV时原样写入 data.json 的日期格式，如 2025-1-1、2025/01/05（Excel 常见）、2025.1.5
+LEGACY_DATE_FORMATS = (DATE_FORMAT, "%Y/%m/%d", "%Y.%m.%d", "%Y年%m月%d日")
+
+
+@lru_cache(maxsize=4096)
+def date_to_day(date_str):
+    """'yyyy-MM-dd' 转为日期序号，也接受 LEGACY_DATE_FORMATS 及其后带时间的写法；日期无效时抛出 ValueError"""
+    try:
+        return datetime.date.fromisoformat(date_str).toordinal()
+    except ValueError:
+        return _legacy_date_to_day(date_str)
+
+
+def _legacy_date_to_day(date_str):
+    text = date_str.strip().split(" ")[0].split("T")[0]  # 去掉 Excel 附加的时间，如 2025/1/5 0:00
+    for date_format in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, date_format).toordinal()
+        except ValueError:
+            pass
+    raise ValueError(f"无法识别的日期: {date_str}")
+
+
+@lru_cache(maxsize=4096)
+def day_to_date(day):
+    """日期序号转为 'yyyy-MM-dd'"""
+    return datetime.date.fromordinal(day).isoformat()
+
+
+def optional_date_to_day(date_str):
+    """空字符串和 None 转为 None"""
+    return date_to_day(date_str) if date_str else None
+
+
+def today():
+    """今天的日期序号"""
+    return datetime.date.today().toordinal()
@@ -0,0 +1,175 @@
+"""按KPI周期统计完成情况
+
+完成记录按天保存，KPI却可以是每日、每周、每月或自定义天数为一个周期。
+这里把日期映射为周期编号：同一KPI相邻周期的编号是相邻整数，周期的起止日期可直接算出。
+每个KPI维护完成日期和已完成周期的有序列表，记录变化时增量更新，
+周期完成情况、完成率、最近完成日期和连续完成周期数都通过二分查找得到。
+"""
+import datetime
+from bisect import bisect_left, bisect_right, insort
+from functools import lru_cache
+
+from core.models import PeriodType
+
+
+@lru_cache(maxsize=1024)
+def _month_bounds(month_key):
+    """月份编号（年*12+月-1）对应的首尾日期序号"""
+    year, month = divmod(month_key, 12)
+    start = datetime.date(year, month + 1, 1)
+    next_year, next_month = divmod(month_key + 1, 12)
+    end = datetime.date(next_year, next_month + 1, 1).toordinal() - 1
+    return start.toordinal(), end
+
+
+class KpiPeriod:
+    """KPI的周期划分：日期序号 <-> 周期编号"""
+    __slots__ = ("period_type", "length", "anchor")
+
+    def __init__(self, period_type, custom_days=None, anchor=0):
+        self.period_type = period_type
+        # 每月以外的周期都是固定天数（无法识别的按每日处理）；自定义周期从KPI创建日开始计算
+        self.length = None if period_type == PeriodType.MONTHLY.value else {
+            PeriodType.WEEKLY.value: 7,
+            PeriodType.CUSTOM.value: max(1, custom_days or 1),
+        }.get(period_type, 1)
+        if period_type == PeriodType.WEEKLY.value:
+            anchor = 1  # 0001-01-01 是周一，每周从周一开始
+        self.anchor = anchor
+
+    @classmethod
+    def for_kpi(cls, kpi):
+        return cls(kpi.period_type, kpi.custom_days, kpi.created_at)
+
+    def key(self, day):
+        if self.length is None:
+            date = datetime.date.fromordinal(day)
+            return date.year * 12 + date.month - 1
+        return (day - self.anchor) // self.length
+
+    def bounds(self, key):
+        """周期的首尾日期序号（含）"""
+        if self.length is None:
+            return _month_bounds(key)
+        start = self.anchor + key * self.length
+        return start, start + self.length - 1
+
+
+class KpiStats:
+    """单个KPI的完成日期与各周期完成天数"""
+    __slots__ = ("period", "days", "period_counts", "completed_keys")
+
+    def __init__(self, period, days=()):
+        self.period = period
+        self.days = sorted(days)        # 完成的日期序号
+        self.period_counts = {}         # 周期编号 -> 该周期内完成的天数
+        for day in self.days:
+            key = period.key(day)
+            self.period_counts[key] = self.period_counts.get(key, 0) + 1
+        self.completed_keys = sorted(self.period_counts)  # 有完成记录的周期编号
+
+    def set_day(self, day, completed):
+        i = bisect_left(self.days, day)
+        present = i < len(self.days) and self.days[i] == day
+        if completed == present:
+            return
+        key = self.period.key(day)
+        if completed:
+            self.days.insert(i, day)
+            count = self.period_counts.get(key, 0)
+            self.period_counts[key] = count + 1
+            if count == 0:
+                insort(self.completed_keys, key)
+        else:
+            del self.days[i]
+            count = self.period_counts[key] - 1
+            if count:
+                self.period_counts[key] = count
+            else:
+                del self.period_counts[key]
+                del self.completed_keys[bisect_left(self.completed_keys, key)]
+
+    def days_in_period(self, key):
+        start, end = self.period.bounds(key)
+        return self.days[bisect_left(self.days, start):bisect_right(self.days, end)]
+
+
+class KpiEngine:
+    """以KPI周期为单位统计完成情况
+
+    首次查询某个KPI时从 KpiRecordStore 的反向索引中取出它的记录，之后由 DataManager
+    在记录变化时调用 record_changed/kpi_removed 增量更新。
+    """
+
+    def __init__(self, records):
+        self.records = records   # KpiRecordStore
+        self._stats = {}          # kpi_id -> KpiStats
+
+    def stats(self, kpi):
+        stats = self._stats.get(kpi.id)
+        if stats is None:
+            stats = KpiStats(KpiPeriod.for_kpi(kpi), self.records.kpi_days(kpi.id))
+            self._stats[kpi.id] = stats
+        return stats
+
+    def record_changed(self, kpi_id, day, completed):
+        stats = self._stats.get(kpi_id)
+        if stats is not None:
+            stats.set_day(day, completed)
+        # 尚未统计的KPI在首次查询时从记录中读取
+
+    def kpi_removed(self, kpi_id):
+        self._stats.pop(kpi_id, None)
+
+    def invalidate(self, kpi_id=None):
+        """KPI的周期设置变化后调用，kpi_id 为 None 时全部重新统计"""
+        if kpi_id is None:
+            self._stats = {}
+        else:
+            self._stats.pop(kpi_id, None)
+
+    # ---------- 查询 ----------
+
+    def period_bounds(self, kpi, day):
+        """day 所在周期的首尾日期序号"""
+        period = self.stats(kpi).period
+        return period.bounds(period.key(day))
+
+    def is_completed(self, kpi, day):
+        """day 所在周期内是否有完成记录"""
+        stats = self.stats(kpi)
+        return stats.period.key(day) in stats.period_counts
+
+    def completed_days_in_period(self, kpi, day):
+        stats = self.stats(kpi)
+        return stats.days_in_period(stats.period.key(day))
+
+    def completion_rate(self, kpi, start_day, end_day):
+        """与 [start_day, end_day] 有交集的周期中已完成周期所占比例"""
+        if end_day < start_day:
+            return 0
+        stats = self.stats(kpi)
+        first, last = stats.period.key(start_day), stats.period.key(end_day)
+        keys = stats.completed_keys
+        completed = bisect_right(keys, last) - bisect_left(keys, first)
+        return completed / (last - first + 1)
+
+    def last_completed_day(self, kpi, until_day=None):
+        """最近一次完成的日期序号（不晚于 until_day），从未完成时返回 None"""
+        days = self.stats(kpi).days
+        i = len(days) if until_day is None else bisect_right(days, until_day)
+        return days[i - 1] if i else None
+
+    def streak(self, kpi, day):
+        """截至 day 所在周期的连续完成周期数；当前周期尚未完成时从上一个周期算起"""
+        stats = self.stats(kpi)
+        keys = stats.completed_keys
+        key = stats.period.key(day)
+        i = bisect_right(keys, key) - 1
+        if i < 0 or keys[i] < key - 1:
+            return 0
+        count = 1
+        while i > 0 and keys[i - 1] == keys[i] - 1:
+            count += 1
+            i -= 1
+        return count
@@ -0,0 +1,42 @@
+from bisect import bisect_left, bisect_right
+
+from core.models import DURATION_DAYS
+
+
+class KpiWindowIndex:
+    """KPI有效期索引，用于查询某一天处于有效期内的KPI
+
+    有效期为 [created_at, created_at + 持续天数]，持续时间为"一直"的KPI在任何日期都有效，
+    无法识别的持续时间只在创建当天有效。
+    持续时间相同的KPI按开始日期排序放在同一组，组内有效的KPI满足
+    日期-持续天数 <= 开始日期 <= 日期，用两次二分查找即可取出。持续时间只有少数几种，
+    查询耗时主要取决于有效KPI的数量，而不是KPI总数。
+    """
+
+    def __init__(self, kpis):
+        # 持续天数(None 表示一直) -> (开始日期列表, KPI在列表中的下标列表)，均按开始日期排序
+        groups = {}
+        for position, kpi in enumerate(kpis):
+            groups.setdefault(DURATION_DAYS.get(kpi.duration_type, 0), []).append((kpi.created_at, position))
+        self._kpis = list(kpis)
+        self._groups = {}
+        for duration, entries in groups.items():
+            entries.sort()
+            self._groups[duration] = ([start for start, _ in entries], [position for _, position in entries])
+
+    def active_positions(self, day):
+        """指定日期有效的KPI在列表中的下标（升序）"""
+        positions = []
+        for duration, (starts, group_positions) in self._groups.items():
+            if duration is None:
+                positions.extend(group_positions)
+                continue
+            high = bisect_right(starts, day)
+            low = bisect_left(starts, day - duration, 0, high)
+            positions.extend(group_positions[low:high])
+        positions.sort()
+        return positions
+
+    def active(self, day):
+        """指定日期有效的KPI，保持原列表中的顺序"""
+        return [self._kpis[position] for position in self.active_positions(day)]
@@ -0,0 +1,159 @@
+import logging
+from bisect import bisect_left, insort
+from types import MappingProxyType
+
+from core.dates import date_to_day, day_to_date
+
+_EMPTY = MappingProxyType({})
+
+
+def _completed_only(records):
+    return {kpi_id: True for kpi_id, completed in records.items() if completed}
+
+
+class KpiRecordStore:
+    """KPI完成记录：日期 -> {kpi_id: True}
+
+    只保存已完成的记录，未完成与没有记录等价，文件大小只与实际完成次数有关；
+    旧数据中的未完成记录和空日期在载入时丢弃（见 compacted_entries）。
+
+    记录可以以快照文件为基础（只读、按需从映射文件读取），被修改的日期才载入内存，
+    载入后该日期以内存中的数据为准。只读查询不会在内存中新建日期。
+    日期均为日期序号（见 core.dates），只有 from_dict/items/to_dict 使用 'yyyy-MM-dd' 字符串。
+
+    另外按KPI缓存完成日期的有序列表，某个KPI首次查询时才建立：快照部分直接读取快照中
+    该KPI的日期列表，再用内存中的日期修正；之后随 set 增量更新，不会扫描全部记录。
+    """
+
+    def __init__(self, base=None):
+        self._base = base  # SnapshotRecords 或 None
+        self._days = {}    # 已载入内存的日期：日期序号 -> {kpi_id: True}
+        self._kpi_days = {}    # kpi_id -> 完成日期序号的有序列表，按KPI首次查询时建立
+        self.compacted_entries = 0  # 载入时丢弃的未完成记录和空日期数
+
+    @classmethod
+    def from_dict(cls, records_by_date, errors=None):
+        """从 data.json 布局的 {日期: {kpi_id: 是否完成}} 构建，kpi_id 统一为整数
+
+        无效日期的记录总是忽略；某一天的记录格式错误时，errors 为 None 则抛出 ValueError，
+        为列表则跳过该日并把说明追加到其中（同 core.records.records_from_dict）。
+        """
+        store = cls()
+        for date_str, records in records_by_date.items():
+            try:
+                day = date_to_day(date_str)
+            except ValueError:
+                logging.warning(f"忽略无效日期的KPI记录: {date_str}")
+                continue
+            try:
+                completed = {int(kpi_id): True for kpi_id, value in records.items() if value}
+            except (AttributeError, TypeError, ValueError) as e:
+                message = f"{date_str} 的KPI记录格式错误: {str(e)}"
+                if errors is None:
+                    raise ValueError(message)
+                errors.append(f"已跳过{message}")
+                continue
+            store.compacted_entries += len(records) - len(completed)
+            if completed:
+                store._days.setdefault(day, {}).update(completed)
+            elif not records:
+                store.compacted_entries += 1
+        return store
+
+    def close(self):
+        """释放快照映射；之后只能访问已载入内存的日期"""
+        if self._base is not None:
+            self._base.close()
+            self._base = None
+
+    def clear(self):
+        self.close()
+        self._days = {}
+        self._kpi_days = {}
+
+    def _all_days(self):
+        days = set(self._days)
+        if self._base is not None:
+            days.update(self._base.days())
+        return sorted(days)
+
+    def _base_day(self, day):
+        return _completed_only(self._base.day_records(day)) if self._base is not None else {}
+
+    def day(self, day):
+        """指定日期的记录（只读），修改请用 set"""
+        records = self._days.get(day)
+        if records is None:
+            records = self._base_day(day)
+        return MappingProxyType(records) if records else _EMPTY
+
+    def set(self, day, kpi_id, completed):
+        """写入一条记录，completed 为 False 或 None 时删除该记录；返回原来是否完成，原来没有记录时为 None"""
+        records = self._days.get(day)
+        if records is None:
+            if not completed and not self.get(day, kpi_id):
+                return None
+            records = self._days[day] = self._base_day(day)
+        old = records.get(kpi_id)
+        if completed:
+            records[kpi_id] = True
+            days = self._kpi_days.get(kpi_id)
+            if old is None and days is not None:
+                insort(days, day)
+        elif old is not None:
+            del records[kpi_id]
+            if not records and (self._base is None or not self._base.has_day(day)):
+                # 没有快照中的数据需要遮盖，空日期直接移除
+                del self._days[day]
+            days = self._kpi_days.get(kpi_id)
+            if days is not None:
+                del days[bisect_left(days, day)]
+        return old
+
+    def get(self, day, kpi_id):
+        """KPI在指定日期是否完成，不会载入整天的数据"""
+        records = self._days.get(day)
+        if records is not None:
+            return kpi_id in records
+        if self._base is not None:
+            return bool(self._base.get(day, kpi_id))
+        return False
+
+    def iter_days(self):
+        """按日期升序遍历有记录的 (日期序号, 记录字典)；未载入的日期读取后不会常驻内存"""
+        for day in self._all_days():
+            records = self._days.get(day)
+            if records is None:
+                records = self._base_day(day)
+            if records:
+                yield day, records
+
+    def items(self):
+        for day, records in self.iter_days():
+            yield day_to_date(day), records
+
+    def to_dict(self):
+        return {date_str: dict(records) for date_str, records in self.items()}
+
+    def _build_kpi_days(self, kpi_id):
+        """读取快照中该KPI的日期，再用已载入内存的日期（以内存为准）修正"""
+        days = self._base.kpi_days(kpi_id) if self._base is not None else []
+        if self._days:
+            days = [day for day in days if day not in self._days]
+            days.extend(day for day, records in self._days.items() if kpi_id in records)
+            days.sort()
+        return days
+
+    def kpi_days(self, kpi_id):
+        """某个KPI完成的日期序号，升序；返回的是缓存的列表，调用方不要修改"""
+        days = self._kpi_days.get(kpi_id)
+        if days is None:
+            days = self._kpi_days[kpi_id] = self._build_kpi_days(kpi_id)
+        return days
+
+    def delete_kpi(self, kpi_id):
+        """删除某个KPI在所有日期的记录，返回被删除记录的日期序号"""
+        days = list(self.kpi_days(kpi_id))
+        for day in days:
+            self.set(day, kpi_id, None)
+        return days
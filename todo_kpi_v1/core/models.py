@@ -0,0 +1,34 @@
+from enum import Enum
+
+
+class ProgressType:
+    ABSOLUTE = "absolute"
+    CUMULATIVE = "cumulative"
+
+
+class PeriodType(Enum):
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    CUSTOM = "custom"
+
+
+class DurationType(Enum):
+    ONE_WEEK = "one_week"
+    ONE_MONTH = "one_month"
+    FOREVER = "forever"
+
+
+# 持续天数，None 表示一直有效
+DURATION_DAYS = {
+    DurationType.ONE_WEEK.value: 7,
+    DurationType.ONE_MONTH.value: 30,
+    DurationType.FOREVER.value: None
+}
+
+PERIOD_TYPE_LABELS = {
+    PeriodType.DAILY: "每日",
+    PeriodType.WEEKLY: "每周",
+    PeriodType.MONTHLY: "每月",
+    PeriodType.CUSTOM: "自定义"
+}
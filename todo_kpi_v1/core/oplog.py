@@ -0,0 +1,126 @@
+"""操作日志：撤销/重做与增量保存
+
+DataManager 的每次修改都表示为一条操作 (操作名, 参数...)，执行时返回它的逆操作。
+
+- 撤销栈保存最近 UNDO_LIMIT 步的逆操作，撤销即执行逆操作，得到的逆操作放入重做栈；
+  每一步只保存被修改的那部分数据，不复制整个数据字典
+- 可序列化的操作以 JSON 行追加到日志文件（data.journal），日常保存只需追加几行；
+  日志过长或遇到无法序列化的操作时，重写一次 data.json 并清空日志（检查点）
+- 日志首行记录对应 data.json 的大小和修改时间，启动时只有两者一致才重放日志，
+  检查点写完 data.json 后、清空日志前中断也不会重复应用
+"""
+import json
+import logging
+import os
+from collections import deque
+
+UNDO_LIMIT = 100                # 最多可撤销的步数
+JOURNAL_CHECKPOINT_OPS = 500    # 日志超过该行数时改为重写 data.json
+
+
+def file_stamp(path):
+    """文件的 [大小, 修改时间]，文件不存在时返回 None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class OperationLog:
+    def __init__(self, journal_file, limit=UNDO_LIMIT):
+        self.journal_file = journal_file
+        self._undo = deque(maxlen=limit)  # (说明, 逆操作)
+        self._redo = []                   # (说明, 操作)
+        self._pending = []                # 尚未写入日志文件的操作（已序列化的JSON行）
+        self.journal_length = 0           # 日志文件中的操作行数
+        self.damaged = False              # 读取时遇到不完整的行，需要重写日志
+
+    # ---------- 撤销/重做 ----------
+
+    def record(self, label, inverse):
+        """记录一步新的修改，清空重做栈"""
+        self._undo.append((label, inverse))
+        self._redo.clear()
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_label(self):
+        return self._undo[-1][0] if self._undo else None
+
+    def redo_label(self):
+        return self._redo[-1][0] if self._redo else None
+
+    def pop_undo(self):
+        return self._undo.pop()
+
+    def push_undo(self, label, inverse):
+        self._undo.append((label, inverse))
+
+    def pop_redo(self):
+        return self._redo.pop()
+
+    def push_redo(self, label, op):
+        self._redo.append((label, op))
+
+    def clear_history(self):
+        self._undo.clear()
+        self._redo.clear()
+
+    # ---------- 日志文件 ----------
+
+    def append(self, op):
+        """登记一条已执行、待写入日志的操作；操作无法序列化时返回 False"""
+        try:
+            self._pending.append(json.dumps(op, ensure_ascii=False) + "\n")
+        except (TypeError, ValueError):
+            return False
+        return True
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def flush(self):
+        """把待写入的操作追加到日志文件"""
+        if not self._pending:
+            return
+        with open(self.journal_file, "a", encoding="utf-8") as f:
+            f.write("".join(self._pending))
+        self.journal_length += len(self._pending)
+        self._pending.clear()
+
+    def reset(self, stamp):
+        """检查点之后调用：丢弃待写入的操作，日志只保留对应 data.json 的标记"""
+        self._pending.clear()
+        with open(self.journal_file, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"data_file": stamp}) + "\n")
+        self.journal_length = 0
+        self.damaged = False
+
+    def read(self, stamp):
+        """读取与 data.json 标记一致的日志中的操作；日志不存在或已过期时返回 None"""
+        try:
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                header = f.readline()
+                try:
+                    if json.loads(header).get("data_file") != stamp:
+                        return None
+                except (ValueError, AttributeError):
+                    return None
+                ops = []
+                for line_no, line in enumerate(f, 2):
+                    try:
+                        ops.append(json.loads(line))
+                    except ValueError:
+                        # 写入中断留下的不完整行，之后的内容都不可信
+                        logging.warning(f"操作日志第{line_no}行不完整，已忽略之后的内容")
+                        self.damaged = True
+                        break
+        except OSError:
+            return None
+        self.journal_length = len(ops)
+        return ops
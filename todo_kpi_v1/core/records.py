@@ -0,0 +1,218 @@
+"""项目、TODO、KPI 的数据记录类
+
+使用 __slots__ 定义固定字段，比字典占用更少内存、属性访问更快，
+字段名写错时会直接报错。与 data.json 布局的转换通过 from_dict/to_dict 完成。
+日期字段在内存中为日期序号（见 core.dates），在 data.json 中为 'yyyy-MM-dd'。
+"""
+from core.dates import date_to_day, day_to_date, optional_date_to_day
+from core.models import ProgressType, DurationType
+
+
+def _field(data, key, kind):
+    try:
+        return data[key]
+    except KeyError:
+        raise ValueError(f"{kind}数据缺少字段: {key}")
+
+
+def _date_field(data, key, kind):
+    value = _field(data, key, kind)
+    try:
+        return date_to_day(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{kind}数据的{key}日期格式错误: {value}")
+
+
+def _optional_int(value):
+    return None if value in (None, "") else int(value)
+
+
+def _optional_float(value):
+    return None if value is None else float(value)
+
+
+class Project:
+    """项目类型，data.json 中以名称为键保存"""
+    __slots__ = ("name", "unit", "count", "progress_type")
+
+    def __init__(self, name, unit, count=0, progress_type=ProgressType.ABSOLUTE):
+        self.name = name
+        self.unit = unit
+        self.count = count
+        self.progress_type = progress_type
+
+    @classmethod
+    def from_dict(cls, name, data):
+        return cls(
+            name=name,
+            unit=_field(data, "unit", "项目"),
+            count=int(data.get("count") or 0),
+            progress_type=data.get("progress_type") or ProgressType.ABSOLUTE
+        )
+
+    def to_dict(self):
+        return {"unit": self.unit, "count": self.count, "progress_type": self.progress_type}
+
+
+class Todo:
+    __slots__ = (
+        "name", "type", "unit", "target", "progress", "progress_type",
+        "deadline", "completed", "complete_time"
+    )
+
+    def __init__(self, name, type, unit, target, progress=0.0, progress_type=ProgressType.ABSOLUTE,
+                 deadline=None, completed=False, complete_time=None):
+        self.name = name
+        self.type = type
+        self.unit = unit
+        self.target = target
+        self.progress = progress
+        self.progress_type = progress_type
+        self.deadline = deadline  # 日期序号
+        self.completed = completed
+        self.complete_time = complete_time  # 日期序号；未完成时为 None，保存时省略该字段
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            name=_field(data, "name", "TODO"),
+            type=_field(data, "type", "TODO"),
+            unit=_field(data, "unit", "TODO"),
+            target=float(_field(data, "target", "TODO")),
+            progress=_optional_float(data.get("progress")),
+            progress_type=data.get("progress_type") or ProgressType.ABSOLUTE,
+            deadline=_date_field(data, "deadline", "TODO"),
+            completed=bool(data.get("completed")),
+            complete_time=optional_date_to_day(data.get("complete_time"))
+        )
+
+    def to_dict(self):
+        data = {
+            "name": self.name,
+            "type": self.type,
+            "unit": self.unit,
+            "target": self.target,
+            "progress": self.progress,
+            "progress_type": self.progress_type,
+            "deadline": day_to_date(self.deadline),
+            "completed": self.completed
+        }
+        if self.complete_time is not None:
+            data["complete_time"] = day_to_date(self.complete_time)
+        return data
+
+
+class Kpi:
+    __slots__ = (
+        "id", "name", "period_type", "custom_days", "target", "unit",
+        "todo_id", "duration_type", "created_at"
+    )
+
+    def __init__(self, id, name, period_type, target, unit, created_at, custom_days=None,
+                 todo_id=None, duration_type=DurationType.FOREVER.value):
+        self.id = id
+        self.name = name
+        self.period_type = period_type
+        self.custom_days = custom_days
+        self.target = target
+        self.unit = unit
+        self.todo_id = todo_id  # 关联Todo在todos列表中的下标
+        self.duration_type = duration_type
+        self.created_at = created_at  # 日期序号
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            id=int(_field(data, "id", "KPI")),
+            name=_field(data, "name", "KPI"),
+            period_type=_field(data, "period_type", "KPI"),
+            custom_days=_optional_int(data.get("custom_days")),
+            target=float(_field(data, "target", "KPI")),
+            unit=data.get("unit"),
+            todo_id=_optional_int(data.get("todo_id")),
+            duration_type=data.get("duration_type") or DurationType.FOREVER.value,
+            created_at=_date_field(data, "created_at", "KPI")
+        )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "period_type": self.period_type,
+            "custom_days": self.custom_days,
+            "target": self.target,
+            "unit": self.unit,
+            "todo_id": self.todo_id,
+            "duration_type": self.duration_type,
+            "created_at": day_to_date(self.created_at)
+        }
+
+
+def _section(data, key, kind, errors):
+    value = data.get(key, kind())
+    if isinstance(value, kind):
+        return value
+    message = f"{key} 的格式错误，应为{'对象' if kind is dict else '列表'}"
+    if errors is None:
+        raise ValueError(message)
+    errors.append(message)
+    return kind()
+
+
+def _load_record(load, description, errors):
+    """strict 模式（errors 为 None）下原样抛出；否则记录错误并返回 None"""
+    if errors is None:
+        return load()
+    try:
+        return load()
+    except (AttributeError, TypeError, ValueError) as e:
+        errors.append(f"已跳过无效的{description}: {str(e)}")
+        return None
+
+
+def records_from_dict(data, errors=None):
+    """把 data.json 布局的 projects/todos/kpis 转换为记录对象，其余字段原样保留
+
+    Args:
+        data (dict): data.json 布局的数据
+        errors (list): 为 None 时遇到无效记录抛出异常（恢复备份、导入时使用）；
+            为列表时跳过无效记录并把说明追加到其中（载入本地 data.json 时使用），
+            跳过TODO后KPI关联的TODO下标随之调整，关联被跳过的TODO的KPI取消关联
+    """
+    result = dict(data)
+    projects = {}
+    for name, info in _section(data, "projects", dict, errors).items():
+        project = _load_record(lambda: Project.from_dict(name, info), f"项目「{name}」", errors)
+        if project is not None:
+            projects[name] = project
+    result["projects"] = projects
+
+    raw_todos = _section(data, "todos", list, errors)
+    todos = []
+    todo_positions = {}  # 原下标 -> 保留后的下标
+    for i, fields in enumerate(raw_todos):
+        todo = _load_record(lambda: Todo.from_dict(fields), f"第{i + 1}个TODO", errors)
+        if todo is not None:
+            todo_positions[i] = len(todos)
+            todos.append(todo)
+    result["todos"] = todos
+
+    kpis = []
+    for i, fields in enumerate(_section(data, "kpis", list, errors)):
+        kpi = _load_record(lambda: Kpi.from_dict(fields), f"第{i + 1}个KPI", errors)
+        if kpi is None:
+            continue
+        if len(todos) != len(raw_todos) and kpi.todo_id is not None:
+            kpi.todo_id = todo_positions.get(kpi.todo_id)
+        kpis.append(kpi)
+    result["kpis"] = kpis
+    return result
+
+
+def records_to_dict(data):
+    """records_from_dict 的逆转换，返回可直接写入JSON的字典"""
+    result = dict(data)
+    result["projects"] = {name: project.to_dict() for name, project in data["projects"].items()}
+    result["todos"] = [todo.to_dict() for todo in data["todos"]]
+    result["kpis"] = [kpi.to_dict() for kpi in data["kpis"]]
+    return result
@@ -0,0 +1,239 @@
+"""数据快照文件（data.snapshot）
+
+data.json 仍是数据的正式保存格式；快照是它的二进制缓存，用于加快启动：
+
+- 项目、TODO、KPI 等体积较小的数据以 JSON 元数据保存，启动时直接解析
+- KPI记录保存为按(日期序号, KPI ID)排序的定长记录数组，外加按日期的索引，
+  通过 mmap 映射后按需读取，启动耗时与历史记录多少基本无关
+- 另存每个KPI已完成的日期列表，按KPI统计时只读取该KPI自己的部分
+
+快照头部记录了生成时 data.json 的大小和修改时间，两者不一致时快照视为过期。
+
+文件结构:
+    头部 | 元数据JSON | 对齐填充 | 记录数组 | 日期索引 | KPI日期数组 | KPI索引
+    记录: (日期序号 int32, KPI ID int32, 是否完成 uint8, 3字节填充)
+    日期索引: (日期序号 int32, 首条记录下标 uint32, 记录数 uint32)
+    KPI日期数组: 按KPI ID、日期序号排序的已完成日期 int32
+    KPI索引: (KPI ID int32, 首个日期下标 uint32, 日期数 uint32)，按KPI ID排序
+"""
+import json
+import mmap
+import os
+import struct
+
+MAGIC = b"TKS1"
+FORMAT_VERSION = 2
+
+# 魔数, 版本, 源文件大小, 源文件修改时间, 元数据长度, 日期数, 记录数, 日期索引偏移, KPI数, KPI日期数
+_HEADER = struct.Struct("<4sIQqIIQQIQ")
+_RECORD = struct.Struct("<iiB3x")
+_DAY_INDEX = struct.Struct("<iII")
+_KPI_DAY = struct.Struct("<i")
+_KPI_INDEX = struct.Struct("<iII")
+
+
+class SnapshotError(Exception):
+    """快照无效或已过期"""
+
+
+def _align(offset, size=8):
+    return (offset + size - 1) // size * size
+
+
+def _source_stamp(source_path):
+    stat = os.stat(source_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def write_snapshot(path, meta, day_records, source_path):
+    """写入快照
+
+    Args:
+        path (str): 快照文件路径
+        meta (dict): 除KPI记录外的数据，以JSON保存
+        day_records (iterable): 按日期序号升序的 (日期序号, {kpi_id: 是否完成})
+        source_path (str): 对应的 data.json，用于记录大小和修改时间
+    """
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    records_offset = _align(_HEADER.size + len(meta_bytes))
+    source_size, source_mtime = _source_stamp(source_path)
+
+    day_index = []
+    kpi_days = {}  # kpi_id -> 已完成的日期序号（按日期升序写入，天然有序）
+    record_count = 0
+    with open(path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        f.write(meta_bytes)
+        f.write(b"\0" * (records_offset - _HEADER.size - len(meta_bytes)))
+
+        buffer = bytearray()
+        for day, records in day_records:
+            if not records:
+                continue
+            day_index.append((day, record_count, len(records)))
+            for kpi_id in sorted(records):
+                buffer += _RECORD.pack(day, kpi_id, 1 if records[kpi_id] else 0)
+                if records[kpi_id]:
+                    kpi_days.setdefault(kpi_id, []).append(day)
+            record_count += len(records)
+            if len(buffer) >= 1 << 16:
+                f.write(buffer)
+                buffer.clear()
+        f.write(buffer)
+
+        index_offset = records_offset + record_count * _RECORD.size
+        f.write(b"".join(_DAY_INDEX.pack(*entry) for entry in day_index))
+
+        kpi_index = []
+        kpi_day_count = 0
+        for kpi_id in sorted(kpi_days):
+            days = kpi_days[kpi_id]
+            kpi_index.append((kpi_id, kpi_day_count, len(days)))
+            f.write(struct.pack(f"<{len(days)}i", *days))
+            kpi_day_count += len(days)
+        f.write(b"".join(_KPI_INDEX.pack(*entry) for entry in kpi_index))
+
+        f.seek(0)
+        f.write(_HEADER.pack(
+            MAGIC, FORMAT_VERSION, source_size, source_mtime,
+            len(meta_bytes), len(day_index), record_count, index_offset,
+            len(kpi_index), kpi_day_count
+        ))
+
+
+def open_snapshot(path, source_path):
+    """打开快照，返回 (元数据, SnapshotRecords)；快照不存在、损坏或过期时抛出 SnapshotError"""
+    try:
+        f = open(path, "rb")
+    except OSError as e:
+        raise SnapshotError(str(e))
+
+    with f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(str(e))
+
+    try:
+        if len(mapped) < _HEADER.size:
+            raise SnapshotError("快照文件不完整")
+        (magic, version, source_size, source_mtime, meta_len, day_count,
+         record_count, index_offset, kpi_count, kpi_day_count) = _HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise SnapshotError("快照格式不匹配")
+        try:
+            if _source_stamp(source_path) != (source_size, source_mtime):
+                raise SnapshotError("快照已过期")
+        except OSError as e:
+            raise SnapshotError(str(e))
+        kpi_days_offset = index_offset + day_count * _DAY_INDEX.size
+        kpi_index_offset = kpi_days_offset + kpi_day_count * _KPI_DAY.size
+        if kpi_index_offset + kpi_count * _KPI_INDEX.size > len(mapped):
+            raise SnapshotError("快照文件不完整")
+
+        meta = json.loads(bytes(mapped[_HEADER.size:_HEADER.size + meta_len]).decode("utf-8"))
+        records_offset = _align(_HEADER.size + meta_len)
+        return meta, SnapshotRecords(mapped, records_offset, record_count, index_offset, day_count,
+                                     kpi_days_offset, kpi_index_offset, kpi_count)
+    except SnapshotError:
+        mapped.close()
+        raise
+    except (ValueError, struct.error) as e:
+        mapped.close()
+        raise SnapshotError(str(e))
+
+
+class SnapshotRecords:
+    """只读的KPI记录视图，数据直接从映射的快照文件中按需读取"""
+
+    def __init__(self, mapped, records_offset, record_count, index_offset, day_count,
+                 kpi_days_offset, kpi_index_offset, kpi_count):
+        self._mapped = mapped
+        self._records_offset = records_offset
+        self.record_count = record_count
+        self._index_offset = index_offset
+        self.day_count = day_count
+        self._kpi_days_offset = kpi_days_offset
+        self._kpi_index_offset = kpi_index_offset
+        self.kpi_count = kpi_count
+
+    def close(self):
+        if self._mapped is not None:
+            self._mapped.close()
+            self._mapped = None
+
+    def _day_entry(self, i):
+        return _DAY_INDEX.unpack_from(self._mapped, self._index_offset + i * _DAY_INDEX.size)
+
+    def _find_day(self, day):
+        """二分查找日期索引，返回 (首条记录下标, 记录数)，没有记录时返回 None"""
+        low, high = 0, self.day_count
+        while low < high:
+            mid = (low + high) // 2
+            if self._day_entry(mid)[0] < day:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.day_count:
+            entry_day, first, count = self._day_entry(low)
+            if entry_day == day:
+                return first, count
+        return None
+
+    def _record(self, i):
+        return _RECORD.unpack_from(self._mapped, self._records_offset + i * _RECORD.size)
+
+    def days(self):
+        """全部有记录的日期序号（升序）"""
+        return [self._day_entry(i)[0] for i in range(self.day_count)]
+
+    def has_day(self, day):
+        return self._find_day(day) is not None
+
+    def day_records(self, day):
+        """指定日期的记录 {kpi_id: 是否完成}，每次返回新的字典"""
+        found = self._find_day(day)
+        if found is None:
+            return {}
+        first, count = found
+        records = {}
+        for i in range(first, first + count):
+            _, kpi_id, completed = self._record(i)
+            records[kpi_id] = bool(completed)
+        return records
+
+    def get(self, day, kpi_id):
+        """指定日期、指定KPI的记录，没有记录时返回 None"""
+        found = self._find_day(day)
+        if found is None:
+            return None
+        low, high = found[0], found[0] + found[1]
+        while low < high:
+            mid = (low + high) // 2
+            record_kpi = self._record(mid)[1]
+            if record_kpi < kpi_id:
+                low = mid + 1
+            elif record_kpi > kpi_id:
+                high = mid
+            else:
+                return bool(self._record(mid)[2])
+        return None
+
+    def _kpi_entry(self, i):
+        return _KPI_INDEX.unpack_from(self._mapped, self._kpi_index_offset + i * _KPI_INDEX.size)
+
+    def kpi_days(self, kpi_id):
+        """某个KPI已完成的日期序号（升序），只读取该KPI的日期列表"""
+        low, high = 0, self.kpi_count
+        while low < high:
+            mid = (low + high) // 2
+            if self._kpi_entry(mid)[0] < kpi_id:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.kpi_count:
+            entry_kpi, first, count = self._kpi_entry(low)
+            if entry_kpi == kpi_id:
+                offset = self._kpi_days_offset + first * _KPI_DAY.size
+                return list(struct.unpack_from(f"<{count}i", self._mapped, offset))
+        return []
@@ -0,0 +1,63 @@
+"""gunicorn 配置，参数可用环境变量覆盖
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+使用 gthread 工作进程：SSE 长连接只占用一个线程，不会阻塞整个进程；
+心跳由主线程发送，长时间输出的流不会被当作卡死的进程杀掉。
+各进程的指标写入 METRICS_DIR（未设置时使用临时目录），/metrics 输出全部进程汇总后的数据。
+
+上游并发限制（services.upstream_limiter）也是每个进程各自计算，发往上游的并发最多为
+workers × UPSTREAM_MAX_CONCURRENCY；按整个服务限制时设置 UPSTREAM_MAX_CONCURRENCY_TOTAL
+（和 UPSTREAM_MAX_QUEUE_TOTAL），由各工作进程平分。
+"""
+import glob
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', '5010')}"
+workers = int(os.getenv('API_WORKERS', multiprocessing.cpu_count()))
+# 工作进程据此平分 UPSTREAM_*_TOTAL
+os.environ['API_WORKERS'] = str(workers)
+worker_class = 'gthread'
+# 每个进程同时处理的请求数，包括正在输出的 SSE 连接
+threads = int(os.getenv('API_THREADS', '16'))
+# 请求没有任何进展的最长时间（秒）；gthread 下不限制 SSE 的总时长
+timeout = int(os.getenv('API_TIMEOUT', '120'))
+# 收到 SIGTERM 后等待进行中的请求（包括 SSE）完成的时间
+graceful_timeout = int(os.getenv('API_GRACEFUL_TIMEOUT', '60'))
+keepalive = 5
+# 主进程载入应用并建表一次，工作进程 fork 后共享代码
+preload_app = True
+accesslog = os.getenv('API_ACCESS_LOG') or None
+errorlog = '-'
+
+# 多进程汇总指标的目录，须在载入应用前设置（services.metrics.install_metrics 读取）
+_metrics_temp_dir = None
+if not os.getenv('METRICS_DIR'):
+    _metrics_temp_dir = tempfile.mkdtemp(prefix='api-metrics-')
+    os.environ['METRICS_DIR'] = _metrics_temp_dir
+
+
+def on_starting(server):
+    # 清除上次运行留下的进程指标
+    for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], '*.json')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from services.metrics import mark_process_dead
+    mark_process_dead(os.environ['METRICS_DIR'], worker.pid)
+
+
+def on_exit(server):
+    if _metrics_temp_dir:
+        shutil.rmtree(_metrics_temp_dir, ignore_errors=True)
+
+
+def post_fork(server, worker):
+    # fork 前主进程建表时打开的数据库连接不能跨进程使用
+    from api_server import app, version_service
+    with app.app_context():
+        version_service.db.engine.dispose()
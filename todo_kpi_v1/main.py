@@ -1,13 +1,17 @@
+import time
+
+_STARTUP_T0 = time.perf_counter()  # 进程启动计时起点，尽量早于其他导入
+
+from utils.startup_profiler import StartupProfiler
+
+startup_profiler = StartupProfiler(_STARTUP_T0)
+startup_profiler.install_import_hook()
+
 import os
 import sys
-import json
 import logging
-import csv
 # import shutil
-import datetime
-import requests
 # import subprocess
-from enum import Enum
 
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
@@ -15,17 +19,31 @@ from PyQt5.QtWidgets import (
     QLineEdit, QLabel, QMessageBox, QTabWidget,
     QComboBox, QProgressBar, QDateEdit, QInputDialog,
     QSizePolicy, QCheckBox, QFileDialog, QDialog,
-    QDialogButtonBox, QSpinBox, QCalendarWidget, QMenu
+    QDialogButtonBox, QSpinBox, QCalendarWidget, QMenu,
+    QProgressDialog, QShortcut
 )
-from PyQt5.QtCore import Qt, QDate, QDateTime, QUrl, QTimer
-from PyQt5.QtGui import QIcon, QDesktopServices, QColor
+from PyQt5.QtCore import Qt, QDate, QDateTime, QUrl, QTimer, QThread, pyqtSignal
+from PyQt5.QtGui import QIcon, QDesktopServices, QColor, QKeySequence
+
+from core.models import ProgressType, PeriodType, DurationType, PERIOD_TYPE_LABELS
+from core.records import Project, Todo, Kpi
+from core.dates import day_to_date
+from core.data_manager import DataManager
+from core.csv_importer import CsvImporter, ImportCancelled
+from core.csv_exporter import CsvExporter, ExportCancelled
+from core.columnar import write_columnar, read_columnar, FILE_EXTENSION as COLUMNAR_EXTENSION
+
+# requests 与 ui.chat_dialog（会拉起 markdown 及其扩展）只在检查更新、打开AI助手时才需要，
+# 延迟到首次使用时再导入，以缩短冷启动时间
 
-from ui.chat_dialog import ChatDialog
+startup_profiler.mark("imports_done")
 
 
 def get_base_path():
-    """获取跨平台数据存储路径"""
-    if getattr(sys, 'frozen', False):
+    """获取跨平台数据存储路径；设置了环境变量 TODO_DATA_DIR 时使用该目录（用于基准测试等）"""
+    if os.getenv('TODO_DATA_DIR'):
+        data_dir = os.getenv('TODO_DATA_DIR')
+    elif getattr(sys, 'frozen', False):
         app_name = "TodoTracker"
         if sys.platform == "win32":
             data_dir = os.path.join(os.getenv('APPDATA'), app_name)
@@ -42,6 +60,17 @@ def get_base_path():
 
 VERSION = "0.0.1"  # 当前版本号
 
+JULIAN_DAY_OFFSET = 1721425  # QDate 儒略日与 date.toordinal 日期序号之差
+
+
+def qdate_to_day(qdate):
+    """QDate 转为数据层使用的日期序号"""
+    return qdate.toJulianDay() - JULIAN_DAY_OFFSET
+
+
+def day_to_qdate(day):
+    return QDate.fromJulianDay(day + JULIAN_DAY_OFFSET)
+
 DATA_DIR = get_base_path()
 DATA_FILE = os.path.join(DATA_DIR, "data.json")
 
@@ -55,111 +84,8 @@ logging.basicConfig(
 )
 
 
-class ProgressType:
-    ABSOLUTE = "absolute"
-    CUMULATIVE = "cumulative"
-
-
-class PeriodType(Enum):
-    DAILY = "daily"
-    WEEKLY = "weekly"
-    MONTHLY = "monthly"
-    CUSTOM = "custom"
-
-
-class DurationType(Enum):
-    ONE_WEEK = "one_week"
-    ONE_MONTH = "one_month"
-    FOREVER = "forever"
-
-PERIOD_TYPE_LABELS = {
-    PeriodType.DAILY: "每日",
-    PeriodType.WEEKLY: "每周",
-    PeriodType.MONTHLY: "每月",
-    PeriodType.CUSTOM: "自定义"
-}
-
-
-class DataManager:
-    def __init__(self):
-        self.data = self._load_initial_data()
-        # 数据兼容
-        if 'kpis' not in self.data:
-            self.data['kpis'] = []
-        if 'kpi_records' not in self.data:
-            self.data['kpi_records'] = {}
-        
-        self.window_size = self.data.get("window_size", [800, 500])
-
-    def _load_initial_data(self):
-        try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # 确保kpi_records中的kpi_id是整数类型
-                if 'kpi_records' in data:
-                    for date_str in data['kpi_records']:
-                        data['kpi_records'][date_str] = {
-                            int(kpi_id): completed 
-                            for kpi_id, completed in data['kpi_records'][date_str].items()
-                        }
-                return data
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {
-                "projects": {
-                    "读书": {"unit": "页", "count": 0, "progress_type": ProgressType.ABSOLUTE},
-                    "课程": {"unit": "课", "count": 0, "progress_type": ProgressType.ABSOLUTE},
-                    "运动": {"unit": "分钟", "count": 0, "progress_type": ProgressType.ABSOLUTE},
-                    "写作": {"unit": "字", "count": 0, "progress_type": ProgressType.ABSOLUTE},
-                    "编程": {"unit": "小时", "count": 0, "progress_type": ProgressType.ABSOLUTE}
-                },
-                "todos": [], 
-                "kpis": [], 
-                "kpi_records": {},
-                "window_size": [800, 500]
-            }
-
-    def save(self, window_size=None):
-        if window_size:
-            self.data["window_size"] = window_size
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=4)
-            
-    def get_kpi_records_for_date(self, date_str):
-        """获取指定日期的KPI记录"""
-        if date_str not in self.data["kpi_records"]:
-            self.data["kpi_records"][date_str] = {}
-        return self.data["kpi_records"][date_str]
-        
-    def save_kpi_record(self, date_str, kpi_id, completed):
-        """保存KPI完成记录"""
-        records = self.get_kpi_records_for_date(date_str)
-        records[int(kpi_id)] = completed  # 确保kpi_id是整数类型
-        self.save()
-        
-    def is_kpi_completed_for_date(self, kpi_id, date_str):
-        """检查KPI在指定日期是否完成"""
-        records = self.get_kpi_records_for_date(date_str)
-        return records.get(int(kpi_id), False)  # 确保kpi_id是整数类型
-        
-    def get_kpi_completion_rate(self, kpi_id, start_date, end_date):
-        """计算KPI在指定日期范围内的完成率"""
-        start = datetime.datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.datetime.strptime(end_date, "%Y-%m-%d")
-        
-        total_days = (end - start).days + 1
-        completed_days = 0
-        
-        current = start
-        while current <= end:
-            date_str = current.strftime("%Y-%m-%d")
-            if self.is_kpi_completed_for_date(kpi_id, date_str):
-                completed_days += 1
-            current += datetime.timedelta(days=1)
-            
-        return completed_days / total_days if total_days > 0 else 0
-
-
-data_mgr = DataManager()
+with startup_profiler.phase("data_load"):
+    data_mgr = DataManager(DATA_FILE)
 
 
 class AutoStartManager:
@@ -277,14 +203,62 @@ class AutoStartManager:
 autostart_mgr = AutoStartManager()
 
 
+class ExportWorker(QThread):
+    """后台导出线程"""
+    progress = pyqtSignal(int)
+    succeeded = pyqtSignal(str)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, target, export_format="csv", parent=None):
+        super().__init__(parent)
+        self.target = target
+        self.export_format = export_format
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def is_cancelled(self):
+        return self._cancel_requested
+
+    def run(self):
+        try:
+            # 数据快照也在后台线程中复制，数据量大时界面不会卡住
+            data = data_mgr.snapshot()
+            exporter = CsvExporter(data, self.progress.emit, self.is_cancelled)
+            if self.export_format == "tkc":
+                path = write_columnar(self.target, data, self.progress.emit, self.is_cancelled)
+            elif self.export_format == "zip":
+                path = exporter.export_to_archive(self.target)
+            else:
+                path = exporter.export_to_dir(self.target)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            logging.error(f"导出数据失败: {str(e)}")
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(path)
+
+
 class WorkTracker(QWidget):
     UPDATE_URL = "http://localhost:5010/api/check-update"  # 更新检查地址
+    WINDOW_SIZE_SAVE_DELAY = 500  # 调整窗口大小停止后多久保存尺寸（毫秒）
 
     def __init__(self):
         super().__init__()
-        self.initUI()
-        self.init_state()
-        self.refresh_table()
+        # 拖动调整窗口时会连续触发 resizeEvent，停止调整后才保存一次尺寸
+        self.window_size_timer = QTimer(self)
+        self.window_size_timer.setSingleShot(True)
+        self.window_size_timer.setInterval(self.WINDOW_SIZE_SAVE_DELAY)
+        self.window_size_timer.timeout.connect(self.save_window_size)
+        with startup_profiler.phase("init_ui"):
+            self.initUI()
+        with startup_profiler.phase("init_state"):
+            self.init_state()
+        with startup_profiler.phase("first_tab"):
+            self.on_tab_changed(self.tabs.currentIndex())
         
         # 启动时自动检查更新
         if IS_DEV:
@@ -306,9 +280,18 @@ class WorkTracker(QWidget):
         layout = QVBoxLayout()
         self.tabs = QTabWidget()
 
-        self.init_summary_tab()
-        self.init_todo_tab()
-        self.init_kpi_tab()
+        # 标签页视图：(视图名, 标题, 构建方法, 刷新方法)
+        # 标签页在首次显示时才构建；数据变化时只刷新可见视图，其余视图标记为待刷新
+        self.tab_views = [
+            ("summary", "完成统计", self.init_summary_tab, self.refresh_summary_view),
+            ("todo", "TODO 进度", self.init_todo_tab, self.refresh_todo_view),
+            ("kpi", "KPI管理", self.init_kpi_tab, self.refresh_kpi_view),
+        ]
+        self.built_views = set()
+        self.dirty_views = {name for name, _, _, _ in self.tab_views}
+        for _, title, _, _ in self.tab_views:
+            self.tabs.addTab(QWidget(), title)
+        self.tabs.currentChanged.connect(self.on_tab_changed)
 
         layout.addWidget(self.tabs)
 
@@ -318,6 +301,18 @@ class WorkTracker(QWidget):
         btn_layout.setContentsMargins(0, 10, 0, 0)  # 上边距10px
         btn_layout.addStretch(1)  # 左侧弹性空间
 
+        # 撤销/重做
+        self.undo_button = QPushButton("撤销")
+        self.undo_button.clicked.connect(self.undo)
+        btn_layout.addWidget(self.undo_button)
+        self.redo_button = QPushButton("重做")
+        self.redo_button.clicked.connect(self.redo)
+        btn_layout.addWidget(self.redo_button)
+        QShortcut(QKeySequence.Undo, self, activated=self.undo)
+        QShortcut(QKeySequence.Redo, self, activated=self.redo)
+        QShortcut(QKeySequence("Ctrl+Y"), self, activated=self.redo)
+        self.update_undo_buttons()
+
         # 添加AI聊天按钮
         self.chat_button = QPushButton("AI助手")
         self.chat_button.clicked.connect(self.show_chat_dialog)
@@ -335,7 +330,13 @@ class WorkTracker(QWidget):
         import_action.triggered.connect(self.import_data)
         
         export_action = data_menu.addAction("导出全部数据")
-        export_action.triggered.connect(self.export_all_data)
+        export_action.triggered.connect(lambda: self.export_all_data())
+
+        export_archive_action = data_menu.addAction("导出为压缩包")
+        export_archive_action.triggered.connect(lambda: self.export_all_data("zip"))
+
+        export_columnar_action = data_menu.addAction("导出为列式备份")
+        export_columnar_action.triggered.connect(lambda: self.export_all_data("tkc"))
         
         data_menu.addSeparator()
         
@@ -366,8 +367,67 @@ class WorkTracker(QWidget):
         else:
             autostart_mgr.disable()
 
-    def init_summary_tab(self):
-        tab = QWidget()
+    def on_tab_changed(self, index):
+        """切换标签页时按需构建，并刷新待刷新的数据"""
+        if index < 0:
+            return
+        name, _, build, _ = self.tab_views[index]
+        if name not in self.built_views:
+            build(self.tabs.widget(index))
+            self.built_views.add(name)
+        self.refresh_view(name)
+
+    def current_view(self):
+        return self.tab_views[self.tabs.currentIndex()][0]
+
+    def mark_dirty(self, *views):
+        """标记视图数据已变化：当前可见的视图立即刷新，其余视图等切换过去时再刷新"""
+        self.update_undo_buttons()
+        self.dirty_views.update(views)
+        current = self.current_view()
+        if current in views:
+            self.refresh_view(current)
+
+    def update_undo_buttons(self):
+        undo_label = data_mgr.undo_label()
+        redo_label = data_mgr.redo_label()
+        self.undo_button.setEnabled(undo_label is not None)
+        self.undo_button.setToolTip(f"撤销：{undo_label} (Ctrl+Z)" if undo_label else "没有可撤销的操作")
+        self.redo_button.setEnabled(redo_label is not None)
+        self.redo_button.setToolTip(f"重做：{redo_label} (Ctrl+Y)" if redo_label else "没有可重做的操作")
+
+    def undo(self):
+        if data_mgr.undo() is not None:
+            data_mgr.save()
+            self.refresh_table()
+
+    def redo(self):
+        if data_mgr.redo() is not None:
+            data_mgr.save()
+            self.refresh_table()
+
+    def refresh_view(self, name):
+        if name not in self.built_views or name not in self.dirty_views:
+            return
+        self.dirty_views.discard(name)
+        for view_name, _, _, refresh in self.tab_views:
+            if view_name == name:
+                refresh()
+                break
+
+    def refresh_summary_view(self):
+        self.refresh_summary_table()
+
+    def refresh_todo_view(self):
+        self.update_type_combo()
+        self.refresh_todo_tables()
+
+    def refresh_kpi_view(self):
+        self.update_project_type_combo()
+        self.update_todo_combo()
+        self.refresh_kpi_table()
+
+    def init_summary_tab(self, tab):
         layout = QVBoxLayout()
         form_layout = QHBoxLayout()
 
@@ -389,22 +449,23 @@ class WorkTracker(QWidget):
         form_layout.addWidget(self.add_button)
 
         self.table = QTableWidget()
-        self.table.setColumnCount(3)
-        self.table.setHorizontalHeaderLabels(["项目类型", "完成数量", "操作"])
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(["项目类型", "完成数量", "进行中", "已逾期", "整体进度", "操作"])
 
         # 在表格初始化后添加
         self.table.horizontalHeader().setDefaultAlignment(Qt.AlignCenter)
         self.table.setColumnWidth(0, 120)  # 项目类型列
         self.table.setColumnWidth(1, 80)  # 完成数量列
-        self.table.setColumnWidth(2, 100)  # 操作列
+        self.table.setColumnWidth(2, 80)  # 进行中列
+        self.table.setColumnWidth(3, 80)  # 已逾期列
+        self.table.setColumnWidth(4, 100)  # 整体进度列
+        self.table.setColumnWidth(5, 100)  # 操作列
 
         layout.addLayout(form_layout)
         layout.addWidget(self.table)
         tab.setLayout(layout)
-        self.tabs.addTab(tab, "完成统计")
 
-    def init_todo_tab(self):
-        tab = QWidget()
+    def init_todo_tab(self, tab):
         layout = QVBoxLayout()
         form_layout = QHBoxLayout()
 
@@ -443,11 +504,9 @@ class WorkTracker(QWidget):
         layout.addLayout(form_layout)
         layout.addWidget(self.todo_tabs)
         tab.setLayout(layout)
-        self.tabs.addTab(tab, "TODO 进度")
 
-    def init_kpi_tab(self):
+    def init_kpi_tab(self, tab):
         """初始化KPI管理标签页"""
-        tab = QWidget()
         layout = QVBoxLayout()
         
         # 初始化KPI控件
@@ -470,11 +529,9 @@ class WorkTracker(QWidget):
         
         self.kpi_todo_input = QComboBox()
         self.kpi_todo_input.addItem("无")  # 添加"无"选项
-        self.update_todo_combo()
         
-        # 添加项目类型选择
+        # 添加项目类型选择（下拉选项在视图刷新时填充）
         self.kpi_project_type_input = QComboBox()
-        self.update_project_type_combo()
         self.kpi_project_type_input.hide()  # 初始时隐藏
         
         # 添加项目类型标签
@@ -554,13 +611,12 @@ class WorkTracker(QWidget):
         layout.addWidget(self.kpi_table)
         
         tab.setLayout(layout)
-        self.tabs.addTab(tab, "KPI管理")
         
     def update_project_type_combo(self):
         """更新项目类型下拉列表"""
         self.kpi_project_type_input.clear()
-        for name, info in data_mgr.data["projects"].items():
-            self.kpi_project_type_input.addItem(f"{name} ({info['unit']})")
+        for project in data_mgr.data["projects"].values():
+            self.kpi_project_type_input.addItem(f"{project.name} ({project.unit})")
             
     def on_todo_changed(self, todo_text):
         """当关联Todo改变时"""
@@ -603,12 +659,12 @@ class WorkTracker(QWidget):
         self.kpi_todo_input.addItem("无")  # 添加"无"选项
         
         # 获取已关联的Todo ID列表
-        used_todo_ids = {kpi["todo_id"] for kpi in data_mgr.data["kpis"] if kpi["todo_id"] is not None}
+        used_todo_ids = {kpi.todo_id for kpi in data_mgr.data["kpis"] if kpi.todo_id is not None}
         
-        for todo in data_mgr.data["todos"]:
+        for i, todo in enumerate(data_mgr.data["todos"]):
             # 只显示未完成且未关联的Todo
-            if not todo["completed"] and data_mgr.data["todos"].index(todo) not in used_todo_ids:
-                self.kpi_todo_input.addItem(f"{todo['name']} ({todo['type']})")
+            if not todo.completed and i not in used_todo_ids:
+                self.kpi_todo_input.addItem(f"{todo.name} ({todo.type})")
                 
     def add_kpi(self):
         """添加新的KPI"""
@@ -641,9 +697,9 @@ class WorkTracker(QWidget):
             # 从关联的Todo获取单位
             todo_name = todo_str.split(" (")[0]
             for i, todo in enumerate(data_mgr.data["todos"]):
-                if todo["name"] == todo_name and not todo["completed"]:
+                if todo.name == todo_name and not todo.completed:
                     todo_id = i
-                    unit = todo["unit"]
+                    unit = todo.unit
                     # 如果名称为空，使用Todo的名称
                     if not name:
                         name = todo_name
@@ -657,7 +713,7 @@ class WorkTracker(QWidget):
                 
             project_name = project_type.split(" (")[0]
             if project_name in data_mgr.data["projects"]:
-                unit = data_mgr.data["projects"][project_name]["unit"]
+                unit = data_mgr.data["projects"][project_name].unit
             else:
                 QMessageBox.warning(self, "错误", "无效的项目类型")
                 return
@@ -672,30 +728,27 @@ class WorkTracker(QWidget):
             duration_type = DurationType.FOREVER.value
                     
         # 创建KPI
-        kpi = {
-            "id": len(data_mgr.data["kpis"]),
-            "name": name,
-            "period_type": period_type.value,
-            "custom_days": custom_days,
-            "target": target,
-            "unit": unit,
-            "todo_id": todo_id,
-            "duration_type": duration_type,
-            "created_at": QDate.currentDate().toString("yyyy-MM-dd")
-        }
+        kpi = Kpi(
+            id=len(data_mgr.data["kpis"]),
+            name=name,
+            period_type=period_type.value,
+            custom_days=custom_days,
+            target=target,
+            unit=unit,
+            todo_id=todo_id,
+            duration_type=duration_type,
+            created_at=qdate_to_day(QDate.currentDate())
+        )
         
-        data_mgr.data["kpis"].append(kpi)
+        data_mgr.add_kpi(kpi)
         data_mgr.save()
         
         # 清空输入
         self.kpi_name_input.clear()
         self.kpi_target_input.clear()
         
-        # 更新Todo下拉列表
-        self.update_todo_combo()
-        
-        # 刷新表格
-        self.refresh_kpi_table()
+        # 刷新KPI表格与Todo下拉列表
+        self.mark_dirty("kpi")
         
     def show_kpi_summary(self):
         """显示KPI总结窗口"""
@@ -708,8 +761,8 @@ class WorkTracker(QWidget):
         
         # 创建表格
         table = QTableWidget()
-        table.setColumnCount(6)  # 增加一列
-        table.setHorizontalHeaderLabels(["KPI名称", "周期", "目标", "关联Todo", "完成率", "最近完成"])
+        table.setColumnCount(7)
+        table.setHorizontalHeaderLabels(["KPI名称", "周期", "目标", "关联Todo", "完成率", "最近完成", "连续完成"])
         
         # 设置列宽
         table.setColumnWidth(0, 150)  # KPI名称
@@ -718,50 +771,41 @@ class WorkTracker(QWidget):
         table.setColumnWidth(3, 200)  # 关联Todo
         table.setColumnWidth(4, 100)  # 完成率
         table.setColumnWidth(5, 150)  # 最近完成
+        table.setColumnWidth(6, 100)  # 连续完成
         
         # 计算统计数据
-        current_date = QDate.currentDate()
-        start_date = current_date.addDays(-30)  # 统计最近30天
+        current_day = qdate_to_day(QDate.currentDate())
+        start_day = current_day - 30  # 统计最近30天
         
+        engine = data_mgr.kpi_engine
         for kpi in data_mgr.data["kpis"]:
-            # 计算完成率
-            completed_days = 0
-            total_days = 0
-            last_completed_date = None
-            
-            date = start_date
-            while date <= current_date:
-                date_str = date.toString("yyyy-MM-dd")
-                if data_mgr.is_kpi_completed_for_date(kpi["id"], date_str):
-                    completed_days += 1
-                    last_completed_date = date
-                total_days += 1
-                date = date.addDays(1)
-            
-            completion_rate = (completed_days / total_days * 100) if total_days > 0 else 0
+            # 按KPI周期计算完成率：最近30天涉及的周期中已完成周期的比例
+            completion_rate = engine.completion_rate(kpi, start_day, current_day) * 100
+            last_completed_day = engine.last_completed_day(kpi, current_day)
+            streak = engine.streak(kpi, current_day)
             
             # 添加行
             row = table.rowCount()
             table.insertRow(row)
             
             # KPI名称
-            table.setItem(row, 0, QTableWidgetItem(kpi["name"]))
+            table.setItem(row, 0, QTableWidgetItem(kpi.name))
             
             # 周期
-            period_type = PeriodType(kpi["period_type"])
+            period_type = PeriodType(kpi.period_type)
             period_text = PERIOD_TYPE_LABELS[period_type]
-            if period_type == PeriodType.CUSTOM and kpi["custom_days"]:
-                period_text = f"每{kpi['custom_days']}天"
+            if period_type == PeriodType.CUSTOM and kpi.custom_days:
+                period_text = f"每{kpi.custom_days}天"
             table.setItem(row, 1, QTableWidgetItem(period_text))
             
             # 目标
-            table.setItem(row, 2, QTableWidgetItem(f"{kpi['target']}{kpi['unit']}"))
+            table.setItem(row, 2, QTableWidgetItem(f"{kpi.target}{kpi.unit}"))
             
             # 关联Todo
             todo_text = "无"
-            if kpi["todo_id"] is not None and kpi["todo_id"] < len(data_mgr.data["todos"]):
-                todo = data_mgr.data["todos"][kpi["todo_id"]]
-                todo_text = f"{todo['name']} ({todo['type']})"
+            if kpi.todo_id is not None and kpi.todo_id < len(data_mgr.data["todos"]):
+                todo = data_mgr.data["todos"][kpi.todo_id]
+                todo_text = f"{todo.name} ({todo.type})"
             table.setItem(row, 3, QTableWidgetItem(todo_text))
             
             # 完成率
@@ -771,10 +815,15 @@ class WorkTracker(QWidget):
             
             # 最近完成
             last_completed = "从未完成"
-            if last_completed_date:
-                last_completed = last_completed_date.toString("yyyy-MM-dd")
+            if last_completed_day:
+                last_completed = day_to_date(last_completed_day)
             table.setItem(row, 5, QTableWidgetItem(last_completed))
             
+            # 连续完成的周期数
+            streak_item = QTableWidgetItem(f"{streak}个周期")
+            streak_item.setTextAlignment(Qt.AlignCenter)
+            table.setItem(row, 6, streak_item)
+            
             # 根据完成率设置颜色
             if completion_rate >= 80:
                 color = QColor(144, 238, 144)  # 浅绿色
@@ -794,32 +843,13 @@ class WorkTracker(QWidget):
     def refresh_kpi_table(self):
         """刷新KPI表格"""
         self.kpi_table.setRowCount(0)
-        current_date = self.kpi_date_input.date().toString("yyyy-MM-dd")
+        current_day = qdate_to_day(self.kpi_date_input.date())
         
-        # 先收集所有KPI项
+        # 先收集有效期内的KPI项
         kpi_items = []
-        for kpi in data_mgr.data["kpis"]:
-            # 检查KPI是否在有效期内
-            created_date = QDate.fromString(kpi["created_at"], "yyyy-MM-dd")
-            current_qdate = self.kpi_date_input.date()
-            
-            # 计算持续时间
-            duration_days = 0
-            if kpi["duration_type"] == DurationType.ONE_WEEK.value:
-                duration_days = 7
-            elif kpi["duration_type"] == DurationType.ONE_MONTH.value:
-                duration_days = 30
-            elif kpi["duration_type"] == DurationType.FOREVER.value:
-                duration_days = float('inf')
-                
-            # 检查日期是否在有效期内
-            if duration_days != float('inf'):
-                end_date = created_date.addDays(duration_days)
-                if current_qdate < created_date or current_qdate > end_date:
-                    continue
-                    
+        for kpi in data_mgr.get_active_kpis(current_day):
             # 检查完成状态
-            is_completed = data_mgr.is_kpi_completed_for_date(kpi["id"], current_date)
+            is_completed = data_mgr.is_kpi_completed_for_period(kpi, current_day)
             
             kpi_items.append({
                 "kpi": kpi,
@@ -845,38 +875,38 @@ class WorkTracker(QWidget):
                     self.kpi_table.setItem(row, col, item)
             
             # KPI名称
-            name_item = QTableWidgetItem(kpi["name"])
+            name_item = QTableWidgetItem(kpi.name)
             if is_completed:
                 name_item.setFlags(name_item.flags() & ~Qt.ItemIsEnabled)
             self.kpi_table.setItem(row, 0, name_item)
             
             # 周期
-            period_type = PeriodType(kpi["period_type"])
+            period_type = PeriodType(kpi.period_type)
             period_text = PERIOD_TYPE_LABELS[period_type]
-            if period_type == PeriodType.CUSTOM and kpi["custom_days"]:
-                period_text = f"每{kpi['custom_days']}天"
+            if period_type == PeriodType.CUSTOM and kpi.custom_days:
+                period_text = f"每{kpi.custom_days}天"
             period_item = QTableWidgetItem(period_text)
             if is_completed:
                 period_item.setFlags(period_item.flags() & ~Qt.ItemIsEnabled)
             self.kpi_table.setItem(row, 1, period_item)
             
             # 目标
-            target_item = QTableWidgetItem(str(kpi["target"]))
+            target_item = QTableWidgetItem(str(kpi.target))
             if is_completed:
                 target_item.setFlags(target_item.flags() & ~Qt.ItemIsEnabled)
             self.kpi_table.setItem(row, 2, target_item)
             
             # 单位
-            unit_item = QTableWidgetItem(kpi["unit"])
+            unit_item = QTableWidgetItem(kpi.unit)
             if is_completed:
                 unit_item.setFlags(unit_item.flags() & ~Qt.ItemIsEnabled)
             self.kpi_table.setItem(row, 3, unit_item)
             
             # 关联Todo
             todo_text = "无"
-            if kpi["todo_id"] is not None and kpi["todo_id"] < len(data_mgr.data["todos"]):
-                todo = data_mgr.data["todos"][kpi["todo_id"]]
-                todo_text = f"{todo['name']} ({todo['type']})"
+            if kpi.todo_id is not None and kpi.todo_id < len(data_mgr.data["todos"]):
+                todo = data_mgr.data["todos"][kpi.todo_id]
+                todo_text = f"{todo.name} ({todo.type})"
             todo_item = QTableWidgetItem(todo_text)
             if is_completed:
                 todo_item.setFlags(todo_item.flags() & ~Qt.ItemIsEnabled)
@@ -895,11 +925,11 @@ class WorkTracker(QWidget):
             btn_layout.setContentsMargins(0, 0, 0, 0)
             
             toggle_btn = QPushButton("标记完成" if not is_completed else "标记未完成")
-            toggle_btn.clicked.connect(lambda _, i=kpi["id"]: self.toggle_kpi_completion(i))
+            toggle_btn.clicked.connect(lambda _, i=kpi.id: self.toggle_kpi_completion(i))
             btn_layout.addWidget(toggle_btn)
             
             delete_btn = QPushButton("删除")
-            delete_btn.clicked.connect(lambda _, i=kpi["id"]: self.delete_kpi(i))
+            delete_btn.clicked.connect(lambda _, i=kpi.id: self.delete_kpi(i))
             btn_layout.addWidget(delete_btn)
             
             btn_box.setLayout(btn_layout)
@@ -919,57 +949,53 @@ class WorkTracker(QWidget):
 
     def toggle_kpi_completion(self, kpi_id):
         """切换KPI完成状态"""
-        current_date = self.kpi_date_input.date().toString("yyyy-MM-dd")
-        is_completed = data_mgr.is_kpi_completed_for_date(kpi_id, current_date)
-        
-        # 更新KPI记录
-        data_mgr.save_kpi_record(current_date, kpi_id, not is_completed)
-        
-        # 如果KPI关联了Todo，更新Todo进度
-        kpi = next((k for k in data_mgr.data["kpis"] if k["id"] == kpi_id), None)
-        if kpi and kpi["todo_id"] is not None and kpi["todo_id"] < len(data_mgr.data["todos"]):
-            todo_idx = kpi["todo_id"]
-            todo = data_mgr.data["todos"][todo_idx]
-            
-            if not is_completed:  # 标记为完成
-                if todo["progress_type"] == ProgressType.CUMULATIVE:
-                    # 累计进度，增加KPI的目标值
-                    data_mgr.data["todos"][todo_idx]["progress"] += kpi["target"]
-                else:
-                    # 准确进度，在原有进度基础上增加KPI的目标值
-                    current_progress = todo["progress"] or 0
-                    data_mgr.data["todos"][todo_idx]["progress"] = current_progress + kpi["target"]
+        kpi = data_mgr.get_kpi(kpi_id)
+        if kpi is None:
+            return
+        current_day = qdate_to_day(self.kpi_date_input.date())
+        is_completed = data_mgr.is_kpi_completed_for_period(kpi, current_day)
+        
+        with data_mgr.transaction(f"{'取消完成' if is_completed else '完成'}KPI「{kpi.name}」"):
+            # 更新KPI记录：周期内完成一次即视为该周期完成
+            changed_days = data_mgr.set_kpi_period_completed(kpi, current_day, not is_completed)
+        
+            # 如果KPI关联了Todo，更新Todo进度
+            if kpi.todo_id is not None and kpi.todo_id < len(data_mgr.data["todos"]):
+                todo_idx = kpi.todo_id
+                with data_mgr.edit_todo(todo_idx) as todo:
+                    if not is_completed:  # 标记为完成
+                        if todo.progress_type == ProgressType.CUMULATIVE:
+                            # 累计进度，增加KPI的目标值
+                            todo.progress += kpi.target
+                        else:
+                            # 准确进度，在原有进度基础上增加KPI的目标值
+                            current_progress = todo.progress or 0
+                            todo.progress = current_progress + kpi.target
+                    else:  # 标记为未完成
+                        # 周期内每个完成日都计入过一次进度，清除了几天就减去几次
+                        delta = kpi.target * len(changed_days)
+                        if todo.progress_type == ProgressType.CUMULATIVE:
+                            # 累计进度，减少KPI的目标值
+                            todo.progress = max(0, todo.progress - delta)
+                        else:
+                            # 准确进度，在原有进度基础上减少KPI的目标值
+                            current_progress = todo.progress or 0
+                            todo.progress = max(0, current_progress - delta)
                     
                 # 检查是否完成
-                if data_mgr.data["todos"][todo_idx]["progress"] >= todo["target"]:
+                if not is_completed and todo.progress >= todo.target:
                     self.complete_todo(todo_idx)
-            else:  # 标记为未完成
-                if todo["progress_type"] == ProgressType.CUMULATIVE:
-                    # 累计进度，减少KPI的目标值
-                    data_mgr.data["todos"][todo_idx]["progress"] = max(0, todo["progress"] - kpi["target"])
-                else:
-                    # 准确进度，在原有进度基础上减少KPI的目标值
-                    current_progress = todo["progress"] or 0
-                    data_mgr.data["todos"][todo_idx]["progress"] = max(0, current_progress - kpi["target"])
                     
         # 确保数据被保存
         data_mgr.save()
-        self.refresh_kpi_table()
-        self.refresh_todo_tables()
+        self.mark_dirty("summary", "kpi", "todo")
         
     def delete_kpi(self, kpi_id):
         """删除KPI"""
-        # 从KPI列表中移除
-        data_mgr.data["kpis"] = [k for k in data_mgr.data["kpis"] if k["id"] != kpi_id]
-        
-        # 从记录中移除
-        for date_str in data_mgr.data["kpi_records"]:
-            if kpi_id in data_mgr.data["kpi_records"][date_str]:
-                del data_mgr.data["kpi_records"][date_str][kpi_id]
-                
+        # 从KPI列表及完成记录中移除
+        data_mgr.delete_kpi(kpi_id)
         data_mgr.save()
-        self.refresh_kpi_table()
-        self.update_todo_combo()  # 刷新TODO下拉列表
+        self.mark_dirty("kpi")
 
     def init_todo_table(self, table, headers):
         table.setColumnCount(len(headers))
@@ -995,16 +1021,12 @@ class WorkTracker(QWidget):
         return widget
 
     def refresh_table(self):
-        self.update_type_combo()
-        self.refresh_summary_table()
-        self.refresh_todo_tables()
-        self.refresh_kpi_table()
-        self.update_todo_combo()
+        self.mark_dirty("summary", "todo", "kpi")
 
     def update_type_combo(self):
         self.todo_type_input.clear()
-        for name, info in data_mgr.data["projects"].items():
-            self.todo_type_input.addItem(f"{name} ({info['unit']})")
+        for project in data_mgr.data["projects"].values():
+            self.todo_type_input.addItem(f"{project.name} ({project.unit})")
 
     def add_project(self):
         name = self.name_input.text().strip()
@@ -1012,20 +1034,15 @@ class WorkTracker(QWidget):
         progress_type = ProgressType.ABSOLUTE if self.progress_type_combo.currentIndex() == 0 else ProgressType.CUMULATIVE
 
         if name and unit and name not in data_mgr.data["projects"]:
-            data_mgr.data["projects"][name] = {
-                "unit": unit,
-                "count": 0,
-                "progress_type": progress_type
-            }
-            self.update_type_combo()
+            data_mgr.add_project(Project(name, unit, 0, progress_type))
             data_mgr.save()
-            self.refresh_summary_table()
+            self.mark_dirty("summary", "todo", "kpi")
 
     def add_todo(self):
         name = self.todo_name_input.text().strip()
         type_str = self.todo_type_input.currentText()
         target = self.todo_target_input.text().strip()
-        deadline = self.todo_deadline_input.date().toString("yyyy-MM-dd")
+        deadline = qdate_to_day(self.todo_deadline_input.date())
 
         if not (name and type_str and target):
             return
@@ -1043,53 +1060,59 @@ class WorkTracker(QWidget):
 
         project = data_mgr.data["projects"][type_name]
 
-        data_mgr.data["todos"].append({
-            "name": name,
-            "type": type_name,
-            "unit": unit,
-            "target": target,
-            "progress": 0.0,  # 无论是什么进度类型，都初始化为0
-            "progress_type": project["progress_type"],
-            "deadline": deadline,
-            "completed": False
-        })
+        data_mgr.add_todo(Todo(
+            name=name,
+            type=type_name,
+            unit=unit,
+            target=target,
+            progress=0.0,  # 无论是什么进度类型，都初始化为0
+            progress_type=project.progress_type,
+            deadline=deadline,
+            completed=False
+        ))
 
         self.todo_name_input.clear()
         self.todo_target_input.clear()
         data_mgr.save()
-        self.refresh_todo_tables()
-        self.update_todo_combo()
+        self.mark_dirty("summary", "todo", "kpi")
 
     def refresh_summary_table(self):
+        today = qdate_to_day(QDate.currentDate())
         self.table.setRowCount(len(data_mgr.data["projects"]))
-        for row, (name, info) in enumerate(data_mgr.data["projects"].items()):
-            unit_item = QTableWidgetItem(f"{name} ({info['unit']})")
-            count_item = QTableWidgetItem(str(info["count"]))
-
-            unit_item.setTextAlignment(Qt.AlignCenter)
-            count_item.setTextAlignment(Qt.AlignCenter)
-
-            self.table.setItem(row, 0, unit_item)
-            self.table.setItem(row, 1, count_item)
+        for row, project in enumerate(data_mgr.data["projects"].values()):
+            # 进行中、逾期和整体进度由 DataManager 增量维护，不需要遍历TODO
+            stats = data_mgr.get_project_stats(project.name)
+            rate = stats.progress_rate()
+            texts = [
+                f"{project.name} ({project.unit})",
+                str(project.count),
+                str(stats.open_count),
+                str(stats.overdue_count(today)),
+                f"{rate * 100:.1f}%" if rate is not None else "-"
+            ]
+            for col, text in enumerate(texts):
+                item = QTableWidgetItem(text)
+                item.setTextAlignment(Qt.AlignCenter)
+                self.table.setItem(row, col, item)
 
             btn = QPushButton("删除")
             btn.clicked.connect(lambda _, r=row: self.delete_project(r))
-            self.table.setCellWidget(row, 2, btn)
+            self.table.setCellWidget(row, 5, btn)
 
     def refresh_todo_tables(self):
         for table in [self.todo_table, self.completed_table]:
             table.setRowCount(0)
 
         for idx, todo in enumerate(data_mgr.data["todos"]):
-            table = self.completed_table if todo["completed"] else self.todo_table
+            table = self.completed_table if todo.completed else self.todo_table
             row = table.rowCount()
             table.insertRow(row)
 
             # 基本信息
-            table.setItem(row, 0, QTableWidgetItem(todo["name"]))
-            table.setItem(row, 1, QTableWidgetItem(f"{todo['type']} ({todo['unit']})"))
-            table.setItem(row, 3, QTableWidgetItem(f"{todo['progress']}/{todo['target']}{todo['unit']}"))
-            table.setItem(row, 4, QTableWidgetItem(todo["deadline"]))
+            table.setItem(row, 0, QTableWidgetItem(todo.name))
+            table.setItem(row, 1, QTableWidgetItem(f"{todo.type} ({todo.unit})"))
+            table.setItem(row, 3, QTableWidgetItem(f"{todo.progress}/{todo.target}{todo.unit}"))
+            table.setItem(row, 4, QTableWidgetItem(day_to_date(todo.deadline)))
 
             # 进度显示
             progress = QProgressBar()
@@ -1098,15 +1121,15 @@ class WorkTracker(QWidget):
             progress.setFixedHeight(20)  # 高度调整为20像素
             progress.setFixedWidth(180)
 
-            if todo["progress_type"] == ProgressType.CUMULATIVE:
-                progress_val = (todo["progress"] / todo["target"]) * 100
+            if todo.progress_type == ProgressType.CUMULATIVE:
+                progress_val = (todo.progress / todo.target) * 100
                 progress.setValue(int(progress_val))
-                # progress.setFormat(f"{todo['progress']}/{todo['target']}{todo['unit']}")
+                # progress.setFormat(f"{todo.progress}/{todo.target}{todo.unit}")
             else:
-                if todo["progress"] is not None:
-                    progress_val = (todo["progress"] / todo["target"]) * 100
+                if todo.progress is not None:
+                    progress_val = (todo.progress / todo.target) * 100
                     progress.setValue(int(progress_val))
-                    # progress.setFormat(f"{todo['progress']}{todo['unit']}")
+                    # progress.setFormat(f"{todo.progress}{todo.unit}")
                 else:
                     progress.setValue(0)
                     progress.setFormat("未开始")
@@ -1125,7 +1148,7 @@ class WorkTracker(QWidget):
             btn_layout = QHBoxLayout()
             btn_layout.setContentsMargins(0, 0, 0, 0)
 
-            if not todo["completed"]:
+            if not todo.completed:
                 update_btn = QPushButton("更新进度")
                 update_btn.clicked.connect(lambda _, i=idx: self.update_progress(i))
                 btn_layout.addWidget(update_btn)
@@ -1139,78 +1162,71 @@ class WorkTracker(QWidget):
             delete_btn.clicked.connect(lambda _, i=idx: self.delete_todo(i))
             btn_layout.addWidget(delete_btn)
 
-            if todo["completed"]:
+            if todo.completed:
                 restore_btn = QPushButton("恢复")
                 restore_btn.clicked.connect(lambda _, i=idx: self.restore_todo(i))
                 btn_layout.addWidget(restore_btn)
 
             btn_box.setLayout(btn_layout)
-            table.setCellWidget(row, 6 if todo["completed"] else 5, btn_box)
+            table.setCellWidget(row, 6 if todo.completed else 5, btn_box)
 
             # 完成时间
-            if todo["completed"]:
-                table.setItem(row, 5, QTableWidgetItem(todo.get("complete_time", "")))
+            if todo.completed:
+                table.setItem(row, 5, QTableWidgetItem(day_to_date(todo.complete_time) if todo.complete_time else ""))
 
     def update_progress(self, index):
         todo = data_mgr.data["todos"][index]
         dialog = QInputDialog(self)
         dialog.setWindowTitle("更新进度")
 
-        if todo["progress_type"] == ProgressType.ABSOLUTE:
-            dialog.setLabelText(f"当前进度（{todo['unit']}）:")
-            dialog.setDoubleRange(0, todo["target"])
+        if todo.progress_type == ProgressType.ABSOLUTE:
+            dialog.setLabelText(f"当前进度（{todo.unit}）:")
+            dialog.setDoubleRange(0, todo.target)
             dialog.setDoubleDecimals(0)
-            dialog.setDoubleValue(todo["progress"] or 0)
+            dialog.setDoubleValue(todo.progress or 0)
         else:
-            dialog.setLabelText(f"本次完成量（{todo['unit']}）:")
-            dialog.setDoubleRange(0, todo["target"] - todo["progress"])
+            dialog.setLabelText(f"本次完成量（{todo.unit}）:")
+            dialog.setDoubleRange(0, todo.target - todo.progress)
             dialog.setDoubleDecimals(1)
             dialog.setDoubleValue(0)
 
         if dialog.exec_() == QInputDialog.Accepted:
             value = dialog.doubleValue()
 
-            if todo["progress_type"] == ProgressType.ABSOLUTE:
-                data_mgr.data["todos"][index]["progress"] = value
-            else:
-                data_mgr.data["todos"][index]["progress"] += value
+            with data_mgr.transaction(f"更新进度「{todo.name}」"):
+                with data_mgr.edit_todo(index):
+                    if todo.progress_type == ProgressType.ABSOLUTE:
+                        todo.progress = value
+                    else:
+                        todo.progress += value
 
-            # 检查是否完成
-            if data_mgr.data["todos"][index]["progress"] >= todo["target"]:
-                self.complete_todo(index)
+                # 检查是否完成
+                if todo.progress >= todo.target:
+                    self.complete_todo(index)
 
             data_mgr.save()
-            self.refresh_todo_tables()
+            self.mark_dirty("summary", "todo", "kpi")
 
     def complete_todo(self, index):
-        todo = data_mgr.data["todos"][index]
-        todo["completed"] = True
-        todo["complete_time"] = QDate.currentDate().toString("yyyy-MM-dd")
-        data_mgr.data["projects"][todo["type"]]["count"] += 1
+        data_mgr.complete_todo(index, qdate_to_day(QDate.currentDate()))
         data_mgr.save()
+        self.mark_dirty("summary", "kpi")
 
     def delete_project(self, row):
         name = list(data_mgr.data["projects"].keys())[row]
-        del data_mgr.data["projects"][name]
-        self.update_type_combo()
+        data_mgr.delete_project(name)
         data_mgr.save()
-        self.refresh_summary_table()
+        self.mark_dirty("summary", "todo", "kpi")
 
     def delete_todo(self, index):
-        del data_mgr.data["todos"][index]
+        data_mgr.delete_todo(index)
         data_mgr.save()
-        self.refresh_todo_tables()
-        self.update_todo_combo()
+        self.mark_dirty("summary", "todo", "kpi")
 
     def restore_todo(self, index):
-        todo = data_mgr.data["todos"][index]
-        todo["completed"] = False
-        if "complete_time" in todo:
-            del todo["complete_time"]
-        data_mgr.data["projects"][todo["type"]]["count"] -= 1
+        data_mgr.restore_todo(index)
         data_mgr.save()
-        self.refresh_todo_tables()
-        self.update_todo_combo()
+        self.mark_dirty("summary", "todo", "kpi")
 
     def edit_todo(self, index):
         todo = data_mgr.data["todos"][index]
@@ -1219,28 +1235,28 @@ class WorkTracker(QWidget):
         layout = QVBoxLayout()
 
         # 名称编辑
-        name_edit = QLineEdit(todo["name"])
+        name_edit = QLineEdit(todo.name)
         layout.addWidget(QLabel("名称:"))
         layout.addWidget(name_edit)
 
         # 目标编辑
-        target_edit = QLineEdit(str(todo["target"]))
+        target_edit = QLineEdit(str(todo.target))
         layout.addWidget(QLabel("目标:"))
         layout.addWidget(target_edit)
 
         # 截止时间选择
-        deadline_edit = QDateEdit(QDate.fromString(todo["deadline"], "yyyy-MM-dd"))
+        deadline_edit = QDateEdit(day_to_qdate(todo.deadline))
         deadline_edit.setCalendarPopup(True)
         layout.addWidget(QLabel("截止时间:"))
         layout.addWidget(deadline_edit)
 
         # 进度编辑（根据类型）
-        if todo["progress_type"] == ProgressType.ABSOLUTE:
-            progress_edit = QLineEdit(str(todo["progress"]))
+        if todo.progress_type == ProgressType.ABSOLUTE:
+            progress_edit = QLineEdit(str(todo.progress))
             layout.addWidget(QLabel("当前进度:"))
             layout.addWidget(progress_edit)
         else:
-            progress_label = QLabel(str(todo["progress"]))
+            progress_label = QLabel(str(todo.progress))
             layout.addWidget(QLabel("累计进度:"))
             layout.addWidget(progress_label)
 
@@ -1256,42 +1272,44 @@ class WorkTracker(QWidget):
             try:
                 # 数据校验
                 new_target = float(target_edit.text())
-                new_deadline = deadline_edit.date().toString("yyyy-MM-dd")
+                new_deadline = qdate_to_day(deadline_edit.date())
 
-                # 更新数据
-                todo.update({
-                    "name": name_edit.text(),
-                    "target": new_target,
-                    "deadline": new_deadline
-                })
-
-                # 处理绝对进度更新
-                if todo["progress_type"] == ProgressType.ABSOLUTE:
+                new_progress = None
+                if todo.progress_type == ProgressType.ABSOLUTE:
                     new_progress = float(progress_edit.text())
-                    todo["progress"] = min(new_progress, new_target)
+
+                # 更新数据
+                with data_mgr.edit_todo(index):
+                    todo.name = name_edit.text()
+                    todo.target = new_target
+                    todo.deadline = new_deadline
+                    # 处理绝对进度更新
+                    if new_progress is not None:
+                        todo.progress = min(new_progress, new_target)
 
                 data_mgr.save()
-                self.refresh_todo_tables()
-                self.update_todo_combo()
+                self.mark_dirty("summary", "todo", "kpi")
 
             except ValueError:
                 QMessageBox.warning(self, "输入错误", "请输入有效的数字")
 
+    def save_window_size(self):
+        data_mgr.save([self.width(), self.height()])
+
     def resizeEvent(self, event):
-        # 窗口大小改变时实时保存
-        data_mgr.data["window_size"] = [self.width(), self.height()]
-        data_mgr.save()
+        # 窗口大小改变后延迟保存，连续调整时只保存最终尺寸
+        self.window_size_timer.start()
         super().resizeEvent(event)
 
     def closeEvent(self, event):
         # 保存当前窗口尺寸
-        data_mgr.data["window_size"] = [self.width(), self.height()]
-        data_mgr.save()
+        self.window_size_timer.stop()
+        self.save_window_size()
         super().closeEvent(event)
 
     def format_progress(self, todo):
-        progress = todo["progress"]
-        target = todo["target"]
+        progress = todo.progress
+        target = todo.target
 
         if progress is None:
             return "未开始"
@@ -1299,241 +1317,117 @@ class WorkTracker(QWidget):
         try:
             percentage = (progress / target) * 100
             # 保留1位小数，如：50(25.0%)
-            return f"{progress}{todo['unit']}({percentage:.1f}%)"
+            return f"{progress}{todo.unit}({percentage:.1f}%)"
         except ZeroDivisionError:
             return "无效目标"
 
-    def export_all_data(self):
+    def export_all_data(self, export_format="csv"):
+        """导出全部数据
+        Args:
+            export_format (str): csv 导出为目录下的四个CSV文件；zip 导出为单个压缩包；
+                tkc 导出为列式备份文件，体积最小，适合长期备份
+        """
         dir_path = QFileDialog.getExistingDirectory(self, "选择保存目录")
         if not dir_path: return
 
-        try:
-            timestamp = QDateTime.currentDateTime().toString("yyyyMMdd_hhmmss")
-            export_dir = os.path.join(dir_path, f"export_{timestamp}")
-            os.makedirs(export_dir, exist_ok=True)
-
-            # 导出项目数据
-            projects_path = os.path.join(export_dir, "projects.csv")
-            with open(projects_path, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=["类型", "单位", "进度类型", "完成数量"])
-                writer.writeheader()
-                for name, info in data_mgr.data["projects"].items():
-                    writer.writerow({
-                        "类型": name,
-                        "单位": info["unit"],
-                        "进度类型": info["progress_type"],
-                        "完成数量": info["count"]
-                    })
-
-            # 导出TODO数据
-            todos_path = os.path.join(export_dir, "todos.csv")
-            with open(todos_path, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    "名称", "类型", "目标值", "当前进度", "进度类型",
-                    "截止时间", "完成状态", "完成时间"
-                ])
-                writer.writeheader()
-                for todo in data_mgr.data["todos"]:
-                    writer.writerow({
-                        "名称": todo["name"],
-                        "类型": todo["type"],
-                        "目标值": todo["target"],
-                        "当前进度": todo["progress"],
-                        "进度类型": todo["progress_type"],
-                        "截止时间": todo["deadline"],
-                        "完成状态": "已完成" if todo["completed"] else "进行中",
-                        "完成时间": todo.get("complete_time", "")
-                    })
-                    
-            # 导出KPI数据
-            kpis_path = os.path.join(export_dir, "kpis.csv")
-            with open(kpis_path, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    "ID", "名称", "周期类型", "自定义天数", "目标", "关联Todo", "创建时间"
-                ])
-                writer.writeheader()
-                for kpi in data_mgr.data["kpis"]:
-                    todo_name = "无"
-                    if kpi["todo_id"] is not None and kpi["todo_id"] < len(data_mgr.data["todos"]):
-                        todo = data_mgr.data["todos"][kpi["todo_id"]]
-                        todo_name = f"{todo['name']} ({todo['type']})"
-                        
-                    writer.writerow({
-                        "ID": kpi["id"],
-                        "名称": kpi["name"],
-                        "周期类型": kpi["period_type"],
-                        "自定义天数": kpi["custom_days"] or "",
-                        "目标": kpi["target"],
-                        "关联Todo": todo_name,
-                        "创建时间": kpi["created_at"]
-                    })
-                    
-            # 导出KPI记录数据
-            kpi_records_path = os.path.join(export_dir, "kpi_records.csv")
-            with open(kpi_records_path, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=["日期", "KPI ID", "KPI名称", "完成状态"])
-                writer.writeheader()
-                
-                for date_str, records in data_mgr.data["kpi_records"].items():
-                    for kpi_id, completed in records.items():
-                        kpi = next((k for k in data_mgr.data["kpis"] if k["id"] == kpi_id), None)
-                        if kpi:
-                            writer.writerow({
-                                "日期": date_str,
-                                "KPI ID": kpi_id,
-                                "KPI名称": kpi["name"],
-                                "完成状态": "已完成" if completed else "未完成"
-                            })
-
-            QMessageBox.information(self, "导出成功", f"数据已保存至：{export_dir}")
+        timestamp = QDateTime.currentDateTime().toString("yyyyMMdd_hhmmss")
+        suffix = {"zip": ".zip", "tkc": COLUMNAR_EXTENSION}.get(export_format, "")
+        target = os.path.join(dir_path, f"export_{timestamp}{suffix}")
 
-        except Exception as e:
-            QMessageBox.critical(self, "导出失败", f"错误信息：{str(e)}")
+        progress = QProgressDialog("正在导出数据...", "取消", 0, 100, self)
+        progress.setWindowTitle("导出数据")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(500)
+
+        # 在后台线程中导出数据快照，界面保持响应
+        worker = ExportWorker(target, export_format, self)
+        worker.progress.connect(progress.setValue)
+        progress.canceled.connect(worker.cancel)
+
+        def on_succeeded(path):
+            progress.close()
+            QMessageBox.information(self, "导出成功", f"数据已保存至：{path}")
+
+        def on_failed(error):
+            progress.close()
+            QMessageBox.critical(self, "导出失败", f"错误信息：{error}")
+
+        def on_cancelled():
+            progress.close()
+            QMessageBox.information(self, "导出已取消", "已取消导出")
+
+        worker.succeeded.connect(on_succeeded)
+        worker.failed.connect(on_failed)
+        worker.cancelled.connect(on_cancelled)
+        worker.finished.connect(worker.deleteLater)
+        self.export_worker = worker
+        worker.start()
 
     def import_data(self):
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "选择数据文件", "", "CSV文件 (*.csv)"
+            self, "选择数据文件", "",
+            f"数据文件 (*.csv *{COLUMNAR_EXTENSION});;CSV文件 (*.csv);;列式备份 (*{COLUMNAR_EXTENSION})"
         )
         if not file_path: return
 
-        try:
-            file_name = os.path.basename(file_path).lower()
-            
-            with open(file_path, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-
-                if file_name == "projects.csv":  # 项目数据
-                    for row in reader:
-                        name = row["类型"]
-                        if name in data_mgr.data["projects"]:
-                            # 更新现有项目
-                            data_mgr.data["projects"][name].update({
-                                "unit": row["单位"],
-                                "progress_type": row.get("进度类型", ProgressType.ABSOLUTE),  # 使用get方法，默认值为ABSOLUTE
-                                "count": int(row["完成数量"])
-                            })
-                        else:
-                            # 新增项目
-                            data_mgr.data["projects"][name] = {
-                                "unit": row["单位"],
-                                "progress_type": row.get("进度类型", ProgressType.ABSOLUTE),  # 使用get方法，默认值为ABSOLUTE
-                                "count": int(row["完成数量"])
-                            }
-
-                elif file_name == "todos.csv":  # TODO数据
-                    for row in reader:
-                        # 添加校验逻辑
-                        required_fields = ["名称", "类型", "目标值", "截止时间", "完成状态"]
-                        for field in required_fields:
-                            if field not in row or not row[field]:
-                                raise ValueError(f"缺少必要字段: {field}")
-
-                        # 添加类型存在性校验
-                        if row["类型"] not in data_mgr.data["projects"]:
-                            raise ValueError(f"项目类型'{row['类型']}'尚未定义")
-
-                        # 获取项目类型
-                        type_name = row["类型"]
-
-                        # 验证项目是否存在
-                        if type_name not in data_mgr.data["projects"]:
-                            QMessageBox.warning(self, "导入错误",
-                                                f"项目类型'{type_name}'不存在，请先创建该类型")
-                            continue
-
-                        # 从已存在的项目中获取单位和进度类型
-                        project = data_mgr.data["projects"][type_name]
-                        unit = project["unit"]
-                        progress_type = project["progress_type"]
-
-                        # 解析完成状态和完成时间
-                        is_completed = row["完成状态"].strip() == "已完成"
-                        complete_time = row["完成时间"].strip() if is_completed else ""
-                        
-                        # 如果已完成但没有完成时间，使用当前时间
-                        if is_completed and not complete_time:
-                            complete_time = QDate.currentDate().toString("yyyy-MM-dd")
-
-                        # 数据转换
-                        todo = {
-                            "name": row["名称"],
-                            "type": row["类型"],
-                            "unit": unit,
-                            "target": float(row["目标值"]),
-                            "progress": float(row["当前进度"]) if row["当前进度"] else 0.0,
-                            "progress_type": progress_type,
-                            "deadline": row["截止时间"],
-                            "completed": is_completed,
-                            "complete_time": complete_time
-                        }
-
-                        # 如果已完成，更新项目计数
-                        if is_completed:
-                            data_mgr.data["projects"][type_name]["count"] += 1
-
-                        # 避免重复添加
-                        if not any(
-                                t["name"] == todo["name"] and
-                                t["type"] == todo["type"]
-                                for t in data_mgr.data["todos"]
-                        ):
-                            data_mgr.data["todos"].append(todo)
-                            
-                elif file_name == "kpi_records.csv":  # KPI记录数据
-                    for row in reader:
-                        date_str = row["日期"]
-                        kpi_id = int(row["KPI ID"])
-                        completed = row["完成状态"] == "已完成"
-                        
-                        data_mgr.save_kpi_record(date_str, kpi_id, completed)
-                        
-                elif file_name == "kpis.csv":  # KPI数据
-                    for row in reader:
-                        kpi_id = int(row["ID"])
-                        name = row["名称"]
-                        period_type = row["周期类型"]
-                        custom_days = int(row["自定义天数"]) if row["自定义天数"] else None
-                        target = float(row["目标"])
-                        todo_str = row["关联Todo"]
-                        created_at = row["创建时间"]
-                        
-                        # 解析关联的Todo
-                        todo_id = None
-                        unit = None
-                        if todo_str != "无":
-                            todo_name = todo_str.split(" (")[0]
-                            for i, todo in enumerate(data_mgr.data["todos"]):
-                                if todo["name"] == todo_name and not todo["completed"]:
-                                    todo_id = i
-                                    unit = todo["unit"]
-                                    break
-                                    
-                        if todo_id is None:
-                            QMessageBox.warning(self, "导入错误", f"关联的Todo项'{todo_str}'不存在")
-                            continue
-                                    
-                        # 创建KPI
-                        kpi = {
-                            "id": kpi_id,
-                            "name": name,
-                            "period_type": period_type,
-                            "custom_days": custom_days,
-                            "target": target,
-                            "unit": unit,
-                            "todo_id": todo_id,
-                            "created_at": created_at
-                        }
-                        
-                        # 避免重复添加
-                        if not any(k["id"] == kpi_id for k in data_mgr.data["kpis"]):
-                            data_mgr.data["kpis"].append(kpi)
+        if file_path.lower().endswith(COLUMNAR_EXTENSION):
+            self.restore_columnar_backup(file_path)
+            return
 
-            data_mgr.save()
-            self.refresh_table()
-            QMessageBox.information(self, "导入成功", "数据已成功加载")
+        progress = QProgressDialog("正在导入数据...", "取消", 0, 100, self)
+        progress.setWindowTitle("导入数据")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(500)  # 小文件导入不弹出进度框
 
+        def on_progress(percent):
+            progress.setValue(percent)
+            QApplication.processEvents()
+            return not progress.wasCanceled()
+
+        try:
+            result = CsvImporter(data_mgr, file_path, on_progress).run()
+        except ImportCancelled:
+            QMessageBox.information(self, "导入已取消", "已取消导入，数据未做任何修改")
+            return
         except Exception as e:
             QMessageBox.critical(self, "导入失败", f"数据解析错误：{str(e)}")
+            return
+        finally:
+            progress.close()
+
+        self.refresh_table()
+
+        message = f"数据已成功加载：新增{result.added}条，更新{result.updated}条，跳过{result.skipped}条"
+        if result.warnings:
+            message += "\n\n" + "\n".join(result.warnings[:10])
+            if len(result.warnings) > 10:
+                message += f"\n……共{len(result.warnings)}条警告"
+        QMessageBox.information(self, "导入成功", message)
+
+    def restore_columnar_backup(self, file_path):
+        """从列式备份恢复全部数据（替换现有的项目、TODO、KPI及KPI记录）"""
+        reply = QMessageBox.question(
+            self, "恢复备份",
+            "从备份恢复将替换现有的全部项目、TODO和KPI数据，是否继续？",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        try:
+            backup = read_columnar(file_path)
+            data_mgr.replace_data(backup)
+        except Exception as e:
+            QMessageBox.critical(self, "导入失败", f"备份文件解析错误：{str(e)}")
+            return
+
+        self.refresh_table()
+        record_count = sum(len(records) for records in backup["kpi_records"].values())
+        QMessageBox.information(
+            self, "导入成功",
+            f"已恢复{len(backup['projects'])}个项目、{len(backup['todos'])}个TODO、"
+            f"{len(backup['kpis'])}个KPI和{record_count}条KPI记录"
+        )
 
     def set_app_icon(self):
         icon_path = os.path.join(DATA_DIR, 'favicon.ico')
@@ -1561,6 +1455,8 @@ class WorkTracker(QWidget):
         Args:
             show_no_update (bool): 是否显示"已是最新版本"的提示
         """
+        import requests
+
         platform = 'windows'
         if sys.platform == 'darwin':
             platform = 'macos'
@@ -1609,25 +1505,24 @@ class WorkTracker(QWidget):
         
         if data_type == "projects":
             msg.setText("确定要清空所有项目数据吗？")
-            msg.setInformativeText("此操作将删除所有项目类型及其统计数据，且不可恢复。")
+            msg.setInformativeText("此操作将删除所有项目类型及其统计数据，可通过“撤销”恢复。")
         elif data_type == "todos":
             msg.setText("确定要清空所有TODO数据吗？")
-            msg.setInformativeText("此操作将删除所有TODO项及其进度数据，且不可恢复。")
+            msg.setInformativeText("此操作将删除所有TODO项及其进度数据，可通过“撤销”恢复。")
         elif data_type == "kpis":
             msg.setText("确定要清空所有KPI数据吗？")
-            msg.setInformativeText("此操作将删除所有KPI及其记录数据，且不可恢复。")
+            msg.setInformativeText("此操作将删除所有KPI及其记录数据，可通过“撤销”恢复。")
             
         msg.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
         msg.setDefaultButton(QMessageBox.No)
         
         if msg.exec_() == QMessageBox.Yes:
             if data_type == "projects":
-                data_mgr.data["projects"] = {}
+                data_mgr.clear_projects()
             elif data_type == "todos":
-                data_mgr.data["todos"] = []
+                data_mgr.clear_todos()
             elif data_type == "kpis":
-                data_mgr.data["kpis"] = []
-                data_mgr.data["kpi_records"] = {}
+                data_mgr.clear_kpis()
                 
             data_mgr.save()
             self.refresh_table()
@@ -1635,12 +1530,29 @@ class WorkTracker(QWidget):
 
     def show_chat_dialog(self):
         """显示AI聊天对话框"""
+        from ui.chat_dialog import ChatDialog
+
         dialog = ChatDialog(self)
         dialog.exec_()
 
 
+def finish_startup_profile():
+    """首帧绘制完成后输出启动耗时报告"""
+    data_file_size = os.path.getsize(DATA_FILE) if os.path.exists(DATA_FILE) else 0
+    startup_profiler.finish(DATA_DIR, version=VERSION, data_file_size=data_file_size)
+
+
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = WorkTracker()
-    window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    try:
+        with startup_profiler.phase("qapplication"):
+            app = QApplication(sys.argv)
+        app.aboutToQuit.connect(data_mgr.close)
+        window = WorkTracker()
+        startup_profiler.watch_first_paint(window, finish_startup_profile)
+        with startup_profiler.phase("show"):
+            window.show()
+        exit_code = app.exec_()
+    finally:
+        # 启动出错或首帧没有绘制时 finish() 不会执行，导入计时也要移除
+        startup_profiler.remove_import_hook()
+    sys.exit(exit_code)
\ No newline at end of file
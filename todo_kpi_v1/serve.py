@@ -0,0 +1,95 @@
+"""启动生产环境的 API 服务
+
+    python serve.py --workers 4 --threads 16 --port 5010
+
+优先使用 gunicorn（多进程，配置见 gunicorn.conf.py）；没有 gunicorn 或在 Windows 上时，
+使用 waitress，都没有时使用 werkzeug 的多线程服务器。后两者为单进程，--workers 不生效。
+收到 SIGTERM/SIGINT 后不再接受新连接，等待进行中的请求（包括 SSE）结束后退出。
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _has_module(name):
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+
+def run_gunicorn(args):
+    # 参数通过环境变量传给 gunicorn.conf.py，命令行和直接运行 gunicorn 使用同一份配置
+    os.environ.update(API_HOST=args.host, API_PORT=str(args.port),
+                      API_WORKERS=str(args.workers), API_THREADS=str(args.threads))
+    os.chdir(APP_DIR)
+    os.execv(sys.executable, [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'])
+
+
+def run_waitress(args):
+    from waitress import serve
+    from wsgi import app
+    # waitress 收到 Ctrl+C 后会等待进行中的请求
+    serve(app, host=args.host, port=args.port, threads=args.threads, channel_timeout=120)
+
+
+def run_werkzeug(args):
+    from werkzeug.serving import make_server
+    from wsgi import app
+
+    server = make_server(args.host, args.port, app, threaded=True)
+    # 关闭时等待请求线程结束，而不是直接中断正在输出的 SSE
+    server.daemon_threads = False
+    server.block_on_close = True
+
+    def stop(signum, frame):
+        logging.info("正在停止服务，等待进行中的请求结束...")
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    logging.info(f"API服务已启动: http://{args.host}:{args.port}（werkzeug 单进程多线程）")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="启动生产环境的 API 服务")
+    parser.add_argument("--host", default=os.getenv('API_HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.getenv('API_PORT', '5010')))
+    parser.add_argument("--workers", type=int, default=int(os.getenv('API_WORKERS', os.cpu_count() or 1)),
+                        help="工作进程数（仅 gunicorn）")
+    parser.add_argument("--threads", type=int, default=int(os.getenv('API_THREADS', '16')),
+                        help="每个进程的线程数，即同时处理的请求数")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "waitress", "werkzeug"], default="auto")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    server = args.server
+    if server == "auto":
+        if sys.platform != 'win32' and _has_module('gunicorn'):
+            server = "gunicorn"
+        elif _has_module('waitress'):
+            server = "waitress"
+        else:
+            server = "werkzeug"
+    if server != "gunicorn":
+        if args.workers > 1:
+            logging.warning(f"{server} 只使用单个进程，忽略 --workers {args.workers}；安装 gunicorn 以使用多核")
+        # 单进程时 UPSTREAM_*_TOTAL 全部分给这个进程
+        os.environ['API_WORKERS'] = '1'
+
+    sys.path.insert(0, APP_DIR)
+    {"gunicorn": run_gunicorn, "waitress": run_waitress, "werkzeug": run_werkzeug}[server](args)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -3,11 +3,14 @@ import requests
 import os
 from typing import Dict, Any, Optional
 from services.deepseek_service import DeepSeekService
+from services.tracing import traced
+from services.upstream_limiter import UpstreamOverloaded
 
 class AIChatService:
-    def __init__(self, app: Flask):
+    def __init__(self, app: Flask, deepseek_service: Optional[DeepSeekService] = None):
         self.app = app
-        self.deepseek_service = DeepSeekService(app)
+        # 与路由共用同一个 DeepSeekService（见 ServiceContainer）
+        self.deepseek_service = deepseek_service or DeepSeekService(app)
         self._setup_config()
 
     def _setup_config(self):
@@ -18,6 +21,7 @@ class AIChatService:
         self.top_k = int(os.getenv('SILICONFLOW_TOP_K', '50'))
         self.frequency_penalty = float(os.getenv('SILICONFLOW_FREQUENCY_PENALTY', '0.5'))
 
+    @traced("AIChatService.chat")
     def chat(self, messages: list) -> Dict[str, Any]:
         """Send a chat message and get response"""
         try:
@@ -52,6 +56,8 @@ class AIChatService:
                     'success': False,
                     'error': response.get('error', 'Unknown error')
                 }
+        except UpstreamOverloaded:
+            raise
         except Exception as e:
             return {
                 'success': False,
@@ -0,0 +1,64 @@
+"""API 服务的依赖容器
+
+进程内只创建一次：读取一次 .env，建立一个共用的 HTTP 会话（连接池，保持长连接），
+以及上游调用共用的并发限制、熔断器和请求合并；所有服务和路由都从这里取得依赖，
+不再各自创建 DeepSeekService 或重复解析配置。
+"""
+import os
+
+import requests
+from dotenv import load_dotenv
+from flask import Flask
+from requests.adapters import HTTPAdapter
+
+from services.ai_chat_service import AIChatService
+from services.deepseek_service import DeepSeekService
+from services.resilience import CircuitBreaker, RetryPolicy, HEDGE_WORKERS
+from services.singleflight import SingleFlight
+from services.tracing import tracer, create_exporter
+from services.upstream_limiter import UpstreamLimiter
+from services.version_service import VersionService
+
+DEFAULT_POOL_SIZE = 32  # 不限制并发时每个上游主机保持的连接数
+
+
+def create_upstream_session(pool_size):
+    """上游调用共用的会话：连接复用，连接池满时新建临时连接而不是阻塞"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class ServiceContainer:
+    def __init__(self, app: Flask):
+        self.app = app
+        # 只在这里读取一次 .env，之后各组件从环境变量取配置
+        load_dotenv()
+        if not tracer.enabled:
+            tracer.exporter = create_exporter(os.getenv('TRACE_EXPORT'))
+            tracer.sample_rate = float(os.getenv('TRACE_SAMPLE_RATE', '1'))
+
+        self.limiter = UpstreamLimiter.from_env()
+        self.breaker = CircuitBreaker.from_env()
+        self.retry_policy = RetryPolicy.from_env()
+        self.singleflight = SingleFlight()
+        # 每个并发名额和对冲线程都可能同时占用一个连接
+        pool_size = int(os.getenv('UPSTREAM_POOL_SIZE',
+                                  (self.limiter.max_concurrent or DEFAULT_POOL_SIZE) + HEDGE_WORKERS))
+        self.session = create_upstream_session(pool_size)
+
+        self.version_service = VersionService(app)
+        self.deepseek_service = DeepSeekService(
+            app,
+            session=self.session,
+            limiter=self.limiter,
+            breaker=self.breaker,
+            retry_policy=self.retry_policy,
+            singleflight=self.singleflight
+        )
+        self.ai_chat_service = AIChatService(app, self.deepseek_service)
+
+    def close(self):
+        self.session.close()
@@ -1,15 +1,24 @@
 from flask import Flask
-from dotenv import load_dotenv
 import requests
 import os
-import json
+import time
 from typing import Dict, Any, Optional, List
 
-load_dotenv()
+from services.metrics import UPSTREAM_LATENCY, UPSTREAM_ERRORS, UPSTREAM_RETRIES, UPSTREAM_HEDGES
+from services.resilience import CircuitBreaker, RetryPolicy, hedged_call, is_failure, is_upstream_error
+from services.tracing import tracer, traced
+from services.singleflight import SingleFlight, coalesced
+from services.upstream_limiter import LimitedStream, UpstreamLimiter, UpstreamOverloaded, request_client_id
 
 class DeepSeekService:
-    def __init__(self, app: Flask):
+    def __init__(self, app: Flask, session=None, limiter=None, breaker=None, retry_policy=None, singleflight=None):
+        """依赖通常由 ServiceContainer 注入并与其他服务共用；未传入时各自创建（配置来自环境变量）"""
         self.app = app
+        self.session = session or requests.Session()
+        self.limiter = limiter or UpstreamLimiter.from_env()
+        self.breaker = breaker or CircuitBreaker.from_env()
+        self.retry_policy = retry_policy or RetryPolicy.from_env()
+        self.singleflight = singleflight or SingleFlight()
         self._setup_config()
 
     def _setup_config(self):
@@ -18,6 +27,11 @@ class DeepSeekService:
         self.api_base = os.getenv('SILICONFLOW_API_BASE', 'https://api.siliconflow.com/v1')
         if not self.api_key:
             raise ValueError("SILICONFLOW_API_KEY environment variable is not set")
+        # 连接超时和读取超时（秒）；流式调用的读取超时是两个片段之间的最长间隔
+        self.timeout = (float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '5')),
+                        float(os.getenv('UPSTREAM_READ_TIMEOUT', '60')))
+        # 嵌入请求超过这个时间（秒）没有返回时发出对冲请求，0 表示不对冲
+        self.hedge_delay = float(os.getenv('UPSTREAM_HEDGE_DELAY', '0'))
 
     def _get_headers(self) -> Dict[str, str]:
         return {
@@ -26,6 +40,91 @@ class DeepSeekService:
             'Content-Type': 'application/json'
         }
 
+    def _send(self, path: str, headers: Dict[str, str], payload: Dict[str, Any], stream: bool) -> requests.Response:
+        """发送一次请求；非流式调用读完响应体再返回"""
+        response = self.session.post(
+            f"{self.api_base}{path}",
+            headers=headers,
+            json=payload,
+            stream=True,
+            timeout=self.timeout
+        )
+        if not stream or response.status_code != 200:
+            response.content
+        return response
+
+    def _post(self, endpoint: str, path: str, payload: Dict[str, Any], stream: bool = False,
+              idempotent: bool = False, hedge: bool = False):
+        """调用上游接口，记录耗时、失败次数和追踪 span
+
+        调用前先取得并发名额（见 services.upstream_limiter），排队过长或熔断时抛出 UpstreamOverloaded。
+        幂等调用在连接错误、超时、429 和 5xx 时按 RetryPolicy 重试；hedge 为 True 且设置了
+        UPSTREAM_HEDGE_DELAY 时使用对冲请求（见 services.resilience）。
+        非流式调用在这里读完响应体；流式调用在收到响应头时返回 LimitedStream，名额在输出结束后归还。
+        """
+        client = request_client_id()
+        with tracer.span(f"upstream POST {path}", **{"upstream.endpoint": endpoint, "upstream.stream": stream}) as span:
+            waited = self.limiter.acquire(client)
+            if waited:
+                span.event("slot_acquired", queued_ms=round(waited * 1000, 3))
+            streaming = False
+            try:
+                headers = self._get_headers()
+                if span.recording:
+                    headers['traceparent'] = span.traceparent()
+                attempts = 1 + (self.retry_policy.retries if idempotent else 0)
+                for attempt in range(attempts):
+                    # 每次发送（包括重试）前检查熔断，上游已被判定为故障时直接失败
+                    self.breaker.allow()
+                    start = time.perf_counter()
+                    error = response = None
+                    try:
+                        if hedge and self.hedge_delay > 0:
+                            response, outcome = hedged_call(
+                                lambda: self._send(path, headers, payload, stream), self.hedge_delay,
+                                lambda: self.limiter.try_acquire(client), lambda: self.limiter.release(client))
+                            if outcome:
+                                span.event("hedged", outcome=outcome)
+                                UPSTREAM_HEDGES.inc(endpoint=endpoint, outcome=outcome)
+                        else:
+                            response = self._send(path, headers, payload, stream)
+                        span.event("response", attempt=attempt, status=response.status_code)
+                        if response.status_code != 200:
+                            UPSTREAM_ERRORS.inc(endpoint=endpoint, reason=f"http_{response.status_code}")
+                    except Exception as e:
+                        error = e
+                        UPSTREAM_ERRORS.inc(endpoint=endpoint, reason=type(e).__name__)
+                    finally:
+                        UPSTREAM_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint)
+                    if error is not None and not is_upstream_error(error):
+                        # 本地错误：不知道上游是否正常，不计入熔断也不重试
+                        self.breaker.abandon()
+                        raise error
+                    failed = is_failure(response, error)
+                    self.breaker.record(not failed)
+                    if not failed or attempt == attempts - 1:
+                        break
+                    reason = type(error).__name__ if error is not None else f"http_{response.status_code}"
+                    UPSTREAM_RETRIES.inc(endpoint=endpoint, reason=reason)
+                    span.event("retry", attempt=attempt + 1, reason=reason)
+                    if response is not None:
+                        response.close()
+                    time.sleep(self.retry_policy.delay(attempt, response))
+                if error is not None:
+                    raise error
+                span.set("http.status_code", response.status_code)
+                if response.status_code != 200:
+                    span.record_error(f"HTTP {response.status_code}")
+                    return response
+                if stream:
+                    streaming = True
+                    return LimitedStream(response, lambda: self.limiter.release(client))
+                return response
+            finally:
+                if not streaming:
+                    self.limiter.release(client)
+
+    @traced("DeepSeekService.chat_completion")
     def chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -42,10 +141,10 @@ class DeepSeekService:
     ) -> Dict[str, Any]:
         """Send a chat completion request to SiliconFlow API"""
         try:
-            response = requests.post(
-                f"{self.api_base}/chat/completions",
-                headers=self._get_headers(),
-                json={
+            response = self._post(
+                'chat',
+                "/chat/completions",
+                {
                     "model": model,
                     "messages": messages,
                     "stream": stream,
@@ -63,23 +162,11 @@ class DeepSeekService:
             
             if response.status_code == 200:
                 if stream:
-                    full_content = ""
-                    full_reasoning_content = ""
-
-                    for chunk in response.iter_lines():
-                        if chunk:
-                            chunk_str = chunk.decode('utf-8').replace('data: ', '')
-                            if chunk_str != "[DONE]":
-                                chunk_data = json.loads(chunk_str)
-                                delta = chunk_data['choices'][0].get('delta', {})
-                                content = delta.get('content', '')
-                                reasoning_content = delta.get('reasoning_content', '')
-                                if content:
-                                    print(content, end="", flush=True)
-                                    full_content += content
-                                if reasoning_content:
-                                    print(reasoning_content, end="", flush=True)
-                                    full_reasoning_content += reasoning_content
+                    # 流式响应交给调用方逐行读取（SSE）
+                    return {
+                        'success': True,
+                        'stream': response
+                    }
                 else:
                     return {
                         'success': True,
@@ -90,54 +177,67 @@ class DeepSeekService:
                     'success': False,
                     'error': f"API request failed with status {response.status_code}: {response.text}"
                 }
+        except UpstreamOverloaded:
+            raise
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
 
+    @traced("DeepSeekService.text_embedding")
+    @coalesced("embedding")
     def text_embedding(self, text: str, model: str = "deepseek-embedding") -> Dict[str, Any]:
         """
         使用DeepSeek模型生成文本嵌入
         """
         try:
-            response = requests.post(
-                f"{self.api_base}/embeddings",
-                headers=self._get_headers(),
-                json={
+            response = self._post(
+                'embedding',
+                "/embeddings",
+                {
                     "model": model,
                     "input": text
-                }
+                },
+                idempotent=True,
+                hedge=True
             )
             response.raise_for_status()
             return {
                 "success": True,
                 "embedding": response.json()["data"][0]["embedding"]
             }
+        except UpstreamOverloaded:
+            raise
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e)
             }
 
+    @traced("DeepSeekService.text_generation")
+    @coalesced("generation")
     def text_generation(self, prompt: str, model: str = "deepseek-coder") -> Dict[str, Any]:
         """
         使用DeepSeek模型生成文本
         """
         try:
-            response = requests.post(
-                f"{self.api_base}/completions",
-                headers=self._get_headers(),
-                json={
+            response = self._post(
+                'generation',
+                "/completions",
+                {
                     "model": model,
                     "prompt": prompt,
-                }
+                },
+                idempotent=True
             )
             response.raise_for_status()
             return {
                 "success": True,
                 "text": response.json()["choices"][0]["text"]
             }
+        except UpstreamOverloaded:
+            raise
         except Exception as e:
             return {
                 "success": False,
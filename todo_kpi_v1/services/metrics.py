@@ -0,0 +1,409 @@
+"""进程内的运行指标，以 Prometheus 文本格式在 /metrics 输出
+
+计数器、仪表和直方图都只在内存中累加，每个指标一把锁，记录一次只是几次字典操作。
+多进程部署（gunicorn）时设置 METRICS_DIR，各工作进程定期把自己的指标写入该目录，
+/metrics 由接到请求的进程汇总全部进程的数据（见 MultiProcessCollector），
+否则每次采集只能看到恰好接到请求的那个进程。
+
+/metrics 默认只允许本机访问，允许的地址由 METRICS_ALLOW 设置（见 install_metrics）。
+"""
+import bisect
+import glob
+import ipaddress
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Flask, Response, abort, g, request
+
+# 请求耗时直方图的分桶上限（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(label_names, labels):
+    return tuple(str(labels.get(name, "")) for name in label_names)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(label_names, key, extra=None):
+    pairs = list(zip(label_names, key)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, description, label_names=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def dump(self):
+        """当前的值 [[标签值列表, 值]]，可转为JSON"""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, dumps):
+        """汇总多个进程的 dump，返回 (标签名, {标签值: 值})；计数器按标签相加
+
+        dumps 为 [(进程号, 是否存活, dump)]
+        """
+        values = {}
+        for _, _, items in dumps:
+            for key, value in items:
+                key = tuple(key)
+                values[key] = values.get(key, 0) + value
+        return self.label_names, values
+
+    def render(self, merged=None):
+        label_names, values = merged if merged is not None else (self.label_names, None)
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(values.items()):
+            lines.extend(self._render_value(label_names, key, value))
+        return lines
+
+    def _render_value(self, label_names, key, value):
+        return [f"{self.name}{_format_labels(label_names, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.label_names, labels), 0)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(self.label_names, labels)] = value
+
+    def merge(self, dumps):
+        """仪表不能相加（如熔断状态），按进程输出并加上 worker 标签；已退出进程的值丢弃"""
+        values = {}
+        for pid, alive, items in dumps:
+            if alive:
+                for key, value in items:
+                    values[tuple(key) + (str(pid),)] = value
+        return self.label_names + ("worker",), values
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各分桶的计数（不累计）..., +Inf 分桶], 总和
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def dump(self):
+        with self._lock:
+            return [[list(key), [list(counts), total]] for key, (counts, total) in self._values.items()]
+
+    def merge(self, dumps):
+        values = {}
+        for _, _, items in dumps:
+            for key, (counts, total) in items:
+                state = values.setdefault(tuple(key), [[0] * len(counts), 0.0])
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += total
+        return self.label_names, values
+
+    def _render_value(self, label_names, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels(label_names, key, ('le', _format_value(float(bound))))} "
+                         f"{cumulative}")
+        labels = _format_labels(label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"指标 {metric.name} 已注册为 {existing.kind}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, description, label_names=()):
+        return self._register(Counter(name, description, label_names))
+
+    def gauge(self, name, description, label_names=()):
+        return self._register(Gauge(name, description, label_names))
+
+    def histogram(self, name, description, label_names=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, description, label_names, buckets))
+
+    def _metric_list(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def dump(self):
+        return {metric.name: metric.dump() for metric in self._metric_list()}
+
+    def render(self, dumps=None):
+        """Prometheus 文本格式（text/plain; version=0.0.4）
+
+        dumps 为 [(进程号, 是否存活, dump())] 时输出各进程汇总后的值，否则输出本进程的值。
+        """
+        lines = []
+        for metric in self._metric_list():
+            merged = None
+            if dumps is not None:
+                merged = metric.merge([(pid, alive, dump.get(metric.name, [])) for pid, alive, dump in dumps])
+            lines.extend(metric.render(merged))
+        return "\n".join(lines) + "\n"
+
+
+class MultiProcessCollector:
+    """通过共享目录汇总多个工作进程的指标
+
+    每个进程在后台线程中每隔 interval 秒把 registry.dump() 写入 目录/<进程号>-<启动时间>.json，
+    接到 /metrics 的进程先写入自己的最新数据，再读取目录中的全部文件汇总：
+    计数器和直方图相加，仪表加上 worker 标签按进程输出。
+    进程退出后由主进程调用 mark_process_dead 标记，其计数保留（总数不会倒退），仪表不再输出。
+    目录由部署方创建，启动前清空（见 gunicorn.conf.py）。
+    """
+
+    def __init__(self, registry, directory, interval=5.0):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._pid = None
+        self._path = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # gunicorn 预加载应用时在主进程中创建，fork 后各工作进程首次使用时再启动写入线程
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self._path = os.path.join(self.directory, f"{pid}-{time.time_ns()}.json")
+            threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True).start()
+
+    def _write_loop(self):
+        pid = self._pid
+        while self._pid == pid:
+            try:
+                self.write()
+            except OSError as e:
+                logging.warning(f"写入进程指标失败: {str(e)}")
+            time.sleep(self.interval)
+
+    def write(self):
+        self._ensure_started()
+        content = {"pid": self._pid, "alive": True, "metrics": self.registry.dump()}
+        temp_path = f"{self._path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(content, f)
+        os.replace(temp_path, self._path)
+
+    def collect(self):
+        """[(进程号, 是否存活, dump)]，包括本进程的最新数据"""
+        self.write()
+        dumps = []
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    content = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"读取进程指标失败 {path}: {str(e)}")
+                continue
+            dumps.append((content["pid"], content["alive"], content["metrics"]))
+        return dumps
+
+    def render(self):
+        return self.registry.render(self.collect())
+
+
+def mark_process_dead(directory, pid):
+    """工作进程退出后在主进程中调用（gunicorn 的 child_exit）：保留其计数，不再输出其仪表"""
+    for path in glob.glob(os.path.join(directory, f"{pid}-*.json")):
+        try:
+            with open(path, encoding="utf-8") as f:
+                content = json.load(f)
+            content["alive"] = False
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(content, f)
+            os.replace(path + ".tmp", path)
+        except (OSError, ValueError) as e:
+            logging.warning(f"标记进程指标失败 {path}: {str(e)}")
+
+
+def parse_allowlist(value):
+    """METRICS_ALLOW 的格式：逗号分隔的IP或网段，如 "127.0.0.1,10.0.0.0/8" """
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip()]
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "api_http_requests_total", "HTTP请求数", ("method", "route", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "api_http_request_duration_seconds", "HTTP请求耗时（流式响应只计到开始输出）", ("method", "route"))
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "api_upstream_request_duration_seconds", "上游接口调用耗时（流式调用计到收到响应头）", ("endpoint",))
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "api_upstream_errors_total", "上游接口调用失败次数", ("endpoint", "reason"))
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "api_upstream_retries_total", "上游调用的重试次数", ("endpoint", "reason"))
+UPSTREAM_HEDGES = REGISTRY.counter(
+    "api_upstream_hedged_total", "发出的对冲请求数，outcome 为先成功的一方（first/hedge）或 failed", ("endpoint", "outcome"))
+CIRCUIT_STATE = REGISTRY.gauge(
+    "api_upstream_circuit_state", "上游熔断状态：0 正常，1 半开，2 熔断")
+UPSTREAM_QUEUE_WAIT = REGISTRY.histogram(
+    "api_upstream_queue_seconds", "等待上游调用名额的时间")
+UPSTREAM_QUEUE_DEPTH = REGISTRY.gauge(
+    "api_upstream_queue_depth", "排队等待上游调用名额的请求数")
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge(
+    "api_upstream_in_flight", "正在进行的上游调用数（流式调用持续到输出结束）")
+UPSTREAM_SHED = REGISTRY.counter(
+    "api_upstream_shed_total", "因排队过长或等待超时被拒绝的请求数", ("reason",))
+ACTIVE_STREAMS = REGISTRY.gauge(
+    "api_active_streams", "正在输出的SSE连接数")
+STREAM_DURATION = REGISTRY.histogram(
+    "api_stream_duration_seconds", "SSE连接从开始输出到结束的耗时", ("route",))
+STREAM_BYTES = REGISTRY.counter(
+    "api_stream_bytes_total", "SSE输出的字节数", ("route",))
+STREAM_ERRORS = REGISTRY.counter(
+    "api_stream_errors_total", "转发上游流式数据时出错的次数", ("route", "reason"))
+CACHE_LOOKUPS = REGISTRY.counter(
+    "api_cache_lookups_total", "缓存查询次数，result 为 hit 或 miss", ("cache", "result"))
+
+
+def record_cache(cache, hit):
+    """记录一次缓存查询，命中率 = hit / (hit + miss)"""
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def track_stream(chunks, route):
+    """包装SSE生成器：统计活动连接数、输出字节数和连接持续时间"""
+    ACTIVE_STREAMS.inc()
+    start = time.perf_counter()
+    try:
+        for chunk in chunks:
+            STREAM_BYTES.inc(len(chunk.encode("utf-8")) if isinstance(chunk, str) else len(chunk), route=route)
+            yield chunk
+    finally:
+        ACTIVE_STREAMS.dec()
+        STREAM_DURATION.observe(time.perf_counter() - start, route=route)
+
+
+def _route_label():
+    # 使用路由规则而不是实际路径，避免 /api/versions/<id> 之类的路径产生大量标签
+    return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+
+def install_metrics(app: Flask, registry: MetricsRegistry = REGISTRY, path: str = '/metrics',
+                    allow=None, shared_dir=None):
+    """为 app 的每个请求计数计时，并注册输出指标的路由
+
+    Args:
+        allow (str): 允许访问 path 的IP或网段，逗号分隔；默认读取 METRICS_ALLOW，未设置时只允许本机。
+            为空字符串时不注册该路由。经反向代理访问时看到的是代理的地址，需要在代理上限制。
+        shared_dir (str): 多进程汇总使用的目录，默认读取 METRICS_DIR，未设置时只输出本进程的指标
+    """
+    if allow is None:
+        allow = os.getenv('METRICS_ALLOW', '127.0.0.1,::1')
+    if shared_dir is None:
+        shared_dir = os.getenv('METRICS_DIR') or None
+    allowed = parse_allowlist(allow)
+    collector = MultiProcessCollector(registry, shared_dir) if shared_dir else None
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            route = _route_label()
+            HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+            HTTP_LATENCY.observe(time.perf_counter() - start, method=request.method, route=route)
+        return response
+
+    if not allowed:
+        return
+
+    if collector is not None:
+        # 工作进程接到第一个请求后开始定期写入，不必等到自己接到 /metrics
+        app.before_request(collector._ensure_started)
+
+    @app.route(path, methods=['GET'])
+    def metrics():
+        try:
+            address = ipaddress.ip_address(request.remote_addr or "")
+        except ValueError:
+            abort(403)
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        if not any(address in network for network in allowed):
+            abort(403)
+        text = collector.render() if collector is not None else registry.render()
+        return Response(text, mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,204 @@
+"""上游调用的故障隔离：重试、熔断和对冲请求
+
+- RetryPolicy：指数退避加随机抖动（full jitter），只用于幂等调用，连接错误、超时、429 和 5xx 时重试
+- CircuitBreaker：连续失败达到阈值后熔断，熔断期间直接拒绝；冷却后放行一个探测请求，成功则恢复
+- hedged_call：第一个请求在设定时间内没有返回时再发一个，取先成功的结果，用于降低尾延迟
+
+参数由环境变量配置：
+    UPSTREAM_RETRIES           幂等调用失败后的重试次数（默认 2）
+    UPSTREAM_RETRY_BASE_DELAY  首次重试的退避上限，秒，之后每次翻倍（默认 0.2）
+    UPSTREAM_RETRY_MAX_DELAY   单次退避的上限，秒（默认 2）
+    UPSTREAM_BREAKER_FAILURES  连续失败多少次后熔断（默认 5）
+    UPSTREAM_BREAKER_RESET     熔断后多久放行探测请求，秒（默认 30）
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+
+from services.metrics import CIRCUIT_STATE, UPSTREAM_SHED
+from services.upstream_limiter import UpstreamOverloaded
+
+# 可以重试、也计入熔断的状态码
+RETRYABLE_STATUS = frozenset((429, 500, 502, 503, 504))
+HEDGE_WORKERS = 16
+
+
+class CircuitOpen(UpstreamOverloaded):
+    """上游处于熔断状态，不发送请求直接失败（返回503）"""
+
+    def __init__(self):
+        super().__init__("circuit_open")
+
+
+def is_upstream_error(error):
+    """异常是否来自与上游的通信（连接错误、超时等）；其他异常是本地错误，请求未必到达上游"""
+    return isinstance(error, requests.RequestException)
+
+
+def is_failure(response=None, error=None):
+    """一次上游调用是否算作失败：连接错误、超时或可重试的状态码；其他4xx属于请求本身的问题
+
+    本地错误（见 is_upstream_error）也返回 False，但它不代表成功，不能计入熔断器。
+    """
+    if error is not None:
+        return is_upstream_error(error)
+    return response.status_code in RETRYABLE_STATUS
+
+
+class RetryPolicy:
+    def __init__(self, retries=2, base_delay=0.2, max_delay=2.0):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            retries=int(os.getenv('UPSTREAM_RETRIES', '2')),
+            base_delay=float(os.getenv('UPSTREAM_RETRY_BASE_DELAY', '0.2')),
+            max_delay=float(os.getenv('UPSTREAM_RETRY_MAX_DELAY', '2'))
+        )
+
+    def delay(self, attempt, response=None):
+        """第 attempt 次重试（从0开始）前等待的秒数；429 带有较短的 Retry-After 时按它等待"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit() and int(retry_after) <= self.max_delay:
+                return float(retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            failure_threshold=int(os.getenv('UPSTREAM_BREAKER_FAILURES', '5')),
+            reset_timeout=float(os.getenv('UPSTREAM_BREAKER_RESET', '30'))
+        )
+
+    @property
+    def state(self):
+        return self._state
+
+    def _set_state(self, state):
+        self._state = state
+        CIRCUIT_STATE.set(state)
+
+    def allow(self):
+        """发送请求前调用；熔断中抛出 CircuitOpen。半开状态同一时间只放行一个探测请求"""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    UPSTREAM_SHED.inc(reason="circuit_open")
+                    raise CircuitOpen()
+                self._set_state(self.HALF_OPEN)
+            if self._state == self.HALF_OPEN:
+                if self._probing:
+                    UPSTREAM_SHED.inc(reason="circuit_open")
+                    raise CircuitOpen()
+                self._probing = True
+
+    def abandon(self):
+        """allow() 之后没有得到上游的结果（本地错误）：不计入成败，半开状态下放行下一个探测请求"""
+        with self._lock:
+            self._probing = False
+
+    def record(self, success):
+        with self._lock:
+            self._probing = False
+            if success:
+                self._failures = 0
+                if self._state != self.CLOSED:
+                    self._set_state(self.CLOSED)
+                return
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                self._set_state(self.OPEN)
+
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+# 线程池的空闲名额：提交前先取得名额，任务结束后归还，线程池中不会有排队的任务
+_hedge_slots = threading.BoundedSemaphore(HEDGE_WORKERS)
+
+
+def _executor():
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(HEDGE_WORKERS, thread_name_prefix="upstream-hedge")
+        return _hedge_executor
+
+
+def _try_submit(send):
+    """线程池有空闲线程时提交 send 并返回 Future，否则返回 None"""
+    if not _hedge_slots.acquire(blocking=False):
+        return None
+    try:
+        future = _executor().submit(send)
+    except BaseException:
+        _hedge_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hedge_slots.release())
+    return future
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def hedged_call(send, delay, try_acquire, release):
+    """先发一个请求，delay 秒后仍未返回时再发一个，返回 (先成功的响应, 结果)
+
+    结果为 None（没有发出对冲请求）、"first"（第一个请求先成功）、"hedge"（对冲请求先成功）或 "failed"。
+
+    对冲请求需要额外的上游名额：try_acquire() 返回 False 时不发，只等第一个请求。
+    两个都失败时返回第一个请求的结果（或抛出它的异常）；没被采用的响应在完成后关闭。
+
+    线程池（HEDGE_WORKERS 个线程）只在有空闲时使用，不排队：没有空闲线程时第一个请求直接在
+    当前线程中发送、不做对冲，因此并发调用数不受线程池大小限制；第一个请求已在线程池中、
+    但发对冲请求时没有空闲线程，同样只等第一个请求。
+    """
+    first = _try_submit(send)
+    if first is None:
+        return send(), None
+    done, _ = wait([first], timeout=delay)
+    if done or not try_acquire():
+        return first.result(), None
+
+    second = _try_submit(send)
+    if second is None:
+        release()
+        return first.result(), None
+    second.add_done_callback(lambda _: release())
+    pending = {first, second}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None and not is_failure(future.result()):
+                # 没被采用的请求在完成后关闭响应
+                (second if future is first else first).add_done_callback(_close_response)
+                return future.result(), "first" if future is first else "hedge"
+    # 都失败：关闭对冲请求的响应，按第一个请求的结果处理
+    _close_response(second)
+    return first.result(), "failed"
@@ -2,11 +2,12 @@ from flask import Flask
 from .base_routes import register_base_routes
 from .version_routes import register_version_routes
 from .deepseek_routes import register_deepseek_routes
-from ..version_service import VersionService
-from ..deepseek_service import DeepSeekService
+from .chat_routes import register_chat_routes
+from ..container import ServiceContainer
 
-def register_routes(app, version_service, deepseek_service, ai_chat_service):
-    """注册所有路由"""
-    register_base_routes(app)
-    register_version_routes(app, version_service)
-    register_deepseek_routes(app, deepseek_service) 
\ No newline at end of file
+def register_routes(app: Flask, services: ServiceContainer):
+    """注册所有路由，服务从容器中取得"""
+    register_base_routes(app, services.version_service)
+    register_version_routes(app, services.version_service)
+    register_deepseek_routes(app, services.deepseek_service)
+    register_chat_routes(app, services.ai_chat_service) 
\ No newline at end of file
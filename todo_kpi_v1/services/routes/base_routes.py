@@ -9,12 +9,16 @@ def create_base_routes(version_service: VersionService) -> Blueprint:
         current_version = request.args.get('version')
         platform = request.args.get('platform')
         result = version_service.check_update(current_version, platform)
-        return jsonify(result[0]), result[1] if len(result) > 1 else 200
+        if isinstance(result, tuple):
+            return jsonify(result[0]), result[1]
+        return jsonify(result)
 
     return api_bp
 
-def register_base_routes(app: Flask):
+def register_base_routes(app: Flask, version_service: VersionService):
     """注册基础路由"""
+    app.register_blueprint(create_base_routes(version_service), url_prefix='/api')
+
     @app.route('/')
     def index():
         return {'status': 'ok', 'message': 'API服务正常运行'} 
\ No newline at end of file
@@ -0,0 +1,75 @@
+from flask import Flask, request, jsonify, Response
+import json
+import logging
+
+from ..ai_chat_service import AIChatService
+from ..metrics import track_stream, STREAM_ERRORS
+from ..tracing import trace_stream, current_span
+
+def register_chat_routes(app: Flask, ai_chat_service: AIChatService):
+    """注册AI助手聊天路由（SSE）"""
+    @app.route('/api/chat', methods=['POST'])
+    def chat():
+        data = request.get_json()
+        messages = data.get('messages', [])
+    
+        if not messages:
+            return jsonify({'success': False, 'error': '消息不能为空'})
+    
+        response = ai_chat_service.chat(messages)
+    
+        if response.get('success', False):
+            if 'stream' in response:
+                def generate():
+                    try:
+                        for line in response['stream'].iter_lines():
+                            if line:
+                                try:
+                                    line = line.decode('utf-8')
+                                    if line.startswith('data: '):
+                                        data = line[6:]  # Remove 'data: ' prefix
+                                        if data == '[DONE]':
+                                            yield 'data: [DONE]\n\n'
+                                        else:
+                                            try:
+                                                json_data = json.loads(data)
+                                                if 'choices' in json_data and len(json_data['choices']) > 0:
+                                                    content = json_data['choices'][0].get('delta', {}).get('content', '')
+                                                    if content:
+                                                        yield f'data: {json.dumps({"content": content})}\n\n'
+                                            except json.JSONDecodeError as e:
+                                                STREAM_ERRORS.inc(route='/api/chat', reason='json')
+                                                logging.warning(f"JSON decode error: {e}, data: {data}")
+                                                continue
+                                except UnicodeDecodeError as e:
+                                    STREAM_ERRORS.inc(route='/api/chat', reason='unicode')
+                                    logging.warning(f"Unicode decode error: {e}, line: {line}")
+                                    continue
+                    except Exception as e:
+                        STREAM_ERRORS.inc(route='/api/chat', reason=type(e).__name__)
+                        current_span().record_error(e)
+                        logging.error(f"Stream error: {e}")
+                        yield f'data: {json.dumps({"error": str(e)})}\n\n'
+                    finally:
+                        # 读完或出错时尽早归还上游调用名额和连接
+                        response['stream'].close()
+                    # 不放在 finally 中：客户端断开时生成器不能再输出
+                    yield 'data: [DONE]\n\n'
+            
+                sse_response = Response(
+                    track_stream(trace_stream(generate(), 'sse.relay', current_span()), '/api/chat'),
+                    mimetype='text/event-stream',
+                    headers={
+                        'Cache-Control': 'no-cache',
+                        'Connection': 'keep-alive',
+                        'X-Accel-Buffering': 'no'
+                    }
+                )
+                # 客户端在第一个片段之前断开时生成器从未开始，上面的 finally 不会执行；
+                # WSGI 服务器关闭响应时总会调用这里，名额不会泄漏（close 可重复调用）
+                sse_response.call_on_close(response['stream'].close)
+                return sse_response
+            else:
+                return jsonify(response)
+        else:
+            return jsonify(response)
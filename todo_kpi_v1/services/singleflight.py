@@ -0,0 +1,89 @@
+"""相同请求的合并（single flight）
+
+同一时刻有多个相同的上游请求时，只有第一个真正发出，其余等待并共用它的结果（包括失败）；
+请求完成后立即移除，不做缓存，之后的相同请求会重新发出。
+请求以规范化的参数（排序后的 JSON）的 SHA-256 作为键。
+"""
+import functools
+import hashlib
+import inspect
+import json
+import threading
+
+from services.metrics import record_cache
+from services.tracing import current_span
+
+
+def request_key(*parts):
+    """参数的规范键：字典按键排序，与参数的书写顺序无关"""
+    canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        """执行 func 或等待正在进行的相同调用，返回 (结果, 是否为共用的结果)；失败时所有调用方收到同一个异常"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+def coalesced(name):
+    """装饰 DeepSeekService 的方法：参数相同的并发调用合并为一次，使用实例的 singleflight
+
+    结果为字典时每个调用方得到一份浅拷贝；合并情况计入 api_cache_lookups_total（cache=singleflight_<name>，
+    hit 表示共用了其他请求的结果）。
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            del arguments['self']
+            key = request_key(name, self.api_base, arguments)
+            result, shared = self.singleflight.do(key, lambda: func(self, *args, **kwargs))
+            record_cache(f"singleflight_{name}", shared)
+            if shared:
+                current_span().set("singleflight.shared", True)
+            return dict(result) if isinstance(result, dict) else result
+        return wrapper
+    return decorator
+
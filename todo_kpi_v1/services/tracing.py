@@ -0,0 +1,383 @@
+"""请求内的调用链追踪
+
+每个请求创建一个根 span，服务方法和上游调用在其下创建子 span，当前 span 保存在 contextvars 中，
+不需要逐层传参；SSE 转发在请求处理函数返回后才执行，需要显式传入父 span。
+
+导出方式由环境变量 TRACE_EXPORT 指定，未设置时不记录，span 为空操作：
+    TRACE_EXPORT=jsonl:traces.jsonl                        每个 span 一行 JSON
+    TRACE_EXPORT=otlp:http://127.0.0.1:4318/v1/traces      OTLP/HTTP JSON，后台线程批量发送
+TRACE_SAMPLE_RATE 为根 span 的采样比例（默认 1），子 span 跟随父 span。
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Flask, request
+
+SERVICE_NAME = "todo_kpi_api"
+OTLP_BATCH_SIZE = 256
+OTLP_FLUSH_INTERVAL = 2.0  # 秒
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    """未启用追踪或未被采样时使用，所有操作为空"""
+    recording = False
+    trace_id = span_id = None
+
+    def set(self, key, value):
+        pass
+
+    def event(self, name, **attributes):
+        pass
+
+    def record_error(self, error):
+        pass
+
+    def end(self):
+        pass
+
+    def traceparent(self):
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    recording = True
+
+    def __init__(self, tracer, name, trace_id, parent_id=None, attributes=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def event(self, name, **attributes):
+        """记录一个时间点，如收到首字节"""
+        self.events.append((name, time.time_ns(), attributes))
+
+    def record_error(self, error):
+        self.status = "error"
+        self.attributes["error"] = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            exporter = self.tracer.exporter
+            if exporter is not None:
+                exporter.export(self)
+
+    def traceparent(self):
+        """W3C traceparent 请求头，用于把追踪传给上游"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_ns,
+            "end": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "events": [
+                {"name": name, "offset_ms": round((at - self.start_ns) / 1e6, 3), **attributes}
+                for name, at, attributes in self.events
+            ],
+        }
+
+
+class JsonlExporter:
+    """span 结束时追加一行到文件"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+        if hasattr(os, 'register_at_fork'):
+            # 多进程服务器 fork 后，锁可能正被其他线程持有
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def shutdown(self):
+        with self._lock:
+            self._file.close()
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes):
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class OtlpHttpExporter:
+    """以 OTLP/HTTP JSON 批量发送到采集端，发送在后台线程进行，队列满时丢弃"""
+
+    def __init__(self, endpoint, max_queue=10000):
+        self.endpoint = endpoint
+        self.max_queue = max_queue
+        self._start()
+        if hasattr(os, 'register_at_fork'):
+            # 后台线程不会随 fork 复制到子进程，需要重新启动
+            os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._queue = queue.Queue(self.max_queue)
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            if batch[0] is None:
+                return
+            deadline = time.monotonic() + OTLP_FLUSH_INTERVAL
+            while len(batch) < OTLP_BATCH_SIZE:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    self._send(batch)
+                    return
+                batch.append(span)
+            self._send(batch)
+
+    def _send(self, spans):
+        import requests
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [self._to_otlp(span) for span in spans]}],
+        }]}
+        try:
+            requests.post(self.endpoint, json=payload, timeout=5)
+        except Exception as e:
+            logging.warning(f"发送追踪数据失败: {e}")
+
+    @staticmethod
+    def _to_otlp(span):
+        return {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_id or "",
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": _otlp_attributes(span.attributes),
+            "events": [
+                {"name": name, "timeUnixNano": str(at), "attributes": _otlp_attributes(attributes)}
+                for name, at, attributes in span.events
+            ],
+            "status": {"code": 2 if span.status == "error" else 1},
+        }
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+def _parse_traceparent(header):
+    """解析 W3C traceparent，返回 (trace_id, parent_id) 或 None"""
+    parts = (header or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+class Tracer:
+    def __init__(self, exporter=None, sample_rate=1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def start_span(self, name, parent=None, traceparent=None, **attributes):
+        """创建并开始一个 span（不设为当前 span），用完调用 end()
+
+        Args:
+            parent: 父 span，默认为当前 span；没有父 span 时为根 span，按采样比例决定是否记录
+            traceparent (str): 调用方传入的 W3C traceparent，根 span 沿用其中的 trace_id
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        if parent is None:
+            parent = _current_span.get()
+        if parent is not None:
+            if not parent.recording:
+                return NOOP_SPAN
+            return Span(self, name, parent.trace_id, parent.span_id, attributes)
+        remote = _parse_traceparent(traceparent)
+        if remote is None and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return NOOP_SPAN
+        trace_id, parent_id = remote or (os.urandom(16).hex(), None)
+        return Span(self, name, trace_id, parent_id, attributes)
+
+    @contextmanager
+    def span(self, name, parent=None, **attributes):
+        """在 with 块内作为当前 span，异常会记录到 span 上后继续抛出"""
+        span = self.start_span(name, parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def shutdown(self):
+        if self.exporter is not None:
+            self.exporter.shutdown()
+            self.exporter = None
+
+
+def current_span():
+    span = _current_span.get()
+    return span if span is not None else NOOP_SPAN
+
+
+def traced(name):
+    """装饰器：调用期间创建子 span；返回 {'success': False} 的结果也记为错误"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(name) as span:
+                result = func(*args, **kwargs)
+                if isinstance(result, dict) and result.get('success') is False:
+                    span.record_error(result.get('error'))
+                return result
+        return wrapper
+    return decorator
+
+
+def trace_stream(chunks, name, parent):
+    """包装SSE生成器，输出期间记录一个 span：首个片段（first_chunk）、片段数、字节数，结束即末字节
+
+    生成器在请求处理函数返回后才被迭代，需要显式传入父 span；每次取下一个片段时该 span 为当前 span，
+    生成器内部可以用 current_span() 记录错误。
+    """
+    span = tracer.start_span(name, parent=parent)
+    if not span.recording:
+        yield from chunks
+        return
+    count = size = 0
+    try:
+        while True:
+            token = _current_span.set(span)
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            finally:
+                _current_span.reset(token)
+            if not count:
+                span.event("first_chunk")
+            count += 1
+            size += len(chunk.encode("utf-8")) if isinstance(chunk, str) else len(chunk)
+            yield chunk
+    except BaseException as e:
+        # 包括客户端断开时的 GeneratorExit
+        span.record_error(e)
+        raise
+    finally:
+        span.set("stream.chunks", count)
+        span.set("stream.bytes", size)
+        span.end()
+
+
+def create_exporter(spec):
+    """按 TRACE_EXPORT 的格式创建导出器：jsonl:<路径> 或 otlp:<地址>"""
+    if not spec:
+        return None
+    kind, _, target = spec.partition(":")
+    if kind == "jsonl":
+        return JsonlExporter(target or "traces.jsonl")
+    if kind == "otlp":
+        return OtlpHttpExporter(target or "http://127.0.0.1:4318/v1/traces")
+    raise ValueError(f"无效的 TRACE_EXPORT: {spec}")
+
+
+tracer = Tracer(create_exporter(os.getenv('TRACE_EXPORT')), float(os.getenv('TRACE_SAMPLE_RATE', '1')))
+
+
+def install_tracing(app: Flask, tracer: Tracer = tracer):
+    """每个请求创建根 span；流式响应在输出结束、连接关闭时才结束根 span"""
+    if not tracer.enabled:
+        return
+
+    @app.before_request
+    def _start_request_span():
+        span = tracer.start_span(f"{request.method} {request.path}", traceparent=request.headers.get('traceparent'),
+                                 **{"http.method": request.method, "http.target": request.path})
+        request.environ['tracing.span'] = span
+        request.environ['tracing.token'] = _current_span.set(span)
+
+    @app.after_request
+    def _finish_request_span(response):
+        span = request.environ.get('tracing.span')
+        if span is not None:
+            span.set("http.status_code", response.status_code)
+            if request.url_rule is not None:
+                span.set("http.route", request.url_rule.rule)
+            if response.status_code >= 500:
+                span.record_error(f"HTTP {response.status_code}")
+            response.call_on_close(span.end)
+        return response
+
+    @app.teardown_request
+    def _reset_current_span(error=None):
+        span = request.environ.pop('tracing.span', None)
+        token = request.environ.pop('tracing.token', None)
+        if span is not None and error is not None:
+            span.record_error(error)
+            span.end()
+        if token is not None:
+            _current_span.reset(token)
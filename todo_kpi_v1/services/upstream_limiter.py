@@ -0,0 +1,207 @@
+"""上游调用的并发限制与公平排队
+
+同时进行的上游调用数有进程内的总上限和每个客户端的上限，超出的请求排队等待；
+空出名额时在有请求排队的客户端之间轮流分配，同一客户端内先到先得，
+一个客户端的突发请求不会占满队列前部。队列过长或等待超时时直接拒绝（返回503），
+避免积压的请求在上游恢复前拖垮整个服务。
+
+限制只在一个进程内生效：gunicorn 启动 N 个工作进程时，发往上游的并发最多为
+N × UPSTREAM_MAX_CONCURRENCY，排队上限和每个客户端的上限也是每个进程各自计算。
+需要按整个服务限制时设置 *_TOTAL，按工作进程数（API_WORKERS）平分到每个进程。
+
+参数由环境变量配置：
+    UPSTREAM_MAX_CONCURRENCY        每个进程同时进行的上游调用数，0 表示不限制（默认 16）
+    UPSTREAM_MAX_CONCURRENCY_TOTAL  整个服务同时进行的上游调用数，设置后代替上一项
+    UPSTREAM_PER_CLIENT             每个进程中每个客户端同时进行的调用数，0 表示不限制（默认 4）
+    UPSTREAM_MAX_QUEUE              每个进程的排队请求数上限，超出时立即拒绝（默认 64）
+    UPSTREAM_MAX_QUEUE_TOTAL        整个服务的排队请求数上限，设置后代替上一项
+    UPSTREAM_QUEUE_TIMEOUT          排队等待的最长时间，秒（默认 30）
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from flask import Flask, jsonify, has_request_context, request
+
+from services.metrics import UPSTREAM_QUEUE_WAIT, UPSTREAM_QUEUE_DEPTH, UPSTREAM_IN_FLIGHT, UPSTREAM_SHED
+
+RETRY_AFTER_SECONDS = 5  # 拒绝时建议客户端等待的时间
+
+
+class UpstreamOverloaded(Exception):
+    """上游调用排队过长或等待超时，请求被拒绝"""
+
+    def __init__(self, reason):
+        super().__init__(f"upstream overloaded: {reason}")
+        self.reason = reason
+
+
+def _per_process_limit(name, default):
+    """每个进程的上限：设置了 <name>_TOTAL 时按工作进程数平分（向下取整，至少为1），否则取 <name>"""
+    total = os.getenv(f'{name}_TOTAL')
+    if not total:
+        return int(os.getenv(name, default))
+    total = int(total)
+    workers = max(1, int(os.getenv('API_WORKERS', '1')))
+    if total <= 0:
+        return total
+    if total < workers:
+        logging.warning(f"{name}_TOTAL={total} 小于工作进程数 {workers}，每个进程至少保留1个名额")
+    return max(1, total // workers)
+
+
+class _Waiter:
+    __slots__ = ("client", "event", "granted")
+
+    def __init__(self, client):
+        self.client = client
+        self.event = threading.Event()
+        self.granted = False
+
+
+class UpstreamLimiter:
+    def __init__(self, max_concurrent=16, per_client=4, max_queue=64, queue_timeout=30.0):
+        self.max_concurrent = max_concurrent
+        self.per_client = per_client
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._active = 0
+        self._active_by_client = {}
+        self._queues = OrderedDict()  # 客户端 -> 排队的 _Waiter，按轮转顺序排列
+        self._queued = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_concurrent=_per_process_limit('UPSTREAM_MAX_CONCURRENCY', '16'),
+            per_client=int(os.getenv('UPSTREAM_PER_CLIENT', '4')),
+            max_queue=_per_process_limit('UPSTREAM_MAX_QUEUE', '64'),
+            queue_timeout=float(os.getenv('UPSTREAM_QUEUE_TIMEOUT', '30'))
+        )
+
+    def _has_capacity(self, client):
+        if self.max_concurrent and self._active >= self.max_concurrent:
+            return False
+        return not self.per_client or self._active_by_client.get(client, 0) < self.per_client
+
+    def _grant(self, client):
+        self._active += 1
+        self._active_by_client[client] = self._active_by_client.get(client, 0) + 1
+        UPSTREAM_IN_FLIGHT.set(self._active)
+
+    def _dispatch(self):
+        """把空出的名额轮流分给排队的客户端（需持有锁）"""
+        while self._queues and (not self.max_concurrent or self._active < self.max_concurrent):
+            for client in self._queues:
+                if self._has_capacity(client):
+                    break
+            else:
+                return  # 排队的客户端都已达到各自的上限
+            waiters = self._queues.pop(client)
+            waiter = waiters.popleft()
+            if waiters:
+                self._queues[client] = waiters  # 移到队尾，下一个名额先给其他客户端
+            self._queued -= 1
+            UPSTREAM_QUEUE_DEPTH.set(self._queued)
+            self._grant(client)
+            waiter.granted = True
+            waiter.event.set()
+
+    def acquire(self, client):
+        """取得一个调用名额，必要时排队；返回排队的秒数，被拒绝时抛出 UpstreamOverloaded"""
+        with self._lock:
+            if client not in self._queues and self._has_capacity(client):
+                self._grant(client)
+                UPSTREAM_QUEUE_WAIT.observe(0.0)
+                return 0.0
+            if self._queued >= self.max_queue:
+                UPSTREAM_SHED.inc(reason="queue_full")
+                raise UpstreamOverloaded("queue_full")
+            waiter = _Waiter(client)
+            self._queues.setdefault(client, deque()).append(waiter)
+            self._queued += 1
+            UPSTREAM_QUEUE_DEPTH.set(self._queued)
+
+        start = time.perf_counter()
+        waiter.event.wait(self.queue_timeout)
+        waited = time.perf_counter() - start
+        with self._lock:
+            if not waiter.granted:
+                waiters = self._queues[client]
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._queues[client]
+                self._queued -= 1
+                UPSTREAM_QUEUE_DEPTH.set(self._queued)
+                UPSTREAM_SHED.inc(reason="timeout")
+                raise UpstreamOverloaded("timeout")
+        UPSTREAM_QUEUE_WAIT.observe(waited)
+        return waited
+
+    def try_acquire(self, client):
+        """有空闲名额时立即取得并返回 True，否则返回 False，不排队"""
+        with self._lock:
+            if client in self._queues or not self._has_capacity(client):
+                return False
+            self._grant(client)
+            return True
+
+    def release(self, client):
+        with self._lock:
+            self._active -= 1
+            remaining = self._active_by_client[client] - 1
+            if remaining:
+                self._active_by_client[client] = remaining
+            else:
+                del self._active_by_client[client]
+            UPSTREAM_IN_FLIGHT.set(self._active)
+            self._dispatch()
+
+    def stats(self):
+        with self._lock:
+            return {"active": self._active, "queued": self._queued, "clients": len(self._active_by_client)}
+
+
+class LimitedStream:
+    """持有调用名额的流式响应，读完或关闭时归还名额"""
+
+    def __init__(self, response, release):
+        self._response = response
+        self._release = release
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def iter_lines(self, *args, **kwargs):
+        try:
+            yield from self._response.iter_lines(*args, **kwargs)
+        finally:
+            self.close()
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is not None:
+            self._response.close()
+            release()
+
+
+def request_client_id():
+    """当前请求的客户端标识：X-Client-Id 请求头，否则为来源地址；不在请求中时为空字符串"""
+    if not has_request_context():
+        return ""
+    return (request.headers.get('X-Client-Id')
+            or request.headers.get('X-Forwarded-For', '').split(',')[0].strip()
+            or request.remote_addr or "")
+
+
+def install_load_shedding(app: Flask):
+    """被拒绝的上游调用返回 503 和 Retry-After"""
+    @app.errorhandler(UpstreamOverloaded)
+    def _overloaded(error):
+        response = jsonify({'success': False, 'error': '服务繁忙，请稍后重试', 'reason': error.reason})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+        return response
@@ -4,6 +4,8 @@ from datetime import datetime
 import os
 import pytz
 
+from services.tracing import traced
+
 # 平台类型枚举
 class PlatformType:
     WINDOWS = 'windows'
@@ -59,6 +61,7 @@ class VersionService:
         with self.app.app_context():
             self.db.create_all()
 
+    @traced("VersionService.check_update")
     def check_update(self, current_version: str, platform: str):
         if not current_version or not platform:
             return {'error': 'Missing version or platform parameter'}, 400
@@ -24,7 +24,7 @@ set FLASK_ENV=development
 :: 启动API服务
 cd /d "%SCRIPT_DIR%"
 python -c "from dotenv import load_dotenv; load_dotenv('%ROOT_DIR%.env'); import api_server"
-python api_server.py
+python serve.py
 
 :: 如果服务异常退出，等待用户确认
 if %errorlevel% neq 0 (
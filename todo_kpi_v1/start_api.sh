@@ -13,7 +13,7 @@ source venv/bin/activate
 cd ./todo_kpi_v1
 
 # 启动API服务
-python api_server.py
+python serve.py
 
 # 如果服务异常退出，等待用户确认
 if [ $? -ne 0 ]; then
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 与 main.py 一样以 todo_kpi_v1 为根目录导入 core、services 等模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,83 @@
+"""DataManager 增量维护的 TodoAggregates 与重新统计的结果一致"""
+import pytest
+
+from core.aggregates import TodoAggregates
+from core.data_manager import DataManager
+from core.dates import date_to_day
+from core.records import Todo
+
+DAY = date_to_day("2025-03-03")
+TYPES = ["读书", "运动", "写作"]
+
+
+def summary(aggregates):
+    result = {}
+    for type_name in TYPES:
+        stats = aggregates.get(type_name)
+        result[type_name] = (
+            stats.open_count, stats.completed_count, pytest.approx(stats.open_progress),
+            pytest.approx(stats.open_target), list(stats.open_deadlines),
+        )
+    return result
+
+
+def assert_consistent(dm):
+    assert summary(dm.todo_aggregates) == summary(TodoAggregates(dm.data["todos"]))
+
+
+def edit(dm, index, **fields):
+    with dm.edit_todo(index) as todo:
+        for name, value in fields.items():
+            setattr(todo, name, value)
+
+
+def steps():
+    def add(i, type_name, completed=False):
+        return lambda dm: dm.add_todo(Todo(f"TODO{i}", type_name, "次", 10.0 + i, progress=i * 0.1,
+                                           deadline=DAY + i % 5 - 2, completed=completed))
+    return [
+        add(0, "读书"), add(1, "读书"), add(2, "运动"), add(3, "写作", completed=True), add(4, "读书"),
+        lambda dm: edit(dm, 0, progress=3.3, target=12.5),
+        lambda dm: edit(dm, 1, deadline=DAY + 10),
+        lambda dm: edit(dm, 2, type="读书"),                    # 换项目类型
+        lambda dm: dm.complete_todo(1, DAY),
+        lambda dm: dm.complete_todo(4, DAY),
+        lambda dm: dm.restore_todo(3),
+        lambda dm: edit(dm, 3, progress=1.1),
+        lambda dm: dm.delete_todo(0),
+        lambda dm: dm.delete_todo(2),
+        add(5, "运动"),
+    ]
+
+
+def test_aggregates_match_recompute_through_undo_redo(tmp_path):
+    dm = DataManager(str(tmp_path / "data.json"))
+    assert_consistent(dm)  # 首次查询时建立，之后增量维护
+    history = [summary(dm.todo_aggregates)]
+    for step in steps():
+        step(dm)
+        assert_consistent(dm)
+        history.append(summary(dm.todo_aggregates))
+
+    for expected in reversed(history[:-1]):
+        assert dm.undo()
+        assert_consistent(dm)
+        assert summary(dm.todo_aggregates) == expected
+    for expected in history[1:]:
+        assert dm.redo()
+        assert_consistent(dm)
+        assert summary(dm.todo_aggregates) == expected
+    dm.close()
+
+
+def test_failed_edit_keeps_aggregates(tmp_path):
+    dm = DataManager(str(tmp_path / "data.json"))
+    dm.add_todo(Todo("TODO", "读书", "页", 100.0, progress=5.0, deadline=DAY))
+    before = summary(dm.todo_aggregates)
+    with pytest.raises(RuntimeError):
+        with dm.edit_todo(0) as todo:
+            todo.progress = 50.0
+            raise RuntimeError("中途出错")
+    assert summary(dm.todo_aggregates) == before
+    assert_consistent(dm)
+    dm.close()
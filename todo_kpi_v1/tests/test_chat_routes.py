@@ -0,0 +1,64 @@
+"""/api/chat 的 SSE 转发：上游调用名额的归还"""
+import pytest
+from flask import Flask
+from werkzeug.test import EnvironBuilder
+
+from benchmarks import fake_upstream
+from services.ai_chat_service import AIChatService
+from services.deepseek_service import DeepSeekService
+from services.routes.chat_routes import register_chat_routes
+from services.upstream_limiter import UpstreamLimiter
+
+CHAT = {"messages": [{"role": "user", "content": "你好"}]}
+
+
+@pytest.fixture
+def upstream():
+    config = fake_upstream.UpstreamConfig(latency_ms=0, jitter_ms=0, tokens_per_second=0, max_tokens=5)
+    server, api_base = fake_upstream.start_in_thread(config=config)
+    yield api_base
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def chat_app(upstream, monkeypatch):
+    monkeypatch.setenv("SILICONFLOW_API_BASE", upstream)
+    monkeypatch.setenv("SILICONFLOW_API_KEY", "test")
+    app = Flask(__name__)
+    limiter = UpstreamLimiter(max_concurrent=2, per_client=1, max_queue=4, queue_timeout=0.5)
+    register_chat_routes(app, AIChatService(app, DeepSeekService(app, limiter=limiter)))
+    return app, limiter
+
+
+def test_stream_read_to_end_releases_slot(chat_app):
+    app, limiter = chat_app
+    response = app.test_client().post("/api/chat", json=CHAT)
+    body = response.get_data(as_text=True)
+    assert body.count('"content"') == 5
+    assert body.endswith("data: [DONE]\n\n")
+    assert limiter.stats()["active"] == 0
+
+
+def open_stream(app):
+    """像 WSGI 服务器一样调用应用，返回还没有迭代过的响应体"""
+    environ = EnvironBuilder(method="POST", path="/api/chat", json=CHAT).get_environ()
+    statuses = []
+    body = app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    assert statuses == ["200 OK"]
+    return body
+
+
+def test_response_closed_before_first_chunk_releases_slot(chat_app):
+    app, limiter = chat_app
+    body = open_stream(app)
+    assert limiter.stats()["active"] == 1
+
+    # 客户端在第一个片段之前断开：服务器只调用 close()，生成器一次也没有被迭代
+    body.close()
+    assert limiter.stats() == {"active": 0, "queued": 0, "clients": 0}
+
+    # 同一客户端（per_client=1）之后的请求不会被泄漏的名额挡住
+    for _ in range(3):
+        open_stream(app).close()
+    assert limiter.stats()["active"] == 0
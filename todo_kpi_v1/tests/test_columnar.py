@@ -0,0 +1,97 @@
+"""列式备份（.tkc）的读写"""
+import zlib
+
+import pytest
+
+from core.columnar import MAGIC, ColumnarFormatError, read_columnar, write_columnar
+from core.csv_exporter import ExportCancelled
+
+
+def sample_data():
+    return {
+        "projects": {
+            "读书": {"unit": "页", "count": 3, "progress_type": "absolute"},
+            "Écriture ✍": {"unit": "字", "count": 0, "progress_type": "cumulative"},
+        },
+        "todos": [
+            {"name": "读完《三体》", "type": "读书", "unit": "页", "target": 300.0, "progress": 120.5,
+             "progress_type": "absolute", "deadline": "2025-04-01", "completed": False},
+            {"name": "随笔 🎉", "type": "Écriture ✍", "unit": "字", "target": 5000.0, "progress": 5000.0,
+             "progress_type": "cumulative", "deadline": "2024-12-31", "completed": True,
+             "complete_time": "2024-12-30"},
+        ],
+        "kpis": [
+            {"id": 1, "name": "每日阅读", "period_type": "daily", "custom_days": None, "target": 20.0,
+             "unit": "页", "todo_id": 0, "duration_type": "forever", "created_at": "2024-01-01"},
+            {"id": 70000, "name": "三天一篇", "period_type": "custom", "custom_days": 3, "target": 1.0,
+             "unit": "篇", "todo_id": None, "duration_type": "one_month", "created_at": "2025-02-28"},
+        ],
+        "kpi_records": {
+            "2024-01-01": {1: True},
+            "2024-02-29": {1: True, 70000: True},
+            "2025-03-01": {70000: True},
+        },
+    }
+
+
+def round_trip(tmp_path, data):
+    path = write_columnar(str(tmp_path / "backup.tkc"), data)
+    return read_columnar(path)
+
+
+def test_round_trip(tmp_path):
+    data = sample_data()
+    assert round_trip(tmp_path, data) == data
+
+
+def test_round_trip_empty_tables(tmp_path):
+    data = {"projects": {}, "todos": [], "kpis": [], "kpi_records": {}}
+    assert round_trip(tmp_path, data) == data
+
+
+def test_round_trip_many_records(tmp_path):
+    data = sample_data()
+    data["kpi_records"] = {
+        f"2024-{month:02d}-{day:02d}": {1: True, 70000: True}
+        for month in range(1, 13) for day in range(1, 29)
+    }
+    assert round_trip(tmp_path, data) == data
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "backup.tkc"
+    path.write_bytes(b"PK\x03\x04 not a backup")
+    with pytest.raises(ColumnarFormatError):
+        read_columnar(str(path))
+
+
+@pytest.mark.parametrize("damage", [
+    lambda body: body[:len(body) // 2],                                   # 文件被截断
+    lambda body: body[:20] + bytes([body[20] ^ 0xFF]) + body[21:],         # 内容损坏
+])
+def test_rejects_damaged_file(tmp_path, damage):
+    path = write_columnar(str(tmp_path / "backup.tkc"), sample_data())
+    with open(path, "rb") as f:
+        content = f.read()
+    with open(path, "wb") as f:
+        f.write(content[:len(MAGIC)] + damage(content[len(MAGIC):]))
+    with pytest.raises(ColumnarFormatError):
+        read_columnar(path)
+
+
+def test_rejects_incomplete_tables(tmp_path):
+    # 压缩完整但表数据不完整，例如写入程序中途出错
+    path = write_columnar(str(tmp_path / "backup.tkc"), sample_data())
+    with open(path, "rb") as f:
+        body = zlib.decompress(f.read()[len(MAGIC):])
+    with open(path, "wb") as f:
+        f.write(MAGIC + zlib.compress(body[:len(body) - 7]))
+    with pytest.raises(ColumnarFormatError):
+        read_columnar(path)
+
+
+def test_cancel_removes_partial_file(tmp_path):
+    path = tmp_path / "backup.tkc"
+    with pytest.raises(ExportCancelled):
+        write_columnar(str(path), sample_data(), is_cancelled=lambda: True)
+    assert not path.exists()
@@ -0,0 +1,68 @@
+"""CSV 导出：目录与压缩包的内容一致，表头满足导入的要求"""
+import csv
+import os
+import zipfile
+
+from core.csv_exporter import CsvExporter
+from core.csv_importer import CsvImporter
+from core.dates import date_to_day
+
+DAY = date_to_day("2025-03-03")
+
+
+def sample_data():
+    return {
+        "projects": {"读书": {"unit": "页", "count": 1, "progress_type": "absolute"},
+                     "运动": {"unit": "分钟", "count": 0, "progress_type": "cumulative"}},
+        "todos": [
+            {"name": "读完《三体》", "type": "读书", "unit": "页", "target": 300.0, "progress": 300.0,
+             "progress_type": "absolute", "deadline": "2025-04-01", "completed": True,
+             "complete_time": "2025-03-20"},
+            {"name": "跑步, 5公里", "type": "运动", "unit": "分钟", "target": 30.0, "progress": 0.0,
+             "progress_type": "cumulative", "deadline": "2025-05-01", "completed": False},
+        ],
+        "kpis": [{"id": 1, "name": "每日阅读", "period_type": "daily", "custom_days": None, "target": 10.0,
+                  "unit": "页", "todo_id": 0, "duration_type": "forever", "created_at": "2025-03-01"}],
+        "kpi_records": {f"2025-03-{day:02d}": {1: True} for day in range(1, 11)},
+    }
+
+
+def read_tables_from_dir(export_dir):
+    tables = {}
+    for file_name in sorted(os.listdir(export_dir)):
+        with open(os.path.join(export_dir, file_name), "rb") as f:
+            tables[file_name] = f.read()
+    return tables
+
+
+def read_tables_from_zip(archive_path):
+    with zipfile.ZipFile(archive_path) as archive:
+        return {name: archive.read(name) for name in sorted(archive.namelist())}
+
+
+def test_zip_and_dir_exports_are_identical(tmp_path):
+    data = sample_data()
+    export_dir = CsvExporter(data).export_to_dir(str(tmp_path / "export"))
+    archive = CsvExporter(data).export_to_archive(str(tmp_path / "export.zip"))
+
+    from_dir, from_zip = read_tables_from_dir(export_dir), read_tables_from_zip(archive)
+    assert list(from_dir) == ["kpi_records.csv", "kpis.csv", "projects.csv", "todos.csv"]
+    assert from_dir == from_zip
+
+
+def test_headers_match_importer(tmp_path):
+    export_dir = CsvExporter(sample_data()).export_to_dir(str(tmp_path / "export"))
+    for file_name, required in CsvImporter.REQUIRED_FIELDS.items():
+        with open(os.path.join(export_dir, file_name), encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            rows = list(reader)
+        assert set(required) <= set(reader.fieldnames), file_name
+        for row in rows:
+            assert all(row[field] for field in required), (file_name, row)
+
+
+def test_progress_reaches_100(tmp_path):
+    progress = []
+    CsvExporter(sample_data(), progress.append).export_to_archive(str(tmp_path / "export.zip"))
+    assert progress[-1] == 100
+    assert progress == sorted(progress)
@@ -0,0 +1,305 @@
+"""DataManager 的持久化：操作日志、检查点、快照与撤销/重做"""
+import json
+import os
+
+import pytest
+
+from core.data_manager import DataManager
+from core.dates import date_to_day
+from core.models import PeriodType
+from core.oplog import JOURNAL_CHECKPOINT_OPS
+from core.records import Kpi, Todo
+
+DAY = date_to_day("2025-03-03")
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    return str(tmp_path / "data.json")
+
+
+def make_kpi(kpi_id, name="阅读", period_type=PeriodType.DAILY.value):
+    return Kpi(kpi_id, name, period_type, 1.0, "次", DAY - 30)
+
+
+def make_todo(name="读完一本书"):
+    return Todo(name, "读书", "页", 100.0, deadline=DAY + 30)
+
+
+def populate(dm):
+    """两个KPI、一个TODO和几天的完成记录，每步都保存"""
+    dm.add_kpi(make_kpi(1))
+    dm.add_kpi(make_kpi(2, "跑步"))
+    dm.add_todo(make_todo())
+    dm.save()
+    for day in range(DAY - 5, DAY):
+        dm.save_kpi_record(day, 1, True)
+    dm.save_kpi_record(DAY, 2, True)
+
+
+def journal_lines(dm):
+    with open(dm.oplog.journal_file, encoding="utf-8") as f:
+        return f.readlines()
+
+
+def test_journal_replayed_after_crash(data_file):
+    dm = DataManager(data_file)
+    populate(dm)
+    expected = dm.snapshot()
+    # 没有调用 close()：修改只在操作日志中
+    assert len(journal_lines(dm)) > 1
+
+    reopened = DataManager(data_file)
+    assert reopened.snapshot() == expected
+    assert reopened.is_kpi_completed_for_date(1, DAY - 1)
+
+
+def test_journal_ignored_when_data_file_changed(data_file):
+    dm = DataManager(data_file)
+    dm.save()
+    dm.add_kpi(make_kpi(1))
+    dm.save()
+
+    # data.json 被替换后，日志中的操作不再对应它，不能重放
+    with open(data_file, encoding="utf-8") as f:
+        data = json.load(f)
+    data["window_size"] = [640, 480]
+    with open(data_file, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+    reopened = DataManager(data_file)
+    assert reopened.data["kpis"] == []
+    assert reopened.window_size == [640, 480]
+    assert len(journal_lines(reopened)) == 1
+
+
+def test_truncated_journal_line_is_dropped(data_file):
+    dm = DataManager(data_file)
+    dm.save()
+    dm.add_kpi(make_kpi(1))
+    dm.save()
+    with open(dm.oplog.journal_file, "a", encoding="utf-8") as f:
+        f.write('["insert_kpi", null, {"id": 2')  # 写入中断
+
+    reopened = DataManager(data_file)
+    assert [kpi.id for kpi in reopened.data["kpis"]] == [1]
+    assert reopened.oplog.damaged
+    reopened.save()
+    assert len(journal_lines(reopened)) == 1  # 已重写 data.json 并清空日志
+
+
+def test_snapshot_and_journal_stay_consistent(data_file):
+    dm = DataManager(data_file)
+    populate(dm)
+    dm.close()
+    assert os.path.exists(dm.snapshot_file)
+    assert len(journal_lines(dm)) == 1
+
+    # 下次启动映射快照，之后的修改只追加到日志
+    second = DataManager(data_file)
+    assert second.kpi_records._base is not None
+    second.save_kpi_record(DAY + 1, 1, True)
+    second.save_kpi_record(DAY - 1, 1, False)
+    expected = second.snapshot()
+
+    # 中途退出：快照仍对应 data.json，日志在快照之上重放
+    third = DataManager(data_file)
+    assert third.kpi_records._base is not None
+    assert third.snapshot() == expected
+    third.close()
+
+    fourth = DataManager(data_file)
+    assert fourth.snapshot() == expected
+    with open(data_file, encoding="utf-8") as f:
+        saved = json.load(f)["kpi_records"]
+    assert saved == {date_str: {str(kpi_id): True for kpi_id in records}
+                     for date_str, records in expected["kpi_records"].items()}
+
+
+def test_undo_redo_delete_kpi(data_file):
+    dm = DataManager(data_file)
+    populate(dm)
+    before = dm.snapshot()
+
+    dm.delete_kpi(1)
+    dm.save()
+    assert dm.get_kpi(1) is None
+    assert dm.kpi_records.kpi_days(1) == []
+
+    assert dm.undo() == "删除KPI「阅读」"
+    dm.save()
+    assert dm.snapshot() == before
+    assert dm.kpi_records.kpi_days(1) == list(range(DAY - 5, DAY))
+
+    assert dm.redo() == "删除KPI「阅读」"
+    dm.save()
+    after_redo = dm.snapshot()
+    assert dm.get_kpi(1) is None
+    assert DataManager(data_file).snapshot() == after_redo
+
+
+def test_undo_redo_clear_kpis(data_file):
+    dm = DataManager(data_file)
+    populate(dm)
+    before = dm.snapshot()
+
+    dm.clear_kpis()
+    dm.save()
+    assert dm.data["kpis"] == []
+    assert dm.kpi_records.to_dict() == {}
+
+    dm.undo()
+    dm.save()
+    assert dm.snapshot() == before
+    # 整体替换无法写入日志，保存时重写 data.json
+    assert DataManager(data_file).snapshot() == before
+
+    dm.redo()
+    dm.save()
+    assert dm.data["kpis"] == []
+    assert DataManager(data_file).snapshot()["kpi_records"] == {}
+
+
+def test_checkpoint_after_journal_limit(data_file):
+    dm = DataManager(data_file)
+    dm.add_kpi(make_kpi(1))
+    dm.save()
+    with open(data_file, encoding="utf-8") as f:
+        assert json.load(f)["kpi_records"] == {}
+
+    for day in range(DAY, DAY + JOURNAL_CHECKPOINT_OPS):
+        dm.save_kpi_record(day, 1, True)
+    assert dm.oplog.journal_length == JOURNAL_CHECKPOINT_OPS
+    assert len(journal_lines(dm)) == JOURNAL_CHECKPOINT_OPS + 1
+
+    # 再保存一次超过上限，重写 data.json 并清空日志
+    dm.save_kpi_record(DAY + JOURNAL_CHECKPOINT_OPS, 1, True)
+    assert dm.oplog.journal_length == 0
+    assert len(journal_lines(dm)) == 1
+    with open(data_file, encoding="utf-8") as f:
+        assert len(json.load(f)["kpi_records"]) == JOURNAL_CHECKPOINT_OPS + 1
+    assert DataManager(data_file).snapshot() == dm.snapshot()
+
+
+def write_data_file(path, **sections):
+    data = {"projects": {}, "todos": [], "kpis": [], "window_size": [800, 500], "kpi_records": {}}
+    data.update(sections)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def test_invalid_records_skipped_on_startup(data_file):
+    todo = make_todo().to_dict()
+    write_data_file(
+        data_file,
+        projects={"读书": {"unit": "页", "count": 2}, "坏项目": {"count": 1}},
+        todos=[{"name": "缺少字段"}, todo],
+        kpis=[dict(make_kpi(1).to_dict(), todo_id=1), {"id": "x"}],
+        kpi_records={"2025-03-01": {"1": True}, "2025-03-02": {"abc": True}, "2025-03-03": []}
+    )
+    with open(data_file, encoding="utf-8") as f:
+        original = f.read()
+
+    dm = DataManager(data_file)
+    assert list(dm.data["projects"]) == ["读书"]
+    assert [t.name for t in dm.data["todos"]] == [todo["name"]]
+    assert [kpi.id for kpi in dm.data["kpis"]] == [1]
+    assert dm.get_kpi(1).todo_id == 0  # 跟随被保留的TODO
+    assert dm.is_kpi_completed_for_date(1, date_to_day("2025-03-01"))
+
+    # 原文件在重写前备份
+    with open(data_file + ".bak", encoding="utf-8") as f:
+        assert f.read() == original
+    dm.save()
+    assert DataManager(data_file).snapshot() == dm.snapshot()
+
+
+def test_unreadable_data_file_is_backed_up(data_file):
+    with open(data_file, "w", encoding="utf-8") as f:
+        f.write('{"projects": ')
+    dm = DataManager(data_file)
+    assert dm.data["todos"] == []
+    dm.save()
+    with open(data_file + ".bak", encoding="utf-8") as f:
+        assert f.read() == '{"projects": '
+
+
+def test_replace_data_rejects_invalid_records(data_file):
+    dm = DataManager(data_file)
+    populate(dm)
+    before = dm.snapshot()
+    backup = dict(before, todos=[{"name": "缺少字段"}])
+    with pytest.raises(ValueError):
+        dm.replace_data(backup)
+    backup = dict(before, kpi_records={"2025-03-01": {"abc": True}})
+    with pytest.raises(ValueError):
+        dm.replace_data(backup)
+    assert dm.snapshot() == before
+
+
+def test_legacy_data_file_loads(data_file):
+    # 旧版本CSV导入把表格中的日期原样写入 data.json
+    write_data_file(
+        data_file,
+        projects={"读书": {"unit": "页", "count": 1, "progress_type": "absolute"}},
+        todos=[
+            {"name": "读完一本书", "type": "读书", "unit": "页", "target": 100, "progress": 100,
+             "progress_type": "absolute", "deadline": "2025/01/05", "completed": True,
+             "complete_time": "2025/1/4"},
+            {"name": "写读书笔记", "type": "读书", "unit": "页", "target": 10, "progress": 0,
+             "progress_type": "absolute", "deadline": "2025-2-1 0:00", "completed": False,
+             "complete_time": ""},
+        ],
+        kpis=[{"id": 1, "name": "阅读", "period_type": "daily", "custom_days": None, "target": 1,
+               "unit": "次", "todo_id": 0, "created_at": "2025/1/1"}],
+        kpi_records={"2025/01/03": {"1": True}, "2025-01-04": {"1": True}}
+    )
+
+    dm = DataManager(data_file)
+    first, second = dm.data["todos"]
+    assert first.deadline == date_to_day("2025-01-05")
+    assert first.complete_time == date_to_day("2025-01-04")
+    assert second.deadline == date_to_day("2025-02-01")
+    assert second.complete_time is None
+    assert dm.get_kpi(1).created_at == date_to_day("2025-01-01")
+    assert dm.kpi_records.kpi_days(1) == [date_to_day("2025-01-03"), date_to_day("2025-01-04")]
+    assert not os.path.exists(data_file + ".bak")
+
+    # 保存后统一为 yyyy-MM-dd
+    dm.close()
+    with open(data_file, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert [todo["deadline"] for todo in saved["todos"]] == ["2025-01-05", "2025-02-01"]
+    assert saved["kpis"][0]["created_at"] == "2025-01-01"
+    assert sorted(saved["kpi_records"]) == ["2025-01-03", "2025-01-04"]
+
+
+def test_uncomplete_period_returns_every_cleared_day(data_file):
+    dm = DataManager(data_file)
+    kpi = make_kpi(1, period_type=PeriodType.WEEKLY.value)
+    dm.add_kpi(kpi)
+    monday = DAY  # 2025-03-03 是周一
+    for day in (monday, monday + 2, monday + 4):
+        dm.save_kpi_record(day, 1, True)
+
+    assert dm.set_kpi_period_completed(kpi, monday + 6, False) == [monday, monday + 2, monday + 4]
+    assert not dm.is_kpi_completed_for_period(kpi, monday)
+    assert dm.set_kpi_period_completed(kpi, monday + 1, True) == [monday + 1]
+
+
+def test_window_size_not_undoable(data_file):
+    dm = DataManager(data_file)
+    dm.add_kpi(make_kpi(1))
+    dm.save()
+    lines = len(journal_lines(dm))
+    dm.save([900, 600])
+    dm.save([900, 600])  # 尺寸未变时不写日志
+    dm.save([1000, 700])
+    assert len(journal_lines(dm)) == lines + 2
+    # 撤销的是添加KPI，窗口尺寸不受影响
+    assert dm.undo() is not None
+    assert dm.data["kpis"] == []
+    assert dm.data["window_size"] == [1000, 700]
+    dm.save()
+
+    assert DataManager(data_file).window_size == [1000, 700]
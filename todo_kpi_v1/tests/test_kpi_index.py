@@ -0,0 +1,104 @@
+"""KpiWindowIndex 的有效期查询，以及 DataManager 修改KPI后的索引更新"""
+import pytest
+
+from core.data_manager import DataManager
+from core.dates import date_to_day
+from core.kpi_index import KpiWindowIndex
+from core.models import DURATION_DAYS, DurationType, PeriodType
+from core.records import Kpi
+
+DAY = date_to_day("2025-03-03")
+DURATIONS = [DurationType.ONE_WEEK.value, DurationType.ONE_MONTH.value, DurationType.FOREVER.value, "unknown"]
+
+
+def make_kpi(kpi_id, created_at, duration_type):
+    return Kpi(kpi_id, f"KPI{kpi_id}", PeriodType.DAILY.value, 1.0, "次", created_at,
+               duration_type=duration_type)
+
+
+def brute_force_active(kpis, day):
+    active = []
+    for kpi in kpis:
+        duration = DURATION_DAYS.get(kpi.duration_type, 0)
+        if duration is None or kpi.created_at <= day <= kpi.created_at + duration:
+            active.append(kpi)
+    return active
+
+
+def sample_kpis():
+    kpis = []
+    for i in range(40):
+        kpis.append(make_kpi(i + 1, DAY + (i * 7) % 45 - 20, DURATIONS[i % len(DURATIONS)]))
+    return kpis
+
+
+def test_active_matches_brute_force():
+    kpis = sample_kpis()
+    index = KpiWindowIndex(kpis)
+    for day in range(DAY - 30, DAY + 70):
+        assert index.active(day) == brute_force_active(kpis, day)
+
+
+@pytest.mark.parametrize("duration_type, days", [
+    (DurationType.ONE_WEEK.value, 7),
+    (DurationType.ONE_MONTH.value, 30),
+    ("unknown", 0),
+])
+def test_window_edges_are_inclusive(duration_type, days):
+    kpi = make_kpi(1, DAY, duration_type)
+    index = KpiWindowIndex([kpi])
+    assert index.active(DAY - 1) == []
+    assert index.active(DAY) == [kpi]
+    assert index.active(DAY + days) == [kpi]
+    assert index.active(DAY + days + 1) == []
+
+
+def test_forever_active_on_any_day():
+    kpi = make_kpi(1, DAY, DurationType.FOREVER.value)
+    index = KpiWindowIndex([kpi])
+    assert index.active(DAY - 10000) == [kpi]
+    assert index.active(DAY + 10000) == [kpi]
+
+
+def test_custom_duration(monkeypatch):
+    monkeypatch.setitem(DURATION_DAYS, "ten_days", 10)
+    kpis = sample_kpis() + [make_kpi(100, DAY, "ten_days"), make_kpi(101, DAY - 10, "ten_days")]
+    index = KpiWindowIndex(kpis)
+    assert [kpi.id for kpi in index.active(DAY) if kpi.id >= 100] == [100, 101]
+    assert [kpi.id for kpi in index.active(DAY + 1) if kpi.id >= 100] == [100]
+    for day in range(DAY - 30, DAY + 70):
+        assert index.active(day) == brute_force_active(kpis, day)
+
+
+def test_keeps_list_order_for_same_start():
+    kpis = [make_kpi(i, DAY, DURATIONS[i % 3]) for i in range(6)]
+    assert KpiWindowIndex(kpis).active(DAY) == kpis
+
+
+def test_data_manager_index_follows_kpi_changes(tmp_path):
+    dm = DataManager(str(tmp_path / "data.json"))
+    edge = make_kpi(1, DAY - 7, DurationType.ONE_WEEK.value)
+    dm.add_kpi(edge)
+    assert [kpi.id for kpi in dm.get_active_kpis(DAY)] == [1]
+
+    dm.add_kpi(make_kpi(2, DAY, DurationType.ONE_MONTH.value))
+    assert [kpi.id for kpi in dm.get_active_kpis(DAY)] == [1, 2]
+    assert [kpi.id for kpi in dm.get_active_kpis(DAY + 1)] == [2]
+
+    dm.delete_kpi(1)
+    assert [kpi.id for kpi in dm.get_active_kpis(DAY)] == [2]
+    dm.undo()
+    assert [kpi.id for kpi in dm.get_active_kpis(DAY)] == [1, 2]
+    dm.redo()
+    assert [kpi.id for kpi in dm.get_active_kpis(DAY)] == [2]
+
+    dm.clear_kpis()
+    assert dm.get_active_kpis(DAY) == []
+    dm.undo()
+    assert [kpi.id for kpi in dm.get_active_kpis(DAY)] == [2]
+
+    # 直接修改创建日期后需要调用 invalidate_kpi_index
+    dm.get_kpi(2).created_at = DAY + 1
+    dm.invalidate_kpi_index()
+    assert dm.get_active_kpis(DAY) == []
+    dm.close()
@@ -0,0 +1,68 @@
+"""KpiRecordStore 的按KPI日期列表（内存数据与快照）"""
+import pytest
+
+from core.kpi_records import KpiRecordStore
+from core.snapshot import open_snapshot, write_snapshot
+
+FIRST_DAY = 739000
+
+
+def brute_force_days(store, kpi_id):
+    return [day for day, records in store.iter_days() if kpi_id in records]
+
+
+@pytest.fixture
+def snapshot_store(tmp_path):
+    source = tmp_path / "data.json"
+    source.write_text("{}", encoding="utf-8")
+    path = str(tmp_path / "data.snapshot")
+    day_records = [
+        (FIRST_DAY + i, {kpi_id: True for kpi_id in (1, 2, 3) if i % kpi_id == 0})
+        for i in range(60)
+    ]
+    day_records.append((FIRST_DAY + 60, {1: False, 2: True}))  # 旧数据中的未完成记录
+    write_snapshot(path, {}, day_records, str(source))
+    store = KpiRecordStore(open_snapshot(path, str(source))[1])
+    yield store
+    store.close()
+
+
+def test_kpi_days_read_from_snapshot_without_scanning(snapshot_store):
+    snapshot_store._base.days = None  # 按KPI查询不应遍历全部日期
+    assert snapshot_store.kpi_days(3) == list(range(FIRST_DAY, FIRST_DAY + 60, 3))
+    assert snapshot_store.kpi_days(1) == list(range(FIRST_DAY, FIRST_DAY + 60))
+    assert snapshot_store.kpi_days(2)[-1] == FIRST_DAY + 60
+    assert snapshot_store.kpi_days(99) == []
+
+
+@pytest.mark.parametrize("query_first", [True, False])
+def test_kpi_days_follow_changes(snapshot_store, query_first):
+    if query_first:
+        for kpi_id in (1, 2, 3, 4):
+            snapshot_store.kpi_days(kpi_id)
+    snapshot_store.set(FIRST_DAY + 3, 3, None)
+    snapshot_store.set(FIRST_DAY + 4, 3, True)
+    snapshot_store.set(FIRST_DAY + 60, 1, True)
+    snapshot_store.set(FIRST_DAY + 100, 4, True)
+    snapshot_store.set(FIRST_DAY, 1, None)
+    snapshot_store.set(FIRST_DAY + 1, 1, None)
+    for kpi_id in (1, 2, 3, 4):
+        assert snapshot_store.kpi_days(kpi_id) == brute_force_days(snapshot_store, kpi_id)
+
+
+def test_delete_kpi(snapshot_store):
+    expected = brute_force_days(snapshot_store, 2)
+    assert snapshot_store.delete_kpi(2) == expected
+    assert snapshot_store.kpi_days(2) == []
+    assert brute_force_days(snapshot_store, 2) == []
+
+
+def test_kpi_days_without_snapshot():
+    store = KpiRecordStore.from_dict({
+        "2025-03-02": {"1": True, "2": False},
+        "2025-03-01": {"1": True},
+    })
+    assert store.kpi_days(1) == brute_force_days(store, 1)
+    assert store.kpi_days(2) == []
+    store.set(FIRST_DAY, 2, True)
+    assert store.kpi_days(2) == [FIRST_DAY]
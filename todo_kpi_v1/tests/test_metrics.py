@@ -0,0 +1,81 @@
+"""/metrics 的访问限制与多进程汇总"""
+import json
+import os
+
+from flask import Flask
+
+from services.metrics import MetricsRegistry, MultiProcessCollector, install_metrics, mark_process_dead
+
+
+def make_registry():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "请求数", ("route",))
+    registry.gauge("in_flight", "进行中的请求")
+    registry.histogram("latency_seconds", "耗时", buckets=(0.1, 1.0))
+    return registry
+
+
+def record(registry, requests, in_flight, latencies):
+    registry.counter("requests_total", "请求数", ("route",)).inc(requests, route="/a")
+    registry.gauge("in_flight", "进行中的请求").set(in_flight)
+    for value in latencies:
+        registry.histogram("latency_seconds", "耗时", buckets=(0.1, 1.0)).observe(value)
+
+
+def write_other_worker(directory, pid, registry, alive=True):
+    with open(os.path.join(directory, f"{pid}-1.json"), "w", encoding="utf-8") as f:
+        json.dump({"pid": pid, "alive": alive, "metrics": registry.dump()}, f)
+
+
+def test_workers_are_aggregated(tmp_path):
+    local, other = make_registry(), make_registry()
+    record(local, 2, 1, [0.05, 0.5])
+    record(other, 3, 4, [5.0])
+    write_other_worker(str(tmp_path), 999999, other)
+
+    text = MultiProcessCollector(local, str(tmp_path)).render()
+    assert 'requests_total{route="/a"} 5' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+    # 仪表按进程输出
+    assert f'in_flight{{worker="{os.getpid()}"}} 1' in text
+    assert 'in_flight{worker="999999"} 4' in text
+    assert text.count("# TYPE requests_total counter") == 1
+
+
+def test_dead_worker_keeps_counts_but_not_gauges(tmp_path):
+    local, other = make_registry(), make_registry()
+    record(local, 1, 0, [])
+    record(other, 3, 4, [])
+    write_other_worker(str(tmp_path), 999999, other)
+    mark_process_dead(str(tmp_path), 999999)
+
+    text = MultiProcessCollector(local, str(tmp_path)).render()
+    assert 'requests_total{route="/a"} 4' in text
+    assert 'worker="999999"' not in text
+
+
+def make_app(**kwargs):
+    app = Flask(__name__)
+    install_metrics(app, registry=make_registry(), shared_dir="", **kwargs)
+    return app.test_client()
+
+
+def test_metrics_only_for_allowed_addresses():
+    client = make_app(allow="127.0.0.1,10.0.0.0/8")
+    assert client.get("/metrics").status_code == 200
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "10.1.2.3"}).status_code == 200
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "::ffff:10.1.2.3"}).status_code == 200
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "203.0.113.5"}).status_code == 403
+
+
+def test_metrics_default_is_local_only(monkeypatch):
+    monkeypatch.delenv("METRICS_ALLOW", raising=False)
+    client = make_app()
+    assert client.get("/metrics").status_code == 200
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "203.0.113.5"}).status_code == 403
+
+
+def test_metrics_disabled():
+    assert make_app(allow="").get("/metrics").status_code == 404
@@ -0,0 +1,138 @@
+"""熔断器只记录确知的上游结果；对冲请求不限制并发调用数"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+from flask import Flask
+
+from services.deepseek_service import DeepSeekService
+from services.resilience import HEDGE_WORKERS, CircuitBreaker, RetryPolicy, hedged_call
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FailingSession:
+    """session.post 抛出指定的异常"""
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def post(self, *args, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+def half_open_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.allow()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 11
+    return breaker
+
+
+def make_service(monkeypatch, session, breaker):
+    monkeypatch.setenv("SILICONFLOW_API_KEY", "test")
+    monkeypatch.setenv("SILICONFLOW_API_BASE", "http://127.0.0.1:9/v1")
+    return DeepSeekService(Flask(__name__), session=session, breaker=breaker,
+                           retry_policy=RetryPolicy(retries=2, base_delay=0, max_delay=0))
+
+
+def test_local_error_does_not_close_half_open_breaker(monkeypatch):
+    breaker = half_open_breaker()
+    session = FailingSession(TypeError("Object of type set is not JSON serializable"))
+    service = make_service(monkeypatch, session, breaker)
+
+    with pytest.raises(TypeError):
+        service._post("embedding", "/embeddings", {"input": {1}}, idempotent=True)
+    assert session.calls == 1  # 本地错误不重试
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # 探测名额已放回，下一个请求可以探测，成功后才恢复
+    breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_upstream_error_reopens_half_open_breaker(monkeypatch):
+    breaker = half_open_breaker()
+    session = FailingSession(requests.ConnectionError("refused"))
+    service = make_service(monkeypatch, session, breaker)
+
+    with pytest.raises(requests.ConnectionError):
+        service._post("embedding", "/embeddings", {"input": "x"})
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+class FakeResponse:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_hedged_calls_not_limited_by_pool():
+    calls = HEDGE_WORKERS * 3
+    started = []
+    lock = threading.Lock()
+    all_started = threading.Event()
+
+    def send():
+        # 所有调用都开始后才返回；并发受线程池限制时会等到超时
+        with lock:
+            started.append(threading.get_ident())
+            if len(started) == calls:
+                all_started.set()
+        assert all_started.wait(5), "调用没有同时进行"
+        return FakeResponse()
+
+    def call(_):
+        return hedged_call(send, 10, lambda: True, lambda: None)
+
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(calls) as callers:
+        results = list(callers.map(call, range(calls)))
+    assert time.perf_counter() - begin < 5
+    assert all(response.status_code == 200 and outcome is None for response, outcome in results)
+    assert len(started) == calls
+
+
+def test_hedge_wins_and_slot_released():
+    release_first = threading.Event()
+    calls = []
+    released = []
+
+    def send():
+        calls.append(None)
+        if len(calls) == 1:
+            release_first.wait(5)
+        return FakeResponse()
+
+    response, outcome = hedged_call(send, 0.05, lambda: True, lambda: released.append(None))
+    assert outcome == "hedge"
+    release_first.set()
+    deadline = time.time() + 5
+    while not released and time.time() < deadline:
+        time.sleep(0.01)
+    assert released == [None]
+
+
+def test_hedge_skipped_when_upstream_slot_unavailable():
+    def send():
+        time.sleep(0.1)
+        return FakeResponse()
+
+    response, outcome = hedged_call(send, 0.01, lambda: False, lambda: None)
+    assert outcome is None and response.status_code == 200
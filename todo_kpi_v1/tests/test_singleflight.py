@@ -0,0 +1,128 @@
+"""相同请求的合并"""
+import threading
+import time
+
+import pytest
+
+from services.singleflight import SingleFlight, request_key
+
+WAITERS = 8
+
+
+class CountingEvent(threading.Event):
+    """记录有多少调用方在等待"""
+
+    def __init__(self):
+        super().__init__()
+        self.waiting = 0
+        self._count_lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        with self._count_lock:
+            self.waiting += 1
+        return super().wait(timeout)
+
+
+def run_concurrently(flight, key, func):
+    """先让一个调用开始执行 func，等其余 WAITERS 个调用都在等待它之后再让 func 返回"""
+    started, proceed = threading.Event(), threading.Event()
+    results = []
+
+    def leader_func():
+        started.set()
+        assert proceed.wait(5)
+        return func()
+
+    def call(f):
+        try:
+            results.append(("ok", flight.do(key, f)))
+        except Exception as e:
+            results.append(("error", e))
+
+    leader = threading.Thread(target=call, args=(leader_func,))
+    leader.start()
+    assert started.wait(5)
+    event = flight._calls[key].event = CountingEvent()
+    followers = [threading.Thread(target=call, args=(func,)) for _ in range(WAITERS)]
+    for thread in followers:
+        thread.start()
+    deadline = time.time() + 5
+    while event.waiting < WAITERS and time.time() < deadline:
+        time.sleep(0.001)
+    assert event.waiting == WAITERS
+    proceed.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    return results
+
+
+def test_concurrent_calls_run_once():
+    flight = SingleFlight()
+    calls = []
+
+    def func():
+        calls.append(None)
+        return {"answer": 42}
+
+    results = run_concurrently(flight, "key", func)
+    assert len(calls) == 1
+    assert len(results) == WAITERS + 1
+    values = [value for kind, value in results]
+    assert all(result == {"answer": 42} for result, _ in values)
+    assert sorted(shared for _, shared in values) == [False] + [True] * WAITERS
+
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight()
+    error = RuntimeError("上游失败")
+
+    def func():
+        raise error
+
+    results = run_concurrently(flight, "key", func)
+    assert results == [("error", error)] * (WAITERS + 1)
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_key_released_after_call(fail):
+    flight = SingleFlight()
+    calls = []
+
+    def func():
+        calls.append(None)
+        if fail:
+            raise ValueError("失败")
+        return len(calls)
+
+    for expected in (1, 2):
+        if fail:
+            with pytest.raises(ValueError):
+                flight.do("key", func)
+        else:
+            assert flight.do("key", func) == (expected, False)
+        assert flight.in_flight() == 0
+    assert len(calls) == 2
+
+
+def test_different_keys_do_not_wait():
+    flight = SingleFlight()
+    inside = threading.Event()
+    proceed = threading.Event()
+
+    def slow():
+        inside.set()
+        proceed.wait(5)
+        return "slow"
+
+    thread = threading.Thread(target=flight.do, args=("a", slow))
+    thread.start()
+    assert inside.wait(5)
+    assert flight.do("b", lambda: "fast") == ("fast", False)
+    proceed.set()
+    thread.join(5)
+
+
+def test_request_key_ignores_argument_order():
+    assert request_key("chat", {"a": 1, "b": [1, 2]}) == request_key("chat", {"b": [1, 2], "a": 1})
+    assert request_key("chat", {"a": 1}) != request_key("embed", {"a": 1})
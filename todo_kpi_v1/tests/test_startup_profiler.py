@@ -0,0 +1,57 @@
+"""启动分析的导入计时钩子"""
+import builtins
+import sys
+import threading
+import time
+
+from utils.startup_profiler import StartupProfiler
+
+
+def import_fresh(name):
+    sys.modules.pop(name, None)
+    __import__(name)
+
+
+def test_hook_removed_after_timeout():
+    original = builtins.__import__
+    profiler = StartupProfiler(enabled=True)
+    profiler.install_import_hook(timeout=0.05)
+    try:
+        assert builtins.__import__ != original
+        import_fresh("colorsys")
+        assert "colorsys" in profiler.imports
+        deadline = time.monotonic() + 2
+        while builtins.__import__ != original and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert builtins.__import__ == original
+    finally:
+        profiler.remove_import_hook()
+
+
+def test_remove_is_idempotent_and_disabled_profiler_does_nothing():
+    original = builtins.__import__
+    StartupProfiler(enabled=False).install_import_hook()
+    assert builtins.__import__ == original
+
+    profiler = StartupProfiler(enabled=True)
+    profiler.install_import_hook(timeout=None)
+    profiler.remove_import_hook()
+    profiler.remove_import_hook()
+    assert builtins.__import__ == original
+
+
+def test_concurrent_imports_are_counted():
+    profiler = StartupProfiler(enabled=True)
+    profiler.install_import_hook(timeout=None)
+    names = ["colorsys", "netrc", "wave", "sched", "tabnanny", "pyclbr"]
+    try:
+        threads = [threading.Thread(target=import_fresh, args=(name,)) for name in names]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        profiler.remove_import_hook()
+    for name in names:
+        cumulative, own = profiler.imports[name]
+        assert cumulative >= own >= 0
@@ -0,0 +1,25 @@
+"""上游并发限制：按工作进程平分的上限"""
+from services.upstream_limiter import UpstreamLimiter
+
+
+def test_limits_are_per_process_by_default(monkeypatch):
+    monkeypatch.setenv("API_WORKERS", "4")
+    monkeypatch.setenv("UPSTREAM_MAX_CONCURRENCY", "16")
+    monkeypatch.delenv("UPSTREAM_MAX_CONCURRENCY_TOTAL", raising=False)
+    monkeypatch.delenv("UPSTREAM_MAX_QUEUE_TOTAL", raising=False)
+    limiter = UpstreamLimiter.from_env()
+    assert limiter.max_concurrent == 16
+    assert limiter.max_queue == 64
+
+
+def test_total_limits_are_split_across_workers(monkeypatch):
+    monkeypatch.setenv("API_WORKERS", "3")
+    monkeypatch.setenv("UPSTREAM_MAX_CONCURRENCY_TOTAL", "16")
+    monkeypatch.setenv("UPSTREAM_MAX_QUEUE_TOTAL", "64")
+    limiter = UpstreamLimiter.from_env()
+    assert limiter.max_concurrent * 3 <= 16
+    assert limiter.max_concurrent == 5
+    assert limiter.max_queue == 21
+
+    monkeypatch.setenv("API_WORKERS", "32")
+    assert UpstreamLimiter.from_env().max_concurrent == 1
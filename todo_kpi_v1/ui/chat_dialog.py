@@ -8,10 +8,12 @@ from PyQt5.QtGui import QTextCursor, QTextCharFormat, QTextBlockFormat, QColor,
 from PyQt5.QtCore import QUrl
 import requests
 import json
-import markdown
 import re
 
 def format_message(message):
+    # markdown 及其扩展导入较慢，首次渲染消息时再加载
+    import markdown
+
     # 将markdown转换为HTML
     # Ensure message is not None before processing
     if message is None:
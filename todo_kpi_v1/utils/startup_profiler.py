@@ -0,0 +1,191 @@
+"""启动性能分析
+
+默认只记录粗粒度的启动阶段耗时并写入日志；设置环境变量 TODO_PROFILE_STARTUP=1
+或使用命令行参数 --profile-startup 启动时，额外记录每个模块的导入耗时，
+并把完整报告以 JSON Lines 形式追加到数据目录下的 startup_profile.jsonl，
+便于跨版本对比启动耗时。
+"""
+import builtins
+import datetime
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+PROFILE_ENV = "TODO_PROFILE_STARTUP"
+PROFILE_FLAG = "--profile-startup"
+REPORT_FILE = "startup_profile.jsonl"
+TOP_IMPORTS = 40  # 报告中保留的最慢导入数量
+IMPORT_HOOK_TIMEOUT = 60  # 秒；首帧始终没有绘制（无界面运行、启动出错）时到时移除导入计时
+
+
+def is_profiling_requested(argv=None):
+    """判断是否通过环境变量或命令行参数开启了启动分析"""
+    argv = sys.argv if argv is None else argv
+    return os.getenv(PROFILE_ENV, "").lower() in ("1", "true", "yes") or PROFILE_FLAG in argv
+
+
+class StartupProfiler:
+    def __init__(self, t0=None, enabled=None):
+        self.t0 = t0 if t0 is not None else time.perf_counter()
+        self.enabled = is_profiling_requested() if enabled is None else enabled
+        self.phases = []   # [(阶段名, 开始时间ms, 耗时ms)]
+        self.marks = {}    # 时间点名 -> 距启动的ms
+        self.imports = {}  # 模块名 -> [累计耗时ms, 自身耗时ms]
+        self.finished = False
+        self._original_import = None      # 安装钩子前的 __import__，移除后仍保留供透传
+        self._hook_installed = False
+        self._hook_timer = None
+        self._lock = threading.Lock()     # 保护 imports 和导入钩子的安装状态
+        self._local = threading.local()   # 每个线程各自的导入嵌套栈
+
+    def _elapsed_ms(self, now=None):
+        return ((now if now is not None else time.perf_counter()) - self.t0) * 1000
+
+    # ---------- 模块导入计时 ----------
+
+    def install_import_hook(self, timeout=IMPORT_HOOK_TIMEOUT):
+        """替换内置 __import__，统计每个模块首次导入的累计与自身耗时（仅在开启分析时生效）
+
+        通常由 finish() 移除；timeout 秒后仍未移除时自动移除，钩子不会一直留在进程中。
+        """
+        with self._lock:
+            if not self.enabled or self._hook_installed:
+                return
+            self._hook_installed = True
+            self._original_import = builtins.__import__
+            builtins.__import__ = self._timed_import
+            if timeout:
+                self._hook_timer = threading.Timer(timeout, self.remove_import_hook)
+                self._hook_timer.daemon = True
+                self._hook_timer.start()
+
+    def remove_import_hook(self):
+        """恢复原来的 __import__，可重复调用，可在任意线程中调用"""
+        with self._lock:
+            if not self._hook_installed:
+                return
+            self._hook_installed = False
+            # 之后又有其他代码替换了 __import__ 时不覆盖它，移除后的钩子只透传给原来的实现
+            if builtins.__import__ == self._timed_import:
+                builtins.__import__ = self._original_import
+            if self._hook_timer is not None:
+                self._hook_timer.cancel()
+                self._hook_timer = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        # 钩子已移除、相对导入和已加载的模块不计时
+        if not self._hook_installed or level or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        start = time.perf_counter()
+        stack.append(0.0)
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                entry = self.imports.setdefault(name, [0.0, 0.0])
+                entry[0] += elapsed
+                entry[1] += elapsed - children
+
+    # ---------- 阶段与时间点 ----------
+
+    @contextmanager
+    def phase(self, name):
+        """记录一个启动阶段的耗时；启动完成后不再记录"""
+        if self.finished:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, self._elapsed_ms(start), (time.perf_counter() - start) * 1000))
+
+    def mark(self, name):
+        """记录一个时间点（距进程启动的毫秒数）"""
+        if not self.finished:
+            self.marks[name] = self._elapsed_ms()
+
+    def watch_first_paint(self, widget, callback=None):
+        """在窗口首次绘制完成后记录 first_paint 时间点并调用 callback"""
+        from PyQt5.QtCore import QObject, QEvent, QTimer
+
+        profiler = self
+
+        class _FirstPaintWatcher(QObject):
+            def eventFilter(self, obj, event):
+                if event.type() == QEvent.Paint:
+                    obj.removeEventFilter(self)
+
+                    def on_painted():
+                        profiler.mark("first_paint")
+                        if callback:
+                            callback()
+
+                    # Paint 事件处理完后的第一次空闲即视为首帧已绘制
+                    QTimer.singleShot(0, on_painted)
+                return False
+
+        watcher = _FirstPaintWatcher(widget)
+        widget.installEventFilter(watcher)
+        return watcher
+
+    # ---------- 报告 ----------
+
+    def report(self, **extra):
+        with self._lock:
+            imports = [(name, tuple(entry)) for name, entry in self.imports.items()]
+        slowest = sorted(imports, key=lambda item: item[1][0], reverse=True)[:TOP_IMPORTS]
+        return {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "frozen": bool(getattr(sys, "frozen", False)),
+            "platform": sys.platform,
+            "python": platform.python_version(),
+            "total_ms": round(self.marks.get("first_paint", self._elapsed_ms()), 1),
+            "phases": [
+                {"name": name, "start_ms": round(start, 1), "duration_ms": round(duration, 1)}
+                for name, start, duration in self.phases
+            ],
+            "marks": {name: round(value, 1) for name, value in self.marks.items()},
+            "imports": [
+                {"module": name, "cumulative_ms": round(cumulative, 2), "self_ms": round(own, 2)}
+                for name, (cumulative, own) in slowest
+            ],
+            **extra
+        }
+
+    def finish(self, data_dir, **extra):
+        """结束分析：写日志摘要，开启分析时追加完整报告到数据目录"""
+        if self.finished:
+            return None
+        self.remove_import_hook()
+        report = self.report(**extra)
+        self.finished = True
+
+        parts = [f"{phase['name']} {phase['duration_ms']:.0f}ms" for phase in report["phases"]]
+        if "imports_done" in report["marks"]:
+            parts.insert(0, f"imports {report['marks']['imports_done']:.0f}ms")
+        summary = ", ".join(parts)
+        logging.info(f"启动耗时: {summary}, 合计 {report['total_ms']:.0f}ms")
+
+        if self.enabled:
+            report_path = os.path.join(data_dir, REPORT_FILE)
+            try:
+                with open(report_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(report, ensure_ascii=False) + "\n")
+            except OSError as e:
+                logging.error(f"写入启动分析报告失败: {str(e)}")
+        return report
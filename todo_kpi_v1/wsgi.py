@@ -0,0 +1,9 @@
+"""生产环境的 WSGI 入口
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+或使用 serve.py，没有安装 gunicorn 时会退回到其他服务器。
+"""
+from api_server import app
+
+__all__ = ['app']